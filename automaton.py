@@ -0,0 +1,177 @@
+"""
+Deterministic automata over state labels and their on-the-fly products with transition systems.
+
+A `DFA` reads the label (set of atoms) of every visited state. Its transitions are guarded by conjunctions of
+atoms that must hold (`pos`) and must not hold (`neg`), or by arbitrary predicates over labels. Labels of
+a graph are bitmasks (see `encoding.AtomIndex`); since a graph has few distinct labels, the automaton move of
+every distinct label mask is evaluated once for all automaton states and cached in a table `moves[label, q]`.
+
+`product(graph, dfa, init)` explores only the product states `(node, q)` reachable from the initial nodes.
+The DFA moves on the label of the target node of every edge, i.e. `(u, q) -> (v, dfa.step(q, L(v)))`, and
+the initial product states are `(u0, dfa.step(dfa.init, L(u0)))`. A product state is encoded as the integer
+`node * |Q| + q`. Exploration is level-synchronous: the out-edges of all states in a frontier are gathered and
+advanced with array operations. The result is a `GraphTS` whose edges carry the edge properties (`action`,
+`prob`, ...) of the underlying edges, so it can be passed to the solvers in `games`, `mdp` and `reachability`.
+
+Example (co-safe "eventually goal"):
+    dfa = DFA(num_states=2, init=0, accepting={1})
+    dfa.add_transition(0, 1, pos={"goal"})
+    dfa.add_transition(0, 0, neg={"goal"})
+    dfa.add_transition(1, 1)
+    prod = product(gw, dfa, init=[gw.state2node((0, 0))])
+    win, strategy = games.solve_reachability(prod, prod.accepting, player=None)    # one-player game
+"""
+import logging
+import numpy as np
+from encoding import StateTable
+from reachability import gather_positions
+from tsys import GraphTS
+
+
+class DFA:
+    def __init__(self, num_states, init=0, accepting=()):
+        """
+        :param num_states: (int) number of automaton states `0, ..., num_states - 1`.
+        :param init: (int) initial state.
+        :param accepting: (iterable of int) accepting states.
+        """
+        self.num_states = num_states
+        self.init = init
+        self.accepting = np.zeros(num_states, dtype=bool)
+        self.accepting[list(accepting)] = True
+        self.transitions = [[] for _ in range(num_states)]
+
+    def __repr__(self):
+        return f"<DFA with |Q|={self.num_states}, |F|={int(self.accepting.sum())}>"
+
+    def add_transition(self, q, q_next, pos=(), neg=(), guard=None):
+        """
+        Adds transition `q -> q_next`, enabled by labels in which all atoms of `pos` and no atom of `neg` hold
+        and, if given, `guard(label)` is True. Transitions of a state are tried in order of insertion;
+        the first enabled transition is taken (determinism). If no transition is enabled, the run is rejected.
+
+        :param guard: (callable or None) predicate over labels (sets of atoms).
+        """
+        self.transitions[q].append((q_next, frozenset(pos), frozenset(neg), guard))
+
+    def step(self, q, label):
+        """ Returns the next state of q on label (set of atoms), or -1 if no transition is enabled. """
+        for q_next, pos, neg, guard in self.transitions[q]:
+            if pos <= label and not (neg & label) and (guard is None or guard(label)):
+                return q_next
+        return -1
+
+    def moves(self, label):
+        """ Returns (|Q|,) array of next states of all automaton states on label. """
+        label = set(label)
+        return np.array([self.step(q, label) for q in range(self.num_states)], dtype=np.int64)
+
+
+def product(graph, dfa, init, max_states=None):
+    """
+    Constructs the product of graph and dfa reachable from init.
+
+    :param graph: (Graph or CSRGraph) labeled transition system graph, i.e. with `label_masks` and `atom_index`
+        (e.g. a graphified `Gridworld`). A `Graph` is frozen first.
+    :param dfa: (DFA) deterministic automaton over atoms of graph.
+    :param init: (iterable of int) initial nodes of graph.
+    :param max_states: (int or None) exploration stops (with a warning) after discovering this many states.
+    :return: (GraphTS) product graph. Node `i` is the product state `prod.node2state(i) = (node, q)`.
+        Besides the edge properties of graph, it has
+            * `accepting` node property and `prod.accepting` boolean array over product nodes,
+            * `prod.init_nodes` array of initial product nodes,
+            * the `turn` node property of graph (if any). Solve one-player products with `player=None`
+              (see `games.attractor`).
+    """
+    csr = graph.freeze()
+    label_masks = getattr(csr, "label_masks", None)
+    if label_masks is None:
+        raise ValueError(f"{repr(graph)} is not labeled. Expected `label_masks` and `atom_index` attributes.")
+
+    # Intern distinct label masks. Automaton moves are evaluated on first use of a label (cached in moves).
+    num_q = dfa.num_states
+    distinct, label_id = np.unique(np.asarray(label_masks), axis=0, return_inverse=True)
+    label_id = label_id.reshape(-1)
+    moves = np.full((len(distinct), num_q), -1, dtype=np.int64)
+    evaluated = np.zeros(len(distinct), dtype=bool)
+
+    def advance(nodes, qs):
+        lids = label_id[nodes]
+        new = np.unique(lids[~evaluated[lids]])
+        for lid in new.tolist():
+            moves[lid] = dfa.moves(csr.atom_index.decode(distinct[lid]))
+        evaluated[new] = True
+        return moves[lids, qs]
+
+    # Level-synchronous exploration of product states `node * |Q| + q`.
+    init = np.unique(np.asarray(list(init), dtype=np.int64))
+    init_q = advance(init, np.full(len(init), dfa.init, dtype=np.int64))
+    frontier = init[init_q >= 0] * num_q + init_q[init_q >= 0]
+    if len(frontier) == 0:
+        raise ValueError(f"{repr(dfa)} rejects the labels of all initial nodes.")
+    seen = np.zeros(csr.number_of_nodes() * num_q, dtype=bool)
+    seen[frontier] = True
+    discovered, src, dst, eids = [frontier], [], [], []
+    num_discovered = len(frontier)
+    while len(frontier) > 0:
+        nodes, qs = np.divmod(frontier, num_q)
+        pos = gather_positions(csr.indptr, nodes)
+        repeat = np.diff(csr.indptr)[nodes]
+        u_codes = np.repeat(frontier, repeat)
+        succ = csr.indices[pos]
+        q_next = advance(succ, np.repeat(qs, repeat))
+
+        keep = q_next >= 0
+        v_codes = succ[keep] * num_q + q_next[keep]
+        src.append(u_codes[keep])
+        dst.append(v_codes)
+        eids.append(pos[keep])
+
+        frontier = np.unique(v_codes[~seen[v_codes]])
+        seen[frontier] = True
+        discovered.append(frontier)
+        num_discovered += len(frontier)
+        if max_states is not None and num_discovered >= max_states:
+            logging.warning(f"Product exploration stopped after discovering {num_discovered} states.")
+            break
+
+    # Number product states in order of discovery.
+    codes = np.concatenate(discovered)
+    code2node = np.full(len(seen), -1, dtype=np.int64)
+    code2node[codes] = np.arange(len(codes))
+    u, v, eids = code2node[np.concatenate(src)], code2node[np.concatenate(dst)], np.concatenate(eids)
+    explored = v >= 0
+    u, v, eids = u[explored], v[explored], eids[explored]
+    return _to_graph(csr, dfa, codes, u, v, eids, len(discovered[0]))
+
+
+def _to_graph(csr, dfa, codes, u, v, eids, num_init):
+    nodes, qs = np.divmod(codes, dfa.num_states)
+    prod = GraphTS()
+    prod.encoder = StateTable(np.stack([nodes, qs], axis=1))
+    prod.map_state2node = prod.encoder
+    for name in ("actions", "atoms", "deterministic", "qualitative", "turn_based"):
+        if hasattr(csr, name):
+            setattr(prod, name, getattr(csr, name))
+    prod.atom_index = getattr(csr, "atom_index", None)
+    prod.label_masks = csr.label_masks[nodes]
+    prod.accepting = dfa.accepting[qs]
+    prod.init_nodes = np.arange(num_init, dtype=np.int64)
+
+    # Node properties
+    prod.add_nodes(num_nodes=len(codes))
+    prod.add_node_property("accepting", False, dtype=bool)
+    prod._v_props["accepting"][:] = prod.accepting
+    if csr.has_node_property("turn"):
+        prod.add_node_property("turn", -1, dtype=np.int64)
+        prod._v_props["turn"][:] = csr.node_property_array("turn", np.int64)[nodes]
+
+    # Edges (ordered by source) with properties of the underlying edges.
+    order = np.argsort(u, kind="stable")
+    u, v, eids = u[order], v[order], eids[order]
+    edge_props = dict()
+    for name, p_map in csr._e_props.items():
+        prod.add_edge_property(name, p_map.default)
+        edge_props[name] = csr.edge_property_array(name)[eids].tolist()
+    prod.add_edges_from_arrays(u, v, **edge_props)
+    return prod
@@ -0,0 +1 @@
+# Modules of the library are top-level modules. This file makes pytest add the repository root to sys.path.
@@ -0,0 +1,256 @@
+import numpy as np
+
+
+class StateEncoder:
+    """
+    Mixed-radix integer encoding of states in a product of ranges.
+
+    A state `(x_1, ..., x_d)` with `x_i in ranges[i]` is encoded as its index in
+    `itertools.product(*ranges)`, i.e. the last component varies fastest. Encoding, decoding are O(1) and
+    `encode_batch, decode_batch` are vectorized over arrays of states/codes.
+
+    The encoder also behaves as a (read-only) state to node mapping: `state in encoder`, `encoder[state]`.
+    Hence, it can replace the `map_state2node` dictionary of a gridworld graph.
+
+    Example:
+        encoder = StateEncoder(range(rows), range(cols))
+        code = encoder.encode((2, 3))         # 2 * cols + 3
+        state = encoder.decode(code)          # (2, 3)
+    """
+    def __init__(self, *ranges):
+        """
+        :param ranges: (int or range) range of every state component. An integer `n` is interpreted as `range(n)`.
+        """
+        self.ranges = tuple(range(r) if isinstance(r, int) else r for r in ranges)
+        assert all(len(r) > 0 for r in self.ranges), f"Expected non-empty ranges. Received {self.ranges}."
+        self.starts = np.array([r.start for r in self.ranges], dtype=np.int64)
+        self.steps = np.array([r.step for r in self.ranges], dtype=np.int64)
+        self.shape = tuple(len(r) for r in self.ranges)
+        self.size = int(np.prod(self.shape, dtype=np.int64))
+
+    def __repr__(self):
+        return f"<StateEncoder with shape={self.shape}>"
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        for code in range(self.size):
+            yield self.decode(code)
+
+    def __contains__(self, state):
+        try:
+            return len(state) == len(self.ranges) and all(x in r for x, r in zip(state, self.ranges))
+        except TypeError:
+            return False
+
+    def __getitem__(self, state):
+        return self.encode(state)
+
+    @classmethod
+    def from_dim(cls, dim):
+        """ Encoder for states `(row, col)` of a gridworld with dimension `dim = (rows, cols)`. """
+        return cls(*dim)
+
+    def encode(self, state):
+        """ Returns the code of given state. Raises KeyError, if state is not in the product of ranges. """
+        if state not in self:
+            raise KeyError(f"{state} is not in {repr(self)}.")
+        code = 0
+        for x, r in zip(state, self.ranges):
+            code = code * len(r) + r.index(x)
+        return code
+
+    def decode(self, code):
+        """ Returns the state with given code. """
+        if not 0 <= code < self.size:
+            raise KeyError(f"{code} is not a valid code of {repr(self)}.")
+        state = []
+        for r in reversed(self.ranges):
+            code, idx = divmod(code, len(r))
+            state.append(r[idx])
+        return tuple(reversed(state))
+
+    def encode_batch(self, states):
+        """
+        :param states: (np.ndarray) (N, d) integer array of states.
+        :return: (np.ndarray) int64 array of codes. States outside the product of ranges are encoded as -1.
+        """
+        states = np.asarray(states, dtype=np.int64).reshape(-1, len(self.ranges))
+        offsets, rem = np.divmod(states - self.starts, self.steps)
+        valid = np.all((rem == 0) & (offsets >= 0) & (offsets < self.shape), axis=1)
+        codes = np.full(len(states), -1, dtype=np.int64)
+        codes[valid] = np.ravel_multi_index(tuple(offsets[valid].T), self.shape)
+        return codes
+
+    def decode_batch(self, codes):
+        """
+        :param codes: (np.ndarray) array of codes.
+        :return: (np.ndarray) (N, d) int64 array of states.
+        """
+        offsets = np.unravel_index(np.asarray(codes, dtype=np.int64), self.shape)
+        return np.stack(offsets, axis=-1) * self.steps + self.starts
+
+
+class StateTable:
+    """
+    Encoding of an explicit (N, d) integer array of states, where row `i` is the state with code `i`.
+
+    Provides the same interface as `StateEncoder`, but for arbitrary sets of states (e.g. states with obstacles
+    removed, or reachable states). States are keyed by their mixed-radix index within the bounding box of
+    all states; lookups are binary searches over the sorted keys.
+    """
+    def __init__(self, states):
+        """
+        :param states: (np.ndarray) (N, d) integer array of distinct states.
+        """
+        self.states = np.asarray(states)
+        self.lo = self.states.min(axis=0)
+        self.shape = tuple((self.states.max(axis=0) - self.lo + 1).tolist())
+        keys = np.ravel_multi_index(tuple((self.states - self.lo).T), self.shape)
+        self.order = np.argsort(keys, kind="stable")
+        self.keys = keys[self.order]
+        self.size = len(self.states)
+
+    def __repr__(self):
+        return f"<StateTable with {self.size} states>"
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        for state in self.states.tolist():
+            yield tuple(state)
+
+    def __contains__(self, state):
+        try:
+            return self.encode_batch(np.asarray(state).reshape(1, -1))[0] >= 0
+        except ValueError:
+            return False
+
+    def __getitem__(self, state):
+        return self.encode(state)
+
+    def encode(self, state):
+        """ Returns the code of given state. Raises KeyError, if state is not in table. """
+        code = int(self.encode_batch(np.asarray(state).reshape(1, -1))[0])
+        if code < 0:
+            raise KeyError(f"{state} is not in {repr(self)}.")
+        return code
+
+    def decode(self, code):
+        """ Returns the state with given code. """
+        return tuple(self.states[code].tolist())
+
+    def encode_batch(self, states):
+        """
+        :param states: (np.ndarray) (M, d) integer array of states.
+        :return: (np.ndarray) int64 array of codes. States not in table are encoded as -1.
+        """
+        states = np.asarray(states, dtype=np.int64).reshape(-1, len(self.shape))
+        offsets = states - self.lo
+        valid = np.all((offsets >= 0) & (offsets < self.shape), axis=1)
+        keys = np.zeros(len(states), dtype=np.int64)
+        keys[valid] = np.ravel_multi_index(tuple(offsets[valid].T), self.shape)
+        pos = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+        valid &= self.keys[pos] == keys
+        return np.where(valid, self.order[pos], -1)
+
+    def decode_batch(self, codes):
+        """
+        :param codes: (np.ndarray) array of codes.
+        :return: (np.ndarray) (M, d) array of states.
+        """
+        return self.states[np.asarray(codes, dtype=np.int64)]
+
+
+class AtomIndex:
+    """
+    Interning of atomic propositions to bit positions.
+
+    A label (set of atoms) is encoded as a bitmask of `num_words` uint64 words: the i-th atom is bit `i % 64`
+    of word `i // 64`. Labels of N states are stored as an (N, num_words) uint64 array. Queries such as
+    "states where atom p holds" are then vectorized bitwise operations that return boolean masks.
+
+    Example:
+        index = AtomIndex({"goal", "wall"})
+        masks = index.encode_batch([{"goal"}, set(), {"goal", "wall"}])
+        index.holds(masks, "goal")              # [True, False, True]
+        index.decode(masks[2])                  # {"goal", "wall"}
+    """
+    def __init__(self, atoms):
+        """
+        :param atoms: (iterable) atomic propositions. Atoms are assigned bits in sorted order (if sortable).
+        """
+        try:
+            self.atoms = sorted(atoms)
+        except TypeError:
+            self.atoms = list(atoms)
+        self.atom2bit = {atom: bit for bit, atom in enumerate(self.atoms)}
+        self.num_words = max(1, -(-len(self.atoms) // 64))
+
+    def __repr__(self):
+        return f"<AtomIndex with {len(self.atoms)} atoms>"
+
+    def __len__(self):
+        return len(self.atoms)
+
+    def __contains__(self, atom):
+        return atom in self.atom2bit
+
+    def encode(self, label):
+        """ Returns (num_words,) uint64 mask of label. Raises KeyError, if label contains an unknown atom. """
+        mask = np.zeros(self.num_words, dtype=np.uint64)
+        for atom in label:
+            word, bit = divmod(self.atom2bit[atom], 64)
+            mask[word] |= np.uint64(1) << np.uint64(bit)
+        return mask
+
+    def encode_batch(self, labels):
+        """ Returns (N, num_words) uint64 array of masks of labels. Identical labels are encoded once. """
+        labels = list(labels)
+        masks = np.zeros((len(labels), self.num_words), dtype=np.uint64)
+        cache = dict()
+        for i, label in enumerate(labels):
+            key = frozenset(label)
+            mask = cache.get(key)
+            if mask is None:
+                mask = cache[key] = self.encode(key)
+            masks[i] = mask
+        return masks
+
+    def encode_holds(self, holds, num_states):
+        """
+        Returns (N, num_words) uint64 array of masks from per-atom truth values.
+
+        :param holds: (dict) {atom: (N,) boolean array}. Atoms not in dict are false in all states.
+        :param num_states: (int) number of states N.
+        """
+        masks = np.zeros((num_states, self.num_words), dtype=np.uint64)
+        for atom, values in holds.items():
+            word, bit = divmod(self.atom2bit[atom], 64)
+            masks[:, word] |= np.asarray(values, dtype=bool).astype(np.uint64) << np.uint64(bit)
+        return masks
+
+    def decode(self, mask):
+        """ Returns the label (set of atoms) of a (num_words,) mask. """
+        mask = np.asarray(mask, dtype=np.uint64).reshape(self.num_words)
+        return {atom for atom, bit in self.atom2bit.items() if (int(mask[bit // 64]) >> (bit % 64)) & 1}
+
+    def mask(self, atoms):
+        """ Returns (num_words,) uint64 mask with the bits of given atoms set. """
+        return self.encode(atoms)
+
+    def holds(self, masks, atom):
+        """ Returns (N,) boolean array that is True where atom holds in (N, num_words) masks. """
+        word, bit = divmod(self.atom2bit[atom], 64)
+        return ((masks[:, word] >> np.uint64(bit)) & np.uint64(1)).astype(bool)
+
+    def holds_all(self, masks, atoms):
+        """ Returns (N,) boolean array that is True where all atoms hold. """
+        mask = self.mask(atoms)
+        return np.all((masks & mask) == mask, axis=1)
+
+    def holds_any(self, masks, atoms):
+        """ Returns (N,) boolean array that is True where at least one of atoms holds. """
+        return np.any((masks & self.mask(atoms)) != 0, axis=1)
@@ -1,27 +1,180 @@
+import numpy as np
 from abc import ABC, abstractmethod
 
 
+class History:
+    """
+    Ring buffer of the last `capacity` steps of a run. Every step is stored as a pair of integers
+    (node, action code) in preallocated NumPy arrays. Entries are indexed from 0 (oldest in window)
+    to `len(history) - 1` (latest). `offset` is the number of steps evicted from the window.
+
+    If `spill_file` is given, evicted steps are buffered in a preallocated block of `spill_block` steps,
+    which is appended to the file whenever it fills (and by `flush()`), as a flat int64 array of
+    (node, action code) pairs. Spilled steps can be read back with `History.read_spill()`.
+    With an infinite capacity, the buffer grows as needed and nothing is evicted.
+    """
+    def __init__(self, capacity=float("inf"), spill_file=None, spill_block=4096):
+        """
+        :param capacity: (int or float("inf")) maximum number of steps kept in memory.
+        :param spill_file: (str or None) file to which evicted steps are appended.
+        :param spill_block: (int) number of evicted steps buffered before they are written to `spill_file`.
+        """
+        assert capacity >= 1, f"Expected capacity >= 1. Received {capacity}."
+        self.capacity = capacity
+        self.bounded = capacity != float("inf")
+        self.spill_file = spill_file
+        self.spill_block = spill_block
+        size = int(capacity) if self.bounded else 64
+        self.nodes = np.full(size, -1, dtype=np.int64)
+        self.actions = np.full(size, -1, dtype=np.int64)
+        self.head = 0
+        self.size = 0
+        self.offset = 0
+        self._spill = np.zeros((spill_block, 2), dtype=np.int64) if spill_file is not None else None
+        self._num_spill = 0
+
+    def __repr__(self):
+        return f"<History with {self.size} steps (capacity={self.capacity}, evicted={self.offset})>"
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, idx):
+        """ Returns the (node, action code) of the idx-th step in window. """
+        pos = self._pos(idx)
+        return int(self.nodes[pos]), int(self.actions[pos])
+
+    def clear(self):
+        self.flush()
+        self.head = 0
+        self.size = 0
+        self.offset = 0
+
+    def append(self, node, action=-1):
+        """
+        Appends a step. If the buffer is full, the oldest step is evicted (and spilled, if enabled).
+
+        :param node: (int) node reached at this step.
+        :param action: (int) code of the action that led to node. -1 for the initial step.
+        """
+        if self.size == len(self.nodes):
+            if self.bounded:
+                self._evict()
+            else:
+                self._grow()
+        pos = (self.head + self.size) % len(self.nodes)
+        self.nodes[pos] = node
+        self.actions[pos] = action
+        self.size += 1
+
+    def truncate(self, size):
+        """ Discards the steps after the first `size` steps in window (e.g. the redo tail after stepping back). """
+        assert 0 <= size <= self.size, f"Expected 0 <= size <= {self.size}. Received {size}."
+        self.size = size
+
+    def window(self):
+        """ Returns 2-tuple (nodes, action codes) of arrays of steps in window (oldest first). """
+        order = (self.head + np.arange(self.size)) % len(self.nodes)
+        return self.nodes[order], self.actions[order]
+
+    def flush(self):
+        """ Writes buffered evicted steps to `spill_file`. """
+        if self.spill_file is None or self._num_spill == 0:
+            return
+        with open(self.spill_file, "ab") as file:
+            self._spill[:self._num_spill].tofile(file)
+        self._num_spill = 0
+
+    @staticmethod
+    def read_spill(spill_file):
+        """ Returns 2-tuple (nodes, action codes) of arrays of steps spilled to file (oldest first). """
+        data = np.fromfile(spill_file, dtype=np.int64).reshape(-1, 2)
+        return data[:, 0], data[:, 1]
+
+    def _pos(self, idx):
+        if not -self.size <= idx < self.size:
+            raise IndexError(f"History index {idx} out of range [0, {self.size}).")
+        return (self.head + idx % self.size) % len(self.nodes)
+
+    def _evict(self):
+        if self.spill_file is not None:
+            self._spill[self._num_spill] = self.nodes[self.head], self.actions[self.head]
+            self._num_spill += 1
+            if self._num_spill == self.spill_block:
+                self.flush()
+        self.head = (self.head + 1) % len(self.nodes)
+        self.size -= 1
+        self.offset += 1
+
+    def _grow(self):
+        nodes, actions = self.window()
+        self.nodes = np.full(2 * len(nodes), -1, dtype=np.int64)
+        self.actions = np.full(2 * len(nodes), -1, dtype=np.int64)
+        self.nodes[:self.size] = nodes
+        self.actions[:self.size] = actions
+        self.head = 0
+
+
 class ESM(ABC):
-    def __init__(self, graph, len_history=float("inf")):
+    def __init__(self, graph, len_history=float("inf"), spill_file=None, spill_block=4096):
+        """
+        :param graph: (Graph) transition system graph implementing `state2node, node2state`.
+        :param len_history: (int or float("inf")) number of steps kept in history. `step_backward` can
+            move back at most `len_history - 1` steps.
+        :param spill_file: (str or None) If given, steps evicted from history are appended to this file
+            (see `History`). Use `History.read_spill(spill_file)` and `decode_action` to replay them.
+        :param spill_block: (int) number of evicted steps written to `spill_file` at once.
+        """
         self.graph = graph
-        self.state_history = []
-        self.action_history = []
+        self.history = History(len_history, spill_file, spill_block)
         self.step_counter = None
         self.len_history = len_history
 
+        # Actions (e.g. tuples of player actions) are interned to integer codes.
+        self._act2code = dict()
+        self._code2act = []
+
     def initialize(self, state):
-        self.state_history = []
-        self.action_history = []
-        self.state_history.append(state)
-        self.step_counter = 0
+        self.history.clear()
         node = self.graph.state2node(state)
+        self.history.append(node)
+        self.step_counter = 0
         print(f"[INFO] Initialized ESM to node:: {node}:{state}")
 
     @property
     def curr_state(self):
         if self.step_counter is None:
             raise ValueError("ESM is not initialized. Current state is undefined.")
-        return self.state_history[self.step_counter]
+        return self.graph.node2state(self.history[self.step_counter][0])
+
+    @property
+    def state_history(self):
+        """ States in history window (oldest first). """
+        return [self.graph.node2state(node) for node in self.history.window()[0].tolist()]
+
+    @property
+    def action_history(self):
+        """ Actions in history window (oldest first). The initial step, if in window, has no action. """
+        return [self.decode_action(code) for code in self.history.window()[1].tolist() if code >= 0]
+
+    def push(self, state, action):
+        """
+        Appends the state reached by action from the current state to history and moves step counter to it.
+        Steps after the current state (left by `step_backward`) are discarded.
+        If the history is full, the oldest step is evicted.
+        """
+        code = self._act2code.get(action)
+        if code is None:
+            code = self._act2code[action] = len(self._code2act)
+            self._code2act.append(action)
+        if self.step_counter is not None:
+            self.history.truncate(self.step_counter + 1)
+        self.history.append(self.graph.state2node(state), code)
+        self.step_counter = len(self.history) - 1
+
+    def decode_action(self, code):
+        """ Returns the action with given code (as stored in history). """
+        return self._code2act[code]
 
     @abstractmethod
     def step_forward(self):
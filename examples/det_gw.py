@@ -1,6 +1,6 @@
 import itertools
 from gridworld import Gridworld, graphify
-from gw_utils import GW_ACT_4, bouncy_boundary
+from gw_utils import GW_ACT_4, bouncy_boundary, bouncy_move_batch
 
 
 class SimpleGridworld(Gridworld):
@@ -58,6 +58,10 @@ class SimpleGridworld(Gridworld):
         # Return state
         return n_row, n_col
 
+    def delta_batch(self, states, act):
+        """ (Optional) Vectorized transition function. See `delta_batch` in base class. """
+        return bouncy_move_batch(states, GW_ACT_4[act], self.dim)
+
     def atoms(self):
         return {'goal'}
 
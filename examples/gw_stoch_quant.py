@@ -1,4 +1,5 @@
 import itertools
+import numpy as np
 from gridworld import Gridworld, graphify
 from gw_utils import *
 
@@ -71,6 +72,12 @@ class StochasticGridworld(Gridworld):
         # Return state
         return [((n_row, n_col), 1.0)]
 
+    def delta_batch(self, states, act):
+        """ (Optional) Vectorized transition function. See `delta_batch` in base class. """
+        # One branch per state, with probability 1
+        n_states = bouncy_move_batch(states, GW_ACT_4[act], self.dim)
+        return n_states[:, np.newaxis, :], np.ones((len(states), 1))
+
     def atoms(self):
         return {'goal'}
 
@@ -1,4 +1,5 @@
 import itertools
+import numpy as np
 from gridworld import Gridworld, graphify
 from gw_utils import *
 
@@ -69,6 +70,11 @@ class StochasticGridworld(Gridworld):
         # Return state
         return [(n_row, n_col)]
 
+    def delta_batch(self, states, act):
+        """ (Optional) Vectorized transition function. See `delta_batch` in base class. """
+        # One branch per state
+        return bouncy_move_batch(states, GW_ACT_4[act], self.dim)[:, np.newaxis, :]
+
     def atoms(self):
         return {'goal'}
 
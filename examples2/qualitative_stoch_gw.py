@@ -1,6 +1,7 @@
 import itertools
+import numpy as np
 from tsgen import TSGenerator
-from gw_utils import GW_ACT_4, bouncy_boundary
+from gw_utils import GW_ACT_4, bouncy_boundary, bouncy_move_batch
 
 
 class StochasticGridworld(TSGenerator):
@@ -66,6 +67,11 @@ class StochasticGridworld(TSGenerator):
         # Return state
         return [(n_row, n_col)]
 
+    def delta_batch(self, states, act):
+        """ (Optional) Vectorized transition function. See `delta_batch` in base class. """
+        # One branch per state
+        return bouncy_move_batch(states, GW_ACT_4[act], self.dim())[:, np.newaxis, :]
+
     def atoms(self):
         return {'goal'}
 
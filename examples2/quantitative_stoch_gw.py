@@ -1,6 +1,7 @@
 import itertools
+import numpy as np
 from tsgen import TSGenerator
-from gw_utils import GW_ACT_4, bouncy_boundary
+from gw_utils import GW_ACT_4, bouncy_boundary, bouncy_move_batch
 
 
 class StochasticGridworld(TSGenerator):
@@ -68,6 +69,12 @@ class StochasticGridworld(TSGenerator):
         # Return state
         return [((n_row, n_col), 1.0)]
 
+    def delta_batch(self, states, act):
+        """ (Optional) Vectorized transition function. See `delta_batch` in base class. """
+        # One branch per state, with probability 1
+        n_states = bouncy_move_batch(states, GW_ACT_4[act], self.dim())
+        return n_states[:, np.newaxis, :], np.ones((len(states), 1))
+
     def atoms(self):
         return {'goal'}
 
@@ -1,6 +1,7 @@
 import itertools
+import numpy as np
 from tsgen import TSGenerator
-from gw_utils import GW_ACT_4, bouncy_boundary
+from gw_utils import GW_ACT_4, bouncy_boundary, bouncy_move_batch
 
 
 class SimpleGridworld(TSGenerator):
@@ -65,6 +66,10 @@ class SimpleGridworld(TSGenerator):
         # Return state
         return n_row, n_col
 
+    def delta_batch(self, states, act):
+        """ (Optional) Vectorized transition function. See `delta_batch` in base class. """
+        return bouncy_move_batch(states, GW_ACT_4[act], self.dim())
+
     def atoms(self):
         return {'goal'}
 
@@ -73,6 +78,15 @@ class SimpleGridworld(TSGenerator):
             return {'goal'}
         return set()
 
+    def label_batch(self, states):
+        """
+        (Optional) Vectorized labeling function.
+
+        :param states: (np.ndarray) (N, 2) array. Each row is a state `(p1.row, p1.col)`.
+        :return: (dict) {atom: (N,) boolean array}.
+        """
+        return {'goal': (states[:, 0] == 3) & (states[:, 1] == 3)}
+
 
 if __name__ == '__main__':
     from gridworld2 import Gridworld
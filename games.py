@@ -0,0 +1,148 @@
+"""
+Solvers for two-player turn-based games on transition system graphs (e.g. `GraphTS`).
+
+The `turn` node property identifies the player who chooses the outgoing edge at a node.
+Player ids are `P1 = 1` and `P2 = 2`; nodes whose turn is the other id are controlled by the opponent.
+Every node must have a turn of `P1` or `P2`: an unset turn (e.g. the default -1 of graphified transition
+systems that do not implement `turn`) raises a ValueError. One-player games, in which the player chooses the
+outgoing edge at every node, are solved with `player=None`; the turn is then ignored.
+
+The attractor is computed level-synchronously over CSR predecessor arrays: every level attracts all
+player nodes with an edge into the attractor, and all opponent nodes whose counter of out-edges that
+leave the attractor drops to zero. Counters are NumPy arrays, so the overall work is O(|V| + |E|).
+
+:note: A node without out-edges is attracted only if it is in the target set.
+"""
+import numpy as np
+from graph import NodeArrayPropertyMap, EdgeArrayPropertyMap
+from reachability import gather_positions
+
+
+P1 = 1
+P2 = 2
+
+
+def attractor(graph, targets, player, turn=None):
+    """
+    Computes the attractor of `player` to `targets`.
+
+    :param graph: (Graph or CSRGraph) game graph. A `Graph` is frozen before solving.
+    :param targets: (np.ndarray) boolean mask over nodes, or array of nodes.
+    :param player: (int or None) player id. If None, the game is a one-player game (player controls every node).
+    :param turn: (np.ndarray or None) turn (`P1` or `P2`) of every node. Defaults to `turn` node property of graph.
+        Ignored if player is None.
+    :return: 3-tuple (attr, strategy, rank) of arrays over nodes:
+        * attr: boolean mask of attractor.
+        * strategy: for player nodes in attractor (outside targets), the id of an edge (in frozen graph)
+            that leads to a node of lower rank. Otherwise -1.
+        * rank: the level at which node was attracted (0 for targets). -1 for nodes outside attractor.
+    """
+    csr = graph.freeze()
+    n = csr.number_of_nodes()
+    is_player = np.ones(n, dtype=bool) if player is None else _turn_array(csr, turn) == player
+
+    attr = _as_mask(targets, n)
+    strategy = np.full(n, -1, dtype=np.int64)
+    rank = np.where(attr, 0, -1)
+    counter = np.diff(csr.indptr)
+
+    frontier = np.flatnonzero(attr)
+    level = 0
+    while len(frontier) > 0:
+        level += 1
+
+        # In-edges of frontier with source outside attractor.
+        pos = gather_positions(csr.in_indptr, frontier)
+        preds = csr.in_indices[pos].astype(np.int64)
+        eids = csr.in_eids[pos]
+        keep = ~attr[preds]
+        preds, eids = preds[keep], eids[keep]
+
+        # Player nodes: attracted by any edge into attractor.
+        mine = is_player[preds]
+        p_nodes, first = np.unique(preds[mine], return_index=True)
+        strategy[p_nodes] = eids[mine][first]
+
+        # Opponent nodes: attracted once all out-edges lead into attractor.
+        o_nodes, num_edges = np.unique(preds[~mine], return_counts=True)
+        counter[o_nodes] -= num_edges
+        o_nodes = o_nodes[counter[o_nodes] == 0]
+
+        frontier = np.concatenate([p_nodes, o_nodes])
+        attr[frontier] = True
+        rank[frontier] = level
+
+    return attr, strategy, rank
+
+
+def solve_reachability(graph, final, player=P1, turn=None):
+    """
+    Solves the reachability game in which `player` aims to visit `final`.
+    If player is None, solves the one-player game (see `attractor`).
+
+    :return: 2-tuple (win, strategy) of
+        * win: (NodeArrayPropertyMap) True for nodes in the winning region of `player`.
+        * strategy: (EdgeArrayPropertyMap) True for edges chosen by the memoryless winning strategy of `player`.
+    """
+    csr = graph.freeze()
+    attr, strategy, _ = attractor(csr, final, player, turn)
+    return _to_property_maps(csr, attr, strategy)
+
+
+def solve_safety(graph, safe, player=P1, turn=None):
+    """
+    Solves the safety game in which `player` aims to stay within `safe` forever.
+    If player is None, solves the one-player game (see `attractor`).
+
+    :return: 2-tuple (win, strategy) of
+        * win: (NodeArrayPropertyMap) True for nodes in the winning region of `player`.
+        * strategy: (EdgeArrayPropertyMap) True for edges chosen by the memoryless winning strategy of `player`.
+    """
+    csr = graph.freeze()
+    n = csr.number_of_nodes()
+    if player is None:
+        player, turn = P1, np.full(n, P1, dtype=np.int64)
+    turn = _turn_array(csr, turn)
+    opponent = P2 if player == P1 else P1
+    opp_turn = np.where(turn == player, player, opponent)
+    attr, _, _ = attractor(csr, ~_as_mask(safe, n), opponent, opp_turn)
+    win = ~attr
+
+    # Player nodes choose any edge that stays within winning region.
+    src = csr.edge_sources()
+    stay = np.flatnonzero(win[src] & (turn[src] == player) & win[csr.indices])
+    nodes, first = np.unique(src[stay], return_index=True)
+    strategy = np.full(n, -1, dtype=np.int64)
+    strategy[nodes] = stay[first]
+    return _to_property_maps(csr, win, strategy)
+
+
+def _to_property_maps(csr, win, strategy):
+    win_map = NodeArrayPropertyMap(graph=csr, default=False, dtype=bool)
+    win_map[:] = win
+    strategy_map = EdgeArrayPropertyMap(graph=csr, default=False, dtype=bool)
+    strategy_map[strategy[strategy >= 0]] = True
+    return win_map, strategy_map
+
+
+def _turn_array(csr, turn):
+    if turn is None:
+        if not csr.has_node_property("turn"):
+            raise ValueError(f"{repr(csr)} has no `turn` node property. "
+                             f"Pass `turn` explicitly, or `player=None` for a one-player game.")
+        turn = csr.node_property_array("turn", dtype=np.int64)
+    turn = np.asarray(turn)
+    unset = np.count_nonzero((turn != P1) & (turn != P2))
+    if unset > 0:
+        raise ValueError(f"Turn of {unset} nodes of {repr(csr)} is not P1 or P2. "
+                         f"Pass `player=None` for a one-player game.")
+    return turn
+
+
+def _as_mask(nodes, n):
+    nodes = np.asarray(nodes)
+    if nodes.dtype == bool:
+        return nodes.copy()
+    mask = np.zeros(n, dtype=bool)
+    mask[nodes] = True
+    return mask
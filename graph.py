@@ -1,6 +1,12 @@
+import copy
+import json
 import pickle
 import os.path
 import networkx as nx
+import numpy as np
+import scipy.sparse as sp
+import nx_view
+import reachability
 
 
 class Graph:
@@ -11,15 +17,18 @@ class Graph:
         3. inv_edges: stores a dictionary of in-edges in format {v: set(u)}
         4. v_props: dictionary of node properties to NodePropertyMap() object.
         5. e_props: dictionary of edge properties to EdgePropertyMap() object.
-        6. any user defined graph properties.
+        6. tombstones: dictionary of removed edges in format {(u, v): set(k)}. Removed edges keep their keys
+            in `edges`, `inv_edges` (the graph is append-only) and are skipped by all graph methods.
+        7. any user defined graph properties.
     """
     def __init__(self, *args, **kwargs):
         self._nodes = -1
-        self._num_edges = -1
+        self._num_edges = 0
         self._edges = dict()
         self._inv_edges = dict()
         self._v_props = dict()
         self._e_props = dict()
+        self._tombstones = dict()
 
     def __repr__(self):
         return f"<Graph with |V|={self.number_of_nodes()}, |E|={self.number_of_edges()}>"
@@ -36,9 +45,14 @@ class Graph:
             "_inv_edges": self._inv_edges,
             "_v_props": self._v_props,
             "_e_props": self._e_props,
+            "_tombstones": self._tombstones,
         }
         return serialized_graph
 
+    def __setstate__(self, state):
+        # Graphs pickled before edge removal was supported have no tombstones.
+        self.__dict__ |= {"_tombstones": dict()} | state
+
     def add_node(self, **kwargs):
         # Add node
         self._nodes += 1
@@ -124,20 +138,99 @@ class Graph:
 
         return edges
 
+    def add_edges_from_arrays(self, u, v, **kwargs):
+        """
+        Adds multiple edges (u[i], v[i]) to graph in one bulk insert.
+
+        :param u: (iterable of int) source nodes.
+        :param v: (iterable of int) target nodes.
+        :param kwargs: {property-name: iterable of property values}, one value per edge.
+        """
+        u = np.asarray(u, dtype=np.int64).reshape(-1)
+        v = np.asarray(v, dtype=np.int64).reshape(-1)
+        assert len(u) == len(v), f"Expected u, v of equal length. Received {len(u)}, {len(v)}."
+        if len(u) == 0:
+            return
+        assert max(u.max(), v.max()) <= self._nodes and min(u.min(), v.min()) >= 0, f"u or v is not in graph."
+
+        # Distinct pairs (u, v) of batch, sorted by (u, v). The edges of a pair get keys base, base + 1, ...
+        # (in batch order), where base is one more than the largest key of the pair in graph (or 0).
+        n = self._nodes + 1
+        codes = u * n + v
+        order = np.argsort(codes, kind="stable")
+        pairs, first, counts = np.unique(codes[order], return_index=True, return_counts=True)
+        pair_u, pair_v = np.divmod(pairs, n)
+        base = np.zeros(len(pairs), dtype=np.int64)
+
+        # Update adjacency (data structure: edges), one dictionary update per source node.
+        edges = self._edges
+        src, src_first = np.unique(pair_u, return_index=True)
+        bounds = np.append(src_first, len(pairs)).tolist()
+        pair_v_list = pair_v.tolist()
+        for ui, s, e in zip(src.tolist(), bounds[:-1], bounds[1:]):
+            succ_u = edges.get(ui)
+            if succ_u is None:
+                edges[ui] = dict(zip(pair_v_list[s:e], (counts[s:e] - 1).tolist()))
+            else:
+                base[s:e] = [succ_u.get(vi, -1) + 1 for vi in pair_v_list[s:e]]
+                succ_u.update(zip(pair_v_list[s:e], (base[s:e] + counts[s:e] - 1).tolist()))
+
+        #   (data structure: inv_edges), one set update per target node.
+        inv_edges = self._inv_edges
+        inv_order = np.argsort(pair_v, kind="stable")
+        dst, dst_first = np.unique(pair_v[inv_order], return_index=True)
+        bounds = np.append(dst_first, len(pairs)).tolist()
+        pred_list = pair_u[inv_order].tolist()
+        for vi, s, e in zip(dst.tolist(), bounds[:-1], bounds[1:]):
+            pred_v = inv_edges.get(vi)
+            if pred_v is None:
+                inv_edges[vi] = set(pred_list[s:e])
+            else:
+                pred_v.update(pred_list[s:e])
+
+        # Update properties. Edge properties of a graph are dictionaries keyed by (u, v, k).
+        props = [(self._e_props[p_name], values) for p_name, values in kwargs.items() if p_name in self._e_props]
+        if props:
+            k = np.empty(len(u), dtype=np.int64)
+            k[order] = np.repeat(base - first, counts) + np.arange(len(u))
+            new_edges = list(zip(u.tolist(), v.tolist(), k.tolist()))
+            for p_map, values in props:
+                if isinstance(p_map, dict):
+                    p_map.update(zip(new_edges, values))
+                else:
+                    for edge, value in zip(new_edges, values):
+                        p_map[edge] = value
+
+        # Update edge count
+        self._num_edges += len(u)
+
     def rem_node(self, node):
-        raise NotImplementedError("Node removal operation is not allowed. Use GraphView to filter nodes.")
+        raise NotImplementedError("Node removal operation is not allowed. Use SubGraph to filter nodes.")
 
-    def rem_edge(self, u, v, k):
+    def rem_edge(self, u, v, k=None):
         """
         Removes edge (u, v, k) from graph.
         If `k = None`, then all edges between (u, v) are removed.
 
-        :param u:
-        :param v:
-        :param k:
-        :return:
+        The edge is marked by a tombstone: its key is not reused (edges added later between (u, v) get new keys)
+        and its edge properties are deleted (array-backed properties keep their values, which are no longer read). Keys of the remaining edges are renumbered by `freeze()`.
+
+        :return: (list) removed edges (u, v, k).
         """
-        raise NotImplementedError("rem_edge operation is not allowed. Use GraphView to filter edges.")
+        if not self.has_edge((u, v) if k is None else (u, v, k)):
+            raise ValueError(f"{repr(self)} does not contain edge {(u, v) if k is None else (u, v, k)}.")
+
+        dead = self._tombstones.setdefault((u, v), set())
+        keys = range(self._edges[u][v] + 1) if k is None else [k]
+        removed = [(u, v, key) for key in keys if key not in dead]
+        dead.update(key for _, _, key in removed)
+        for p_map in self._e_props.values():
+            # Array-backed maps (of a loaded graph) are indexed by edge id. Their values are skipped by tombstone.
+            if isinstance(p_map, dict):
+                for edge in removed:
+                    p_map.pop(edge, None)
+        self._num_edges -= len(removed)
+        return removed
 
     def has_node(self, node):
         return node <= self._nodes
@@ -154,11 +247,13 @@ class Graph:
         try:
             if len(edge) == 2:
                 return edge[0] in self._edges and \
-                       edge[1] in self._edges[edge[0]]
+                       edge[1] in self._edges[edge[0]] and \
+                       self._num_live(edge[0], edge[1]) > 0
             else:   # len(edge) == 3:
                 return edge[0] in self._edges and \
                        edge[1] in self._edges[edge[0]] and \
-                       edge[2] <= self._edges[edge[0]][edge[1]]
+                       0 <= edge[2] <= self._edges[edge[0]][edge[1]] and \
+                       edge[2] not in self._tombstones.get((edge[0], edge[1]), ())
         except KeyError:
             pass
 
@@ -170,7 +265,7 @@ class Graph:
     def edges(self, u=None, v=None):
         for u in self._edges:
             for v in self._edges[u]:
-                for k in range(self._edges[u][v] + 1):
+                for k in self._keys(u, v):
                     yield u, v, k
 
     def successors(self, node):
@@ -178,14 +273,16 @@ class Graph:
             return
 
         for v in self._edges[node]:
-            yield v
+            if not self._tombstones or self._num_live(node, v) > 0:
+                yield v
 
     def predecessors(self, node):
         if node not in self._inv_edges:
             return
 
         for u in self._inv_edges[node]:
-            yield u
+            if not self._tombstones or self._num_live(u, node) > 0:
+                yield u
 
     def neighbors(self, node):
         for v in self.successors(node):
@@ -195,43 +292,37 @@ class Graph:
             yield u
 
     def descendants(self, node):
-        if node not in self._edges:
-            return
-
-        # Initialize queue
-        queue = [u for u in self.successors(node)]
         visited = set()
+        queue = [u for u in self.successors(node)]
+        visited.update(queue)
         while len(queue) > 0:
             u = queue.pop()
             yield u
-            visited.add(u)
-            succ_u = set(self.successors(u)) - visited
-            for v in succ_u:
-                queue.append(v)
+            for v in self.successors(u):
+                if v not in visited:
+                    visited.add(v)
+                    queue.append(v)
 
     def ancestors(self, node):
-        if node not in self._inv_edges:
-            return
-
-        # Initialize queue
-        queue = [v for v in self.predecessors(node)]
         visited = set()
+        queue = [v for v in self.predecessors(node)]
+        visited.update(queue)
         while len(queue) > 0:
             v = queue.pop()
             yield v
-            visited.add(v)
-            pred_v = set(self.predecessors(v)) - visited
-            for u in pred_v:
-                queue.append(u)
+            for u in self.predecessors(v):
+                if u not in visited:
+                    visited.add(u)
+                    queue.append(u)
 
     def in_edges(self, node):
         for u in self.predecessors(node):
-            for k in range(self._edges[u][node] + 1):
+            for k in self._keys(u, node):
                 yield u, node, k
 
     def out_edges(self, node):
         for v in self.successors(node):
-            for k in range(self._edges[node][v] + 1):
+            for k in self._keys(node, v):
                 yield node, v, k
 
     def number_of_nodes(self):
@@ -246,14 +337,95 @@ class Graph:
 
     def clear(self):
         self._nodes = -1
+        self._num_edges = 0
         self._edges = dict()
         self._inv_edges = dict()
         self._v_props = dict()
         self._e_props = dict()
+        self._tombstones = dict()
 
-    def add_node_property(self, name, default=None):
+    def freeze(self, dtypes=None):
+        """
+        Packs the graph into an immutable `CSRGraph`.
+
+        Node and edge properties are re-bound to the frozen graph. Graph properties, i.e. public
+        non-callable instance attributes (such as `dim` or `map_state2node` of a `GraphTS`), are carried over.
+
+        :param dtypes: (dict) {property-name: dtype}. Named properties are converted to array-backed
+            property maps of given dtype (use "category" for dictionary-encoded values).
+        :return: (CSRGraph) frozen copy of the graph.
+
+        :note: If edges were removed, keys of remaining edges between (u, v) are renumbered to 0, 1, ...
+            in the frozen graph (in order of their keys), and their edge properties are re-keyed accordingly.
+        """
+        if self._tombstones:
+            return self._compacted().freeze(dtypes)
+
+        # Collect (u, v, multiplicity) triples from nested edge dictionary.
+        src, dst, mult = [], [], []
+        for u, succ_u in self._edges.items():
+            for v, k in succ_u.items():
+                src.append(u)
+                dst.append(v)
+                mult.append(k + 1)
+
+        # Expand multiplicities into (u, v, k) edge arrays.
+        mult = np.asarray(mult, dtype=np.int64)
+        offsets = np.repeat(np.cumsum(mult) - mult, mult)
+        u = np.repeat(np.asarray(src, dtype=np.int64), mult)
+        v = np.repeat(np.asarray(dst, dtype=np.int64), mult)
+        k = np.arange(len(offsets), dtype=np.int64) - offsets
+
+        csr = CSRGraph.from_edge_arrays(self.number_of_nodes(), u, v, k)
+        _copy_properties(self, csr, dtypes)
+        return csr
+
+    def _keys(self, u, v):
+        """ Keys of edges (not removed) between (u, v). """
+        dead = self._tombstones.get((u, v)) if self._tombstones else None
+        if dead is None:
+            return range(self._edges[u][v] + 1)
+        return [k for k in range(self._edges[u][v] + 1) if k not in dead]
+
+    def _num_live(self, u, v):
+        return self._edges[u][v] + 1 - len(self._tombstones.get((u, v), ()))
+
+    def _compacted(self):
+        """
+        Returns a shallow copy of graph without tombstones, in which the keys of edges between (u, v) are
+        renumbered to 0, 1, ... and edge properties are re-keyed accordingly. The graph itself is not modified.
+        """
+        graph = object.__new__(type(self))
+        graph.__dict__.update(self.__dict__)
+        graph._edges = {u: dict(succ_u) for u, succ_u in self._edges.items()}
+        graph._tombstones = dict()
+        rekey = dict()
+        for (u, v), dead in self._tombstones.items():
+            keys = self._keys(u, v)
+            if len(keys) == 0:
+                del graph._edges[u][v]
+            else:
+                graph._edges[u][v] = len(keys) - 1
+            rekey.update(((u, v, k), (u, v, i)) for i, k in enumerate(keys) if k != i)
+
+        graph._e_props = dict()
+        for name, p_map in self._e_props.items():
+            new_map = copy.copy(p_map)
+            if rekey:
+                moved = {rekey[edge]: new_map.pop(edge) for edge in rekey if edge in new_map}
+                new_map.update(moved)
+            graph._e_props[name] = new_map
+        return graph
+
+    def add_node_property(self, name, default=None, dtype=None):
+        """
+        Adds a node property. If `dtype` is given, the property is stored in a `NodeArrayPropertyMap`.
+        """
         if name not in self._v_props:
-            self._v_props[name] = NodePropertyMap(graph=self, default=default)
+            if dtype is None:
+                self._v_props[name] = NodePropertyMap(graph=self, default=default)
+            else:
+                self._v_props[name] = NodeArrayPropertyMap(graph=self, default=default, dtype=dtype)
         # else:
             # logging.debug(f"add_node_property({name}) made no changes.")
 
@@ -261,8 +433,14 @@ class Graph:
         return name in self._v_props
 
     def get_node_property(self, name, node):
+        """
+        Returns the value of node property. Labels of labeled graphs (with `label_masks` and `atom_index`
+        attributes) are not stored as a node property; `label` is decoded from `label_masks` instead.
+        """
         if self.has_node_property(name) and self.has_node(node):
             return self._v_props[name][node]
+        if name == "label" and getattr(self, "label_masks", None) is not None and self.has_node(node):
+            return self.atom_index.decode(self.label_masks[node])
         raise ValueError(f"Either {name} is not valid node property or {node} is not in graph.")
 
     def set_node_property(self, name, node, value):
@@ -271,9 +449,16 @@ class Graph:
         else:
             raise ValueError(f"Either {name} is not valid node property or {node} is not in graph.")
 
-    def add_edge_property(self, name, default=None):
+    def add_edge_property(self, name, default=None, dtype=None):
+        """
+        Adds an edge property. If `dtype` is given, the property is stored in an `EdgeArrayPropertyMap`.
+        Array-backed edge properties require dense edge ids, i.e. a frozen graph (see `freeze()`).
+        """
         if name not in self._e_props:
-            self._e_props[name] = EdgePropertyMap(graph=self, default=default)
+            if dtype is None:
+                self._e_props[name] = EdgePropertyMap(graph=self, default=default)
+            else:
+                self._e_props[name] = EdgeArrayPropertyMap(graph=self, default=default, dtype=dtype)
         # else:
             # logging.debug(f"add_edge_property({name}) made no changes.")
 
@@ -291,94 +476,192 @@ class Graph:
         else:
             raise ValueError(f"Either {name} is not valid edge property or {edge} is not in graph.")
 
-    def to_nx_graph(self):
-        nx_graph = nx.MultiDiGraph()
-
-        for node in range(self._nodes + 1):
-            node_props = {p_name: self._v_props[p_name][node] for p_name in self._v_props}
-            nx_graph.add_node(node, **node_props)
+    def to_nx_graph(self, node_properties=None, edge_properties=None, multigraph=True, view=False):
+        """
+        Converts the graph into a networkx graph. Nodes and edges are inserted in bulk.
+
+        :param node_properties: (iterable of str or None) node properties to copy as node attributes. Defaults to all.
+        :param edge_properties: (iterable of str or None) edge properties to copy as edge attributes. Defaults to all.
+        :param multigraph: (bool) If False, parallel edges are collapsed into a `networkx.DiGraph`.
+            Attributes of a collapsed edge are those of the edge with the largest key.
+        :param view: (bool) If True, returns a read-only view that reads adjacency and properties from
+            this graph on demand instead of copying them (see `nx_view.view()`).
+        :return: (networkx.MultiDiGraph or networkx.DiGraph)
+        """
+        if view:
+            return nx_view.view(self, node_properties, edge_properties, multigraph)
+
+        node_properties = list(self._v_props if node_properties is None else node_properties)
+        edge_properties = list(self._e_props if edge_properties is None else edge_properties)
+        csr = self.freeze()
+        n, m = csr.number_of_nodes(), csr.number_of_edges()
+
+        # Materialize one column of values per property, then zip columns into attribute dicts.
+        node_attrs = _attr_dicts(node_properties, [csr.node_property_array(name) for name in node_properties], n)
+        edge_attrs = _attr_dicts(edge_properties, [csr.edge_property_array(name) for name in edge_properties], m)
+
+        u, v, k = csr.edge_sources().tolist(), csr.indices.tolist(), csr.keys.tolist()
+        nx_graph = nx.MultiDiGraph() if multigraph else nx.DiGraph()
+        nx_graph.add_nodes_from(zip(csr.nodes(), node_attrs))
+        if not multigraph:
+            nx_graph.add_edges_from(zip(u, v, edge_attrs))
+            return nx_graph
+
+        # MultiDiGraph.add_edges_from() resolves keys edge by edge. Since keys are known, fill the
+        # adjacency dicts {u: {v: {k: attrs}}} directly (succ and pred share the key dict, as in networkx).
+        succ, pred = nx_graph._succ, nx_graph._pred
+        for ui, vi, ki, attrs in zip(u, v, k, edge_attrs):
+            key_dict = succ[ui].get(vi)
+            if key_dict is None:
+                key_dict = succ[ui][vi] = pred[vi][ui] = dict()
+            key_dict[ki] = attrs
+        nx_graph.__networkx_cache__.clear()
+        return nx_graph
 
-        for u, v, k in self.edges():
-            edge_props = {p_name: self._e_props[p_name][(u, v, k)] for p_name in self._e_props}
-            nx_graph.add_edge(u, v, key=k, **edge_props)
+    def to_numpy(self, weight=None, by=None):
+        """
+        Exports the graph as a `scipy.sparse` CSR matrix of shape (|V|, |V|). Parallel edges are summed.
 
-        return nx_graph
+        :param weight: (str or None) edge property holding the entry of every edge (e.g. "prob").
+            If None, entry (u, v) is the number of edges from u to v.
+        :param by: (str or None) edge property (e.g. "action") by which edges are sliced.
+            If given, returns a dict {value: matrix} with one matrix per distinct value of the property.
+        :return: (scipy.sparse.csr_matrix or dict)
+        """
+        csr = self.freeze()
+        n = csr.number_of_nodes()
+        rows = csr.edge_sources().astype(np.int64)
+        data = np.ones(len(rows)) if weight is None else csr.edge_property_array(weight, dtype=np.float64)
+        if by is None:
+            return sp.csr_matrix((data, (rows, csr.indices)), shape=(n, n))
+
+        # Stack one (|V|, |V|) block per value and slice the blocks (a single sort of all edges).
+        # Values are interned in order of first occurrence (values need not be comparable, e.g. None and str).
+        value2id = dict()
+        inverse = np.fromiter((value2id.setdefault(value, len(value2id)) for value in csr.edge_property_array(by)),
+                              dtype=np.int64, count=csr.number_of_edges())
+        stacked = sp.csr_matrix((data, (inverse * n + rows, csr.indices)), shape=(len(value2id) * n, n))
+        return {value: stacked[i * n: (i + 1) * n] for value, i in value2id.items()}
+
+    @classmethod
+    def from_sparse(cls, matrix, weight=None, by=None):
+        """
+        Constructs a graph from a sparse matrix (inverse of `to_numpy()`).
 
-    def to_numpy(self):
-        raise NotImplementedError("to_nx_graph")
+        :param matrix: (scipy.sparse matrix or dict) (|V|, |V|) matrix, or {value: matrix} if `by` is given.
+        :param weight: (str or None) If given, every non-zero entry becomes one edge, and the entry is stored as
+            edge property `weight`. Otherwise, entry (u, v) is the (integer) number of edges from u to v.
+        :param by: (str or None) edge property in which the key of every matrix in `matrix` dict is stored.
+        :return: (Graph)
+        """
+        blocks = dict(matrix) if by is not None else {None: matrix}
+        keys = list(blocks)
+        num_nodes = blocks[keys[0]].shape[0]
+
+        # Stack blocks: row `i * |V| + u` of stacked matrix is row u of i-th block.
+        stacked = sp.vstack([sp.csr_matrix(block) for block in blocks.values()]).tocoo()
+        keep = stacked.data != 0
+        values, u = np.divmod(stacked.row[keep].astype(np.int64), num_nodes)
+        v, data = stacked.col[keep], stacked.data[keep]
+
+        # Without weights, an entry counts parallel edges.
+        if weight is None:
+            mult = data.astype(np.int64)
+            u, v, values = np.repeat(u, mult), np.repeat(v, mult), np.repeat(values, mult)
+
+        graph = cls()
+        if num_nodes > 0:
+            graph.add_nodes(num_nodes)
+        e_props = dict()
+        if weight is not None:
+            graph.add_edge_property(weight)
+            e_props[weight] = data.tolist()
+        if by is not None:
+            graph.add_edge_property(by)
+            e_props[by] = [keys[i] for i in values.tolist()]
+        graph.add_edges_from_arrays(u, v, **e_props)
+        return graph
 
     def to_esr_graph(self):
         return self
 
     def to_gen_graph(self):
-        raise NotImplementedError("to_nx_graph")
+        raise NotImplementedError("to_gen_graph")
+
+    def to_bdd_graph(self, bdd=None):
+        """
+        Encodes the graph symbolically. Requires the `dd` package (see `symbolic` module).
 
-    def to_bdd_graph(self):
-        raise NotImplementedError("to_nx_graph")
+        :param bdd: (BDD or None) BDD manager. Defaults to a new manager.
+        :return: (symbolic.BDDGraph) transition system over node ids, labeled by `action` edge property (if any).
+        """
+        import symbolic     # Optional dependency (dd).
+        return symbolic.BDDGraph.from_graph(self, bdd)
 
-    def save(self, file):
+    def save(self, file, dtypes=None):
+        """
+        Saves graph to file. Supported formats:
+            * `.graph`: versioned binary container (see `CSRGraph._save_binary`). The graph is frozen before saving.
+
+        :param file: (str) path of file.
+        :param dtypes: (dict) {property-name: dtype} properties to store as arrays (see `freeze()`).
+        """
         ext = os.path.splitext(file)[1]
         if ext == ".graphml":
             raise NotImplementedError("save-load functionality for graphml is not ready.")
             # self._save_graphml(file)
         elif ext == ".graph":
-            self._save_pickle(file)
+            self.freeze(dtypes)._save_binary(file)
         else:
             raise ValueError(f"Given file has extension: {ext}. Supported extensions: ['.graph']")
 
-    # FIXME: make static, return graph.
-    def load(self, file):
-        self.clear()
+    @classmethod
+    def load(cls, file, mmap=True):
+        """
+        Loads a graph from file.
+
+        :param file: (str) path of file.
+        :param mmap: (bool) If True, arrays in binary `.graph` files are memory-mapped (read-only).
+        :return: (CSRGraph) for binary `.graph` files, or (Graph) for `.graph` files saved by older versions (pickle).
+        """
         ext = os.path.splitext(file)[1]
         if ext == ".graphml":
-            # raise NotImplementedError("save-load functionality for graphml is not ready.")
-            self._load_graphml(file)
+            raise NotImplementedError("save-load functionality for graphml is not ready.")
+            # return cls._load_graphml(file)
         elif ext == ".graph":
-            self._load_pickle(file)
+            with open(file, "rb") as graph_file:
+                magic = graph_file.read(len(GRAPH_FILE_MAGIC))
+            if magic == GRAPH_FILE_MAGIC:
+                return CSRGraph._load_binary(file, mmap)
+            return cls._load_pickle(file)
         else:
             raise ValueError(f"Given file has extension: {ext}. Supported extensions: ['.graph']")
 
-    def _save_pickle(self, file):
-        serialized_graph = {
-            "type": "multidigraph",
-            "num_nodes": self.number_of_nodes(),
-            "num_edges": self.number_of_edges(),
-            "edges": self._edges,
-            "node_properties": self._v_props,
-            "edge_properties": self._e_props,
-            "graph_properties": "todo"
-        }
-        with open(file, "wb") as graph_file:
-            pickle.dump(serialized_graph, graph_file)
-
-    def _load_pickle(self, file):
+    @classmethod
+    def _load_pickle(cls, file):
+        """ Loads `.graph` files saved (using pickle) by older versions. """
         with open(file, "rb") as graph_file:
             serialized_graph = pickle.load(graph_file)
 
         assert serialized_graph["type"] == "multidigraph", f"Expected type of graph to be multidigraph"
-        self._nodes = serialized_graph["num_nodes"] - 1
-        self._num_edges = serialized_graph["num_edges"]
-        self._edges = serialized_graph["edges"]
-        self._v_props = serialized_graph["node_properties"]
-        self._e_props = serialized_graph["edge_properties"]
+        graph = cls()
+        graph._nodes = serialized_graph["num_nodes"] - 1
+        graph._num_edges = serialized_graph["num_edges"]
+        graph._edges = serialized_graph["edges"]
+        graph._v_props = serialized_graph["node_properties"]
+        graph._e_props = serialized_graph["edge_properties"]
+        for p_map in list(graph._v_props.values()) + list(graph._e_props.values()):
+            p_map.graph = graph
 
         # Construct inv_edges
-        for u in self._edges:
-            for v in self._edges[u]:
-                if v not in self._inv_edges:
-                    self._inv_edges[v] = {u}
+        for u in graph._edges:
+            for v in graph._edges[u]:
+                if v not in graph._inv_edges:
+                    graph._inv_edges[v] = {u}
                 else:
-                    self._inv_edges[v].add(u)
-
-        # serialized_graph = {
-        #     "type": "multidigraph",
-        #     "num_nodes": self.number_of_nodes(),
-        #     "num_edges": self.number_of_edges(),
-        #     "edges": list(self.edges()),
-        #     "node_properties": self._v_props,
-        #     "edge_properties": self._e_props,
-        #     "graph_properties": "todo"
-        # }
+                    graph._inv_edges[v].add(u)
+
+        return graph
 
     def _save_graphml(self, file):
         pass
@@ -431,3 +714,776 @@ class EdgePropertyMap(dict):
             return dict.__getitem__(self, edge)
         except KeyError:
             return self.__missing__(edge)
+
+
+class _ArrayPropertyMap:
+    """
+    Base class of property maps backed by a NumPy array.
+
+    When `dtype="category"`, values are dictionary-encoded: `categories` stores the distinct values
+    (with `default` at code 0) and the array stores the codes as small unsigned integers.
+
+    The backing `array` grows geometrically, so it may be longer than the number of nodes (edges) of the graph.
+    Only its first `len(p_map)` entries are values; all accessors are restricted to them.
+    """
+    def __init__(self, graph=None, default=None, dtype=None):
+        self.graph = graph
+        self.default = default
+        self.categorical = dtype == "category"
+        if self.categorical:
+            self.categories = [default]
+            self._codes = {default: 0}
+            self.array = np.zeros(self._size(), dtype=np.uint8)
+        else:
+            self.array = np.full(self._size(), default, dtype=dtype)
+
+    def __len__(self):
+        return self._size()
+
+    def __getitem__(self, key):
+        idx = self._index(key)
+        value = self._values()[idx]
+        if self.categorical:
+            if np.ndim(value) == 0:
+                return self.categories[value]
+            return _object_array(self.categories)[value]
+        return value.item() if np.ndim(value) == 0 else value
+
+    def __setitem__(self, key, value):
+        idx = self._index(key)
+        values = self._values()
+        if self.categorical:
+            if np.ndim(idx) == 0 and not isinstance(idx, slice):
+                value = self.encode(value)
+            else:
+                value = [self.encode(val) for val in value] if isinstance(value, (list, tuple, np.ndarray)) \
+                    else self.encode(value)
+            values = self._values()     # encode() may widen the dtype of array.
+        values[idx] = value
+
+    @property
+    def dtype(self):
+        return self.array.dtype
+
+    @property
+    def nbytes(self):
+        return self.array.nbytes
+
+    def encode(self, value):
+        """ Returns the code of a categorical value. Unseen values are added to `categories`. """
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self.categories)
+            self.categories.append(value)
+            self._codes[value] = code
+            if code > np.iinfo(self.array.dtype).max:
+                self.array = self.array.astype(np.min_scalar_type(2 * code))
+        return code
+
+    def codes(self, key=slice(None)):
+        """ Returns the raw (encoded) array values. """
+        return self._values()[self._index(key)]
+
+    def _values(self):
+        """ Returns the view of array that holds the values (without spare capacity). """
+        self._fit()
+        return self.array[:self._size()]
+
+    def _fit(self):
+        size = self._size()
+        if len(self.array) < size:
+            fill = 0 if self.categorical else self.default
+            ext = np.full(max(size, 2 * len(self.array)) - len(self.array), fill, dtype=self.array.dtype)
+            self.array = np.concatenate([self.array, ext])
+
+    def _size(self):
+        raise NotImplementedError
+
+    def _index(self, key):
+        raise NotImplementedError
+
+    def _check_bounds(self, idx, size, msg):
+        if isinstance(idx, slice):
+            return idx
+        if np.ndim(idx) == 0:
+            if not 0 <= idx < size:
+                raise ValueError(msg)
+            return idx
+        idx = np.asarray(idx)
+        if idx.dtype == bool:
+            if len(idx) != size:
+                raise ValueError(msg)
+            return np.flatnonzero(idx)
+        if len(idx) > 0 and (idx.min() < 0 or idx.max() >= size):
+            raise ValueError(msg)
+        return idx
+
+
+class NodeArrayPropertyMap(_ArrayPropertyMap):
+    """
+    Node property map backed by a NumPy array indexed by node id.
+    Supports vectorized access: `prop[array_of_nodes]`, `prop[mask]`.
+    """
+    def __repr__(self):
+        return f"<NodeArrayPropertyMap dtype={self.dtype} graph={repr(self.graph)}>"
+
+    def _size(self):
+        return 0 if self.graph is None else self.graph.number_of_nodes()
+
+    def _index(self, node):
+        return self._check_bounds(
+            node, self._size(),
+            f"[ERROR] NodeArrayPropertyMap:: {repr(self.graph)} does not contain node(s) {node}."
+        )
+
+
+class EdgeArrayPropertyMap(_ArrayPropertyMap):
+    """
+    Edge property map backed by a NumPy array indexed by dense edge id.
+    Supports vectorized access: `prop[array_of_edge_ids]`, `prop[mask]`. Edges may also be given as (u, v, k).
+
+    :note: The graph must provide dense edge ids (e.g. `CSRGraph`).
+    """
+    def __init__(self, graph=None, default=None, dtype=None):
+        if graph is not None and not hasattr(graph, "edge_id"):
+            raise TypeError(f"EdgeArrayPropertyMap requires a graph with dense edge ids. "
+                            f"Use {type(graph).__name__}.freeze() to construct one.")
+        super(EdgeArrayPropertyMap, self).__init__(graph, default, dtype)
+
+    def __repr__(self):
+        return f"<EdgeArrayPropertyMap dtype={self.dtype} graph={repr(self.graph)}>"
+
+    def _size(self):
+        return 0 if self.graph is None else self.graph.number_of_edges()
+
+    def _index(self, edge):
+        if isinstance(edge, tuple):
+            return self.graph.edge_id(edge)
+        return self._check_bounds(
+            edge, self._size(),
+            f"[ERROR] EdgeArrayPropertyMap:: {repr(self.graph)} does not contain edge(s) {edge}."
+        )
+
+
+class CSRGraph(Graph):
+    """
+    Immutable multi-digraph in compressed sparse row (CSR) format. Use `Graph.freeze()` to construct one.
+
+    Graph representation:
+        1. indptr, indices, keys: out-edges of node u are (u, indices[i], keys[i]) for i in range(indptr[u], indptr[u + 1]).
+            Out-edges are sorted by (v, k). The position `i` is the (dense) edge id of edge (u, v, k).
+        2. in_indptr, in_indices, in_keys: in-edges of node v are (in_indices[j], v, in_keys[j])
+            for j in range(in_indptr[v], in_indptr[v + 1]). in_eids[j] is the edge id of that edge.
+        3. v_props: dictionary of node properties to NodePropertyMap() object.
+        4. e_props: dictionary of edge properties to EdgePropertyMap() object.
+        5. any user defined graph properties.
+    """
+    def __init__(self, num_nodes=0, indptr=None, indices=None, keys=None):
+        super(CSRGraph, self).__init__()
+        self._nodes = num_nodes - 1
+        self.indptr = np.zeros(num_nodes + 1, dtype=np.int64) if indptr is None else indptr
+        self.indices = np.zeros(0, dtype=_index_dtype(num_nodes)) if indices is None else indices
+        self.keys = np.zeros(0, dtype=np.int32) if keys is None else keys
+        self._num_edges = len(self.indices)
+
+        # Construct in-edges
+        src = np.repeat(np.arange(num_nodes, dtype=self.indices.dtype), np.diff(self.indptr))
+        order = np.lexsort((self.keys, src, self.indices))
+        self.in_indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.indices, minlength=num_nodes), out=self.in_indptr[1:])
+        self.in_indices = src[order]
+        self.in_keys = self.keys[order]
+        self.in_eids = order.astype(np.int64)
+
+    def __repr__(self):
+        return f"<CSRGraph with |V|={self.number_of_nodes()}, |E|={self.number_of_edges()}>"
+
+    def __getstate__(self):
+        serialized_graph = {
+            "type": "csr-multidigraph",
+            "_nodes": self._nodes,
+            "_num_edges": self._num_edges,
+            "indptr": self.indptr,
+            "indices": self.indices,
+            "keys": self.keys,
+            "in_indptr": self.in_indptr,
+            "in_indices": self.in_indices,
+            "in_keys": self.in_keys,
+            "in_eids": self.in_eids,
+            "_v_props": self._v_props,
+            "_e_props": self._e_props,
+        }
+        # Graph properties (public attributes, e.g. `actions`), as copied by `freeze()`.
+        for name, value in self.__dict__.items():
+            if not name.startswith("_") and not callable(value) and name not in _CSR_ARRAYS:
+                serialized_graph[name] = value
+        return serialized_graph
+
+    def __setstate__(self, state):
+        self.__dict__ |= {k: v for k, v in state.items() if k != "type"}
+        self._edges = dict()
+        self._inv_edges = dict()
+
+    @classmethod
+    def from_edge_arrays(cls, num_nodes, u, v, k):
+        """
+        Constructs a CSRGraph from arrays of edges.
+
+        :param num_nodes: (int) number of nodes.
+        :param u: (np.ndarray) source node of every edge.
+        :param v: (np.ndarray) target node of every edge.
+        :param k: (np.ndarray) key of every edge. Keys of edges between (u, v) must be 0, 1, ..., in any order.
+        :return: (CSRGraph)
+        """
+        u = np.asarray(u, dtype=np.int64)
+        v = np.asarray(v, dtype=np.int64)
+        k = np.asarray(k, dtype=np.int64)
+        order = np.lexsort((k, v, u))
+
+        indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(u, minlength=num_nodes), out=indptr[1:])
+        indices = v[order].astype(_index_dtype(num_nodes))
+        keys = k[order].astype(np.int32)
+        return cls(num_nodes, indptr, indices, keys)
+
+    @classmethod
+    def from_sparse(cls, matrix, weight=None, by=None):
+        """ Constructs a frozen graph from a sparse matrix. See `Graph.from_sparse()`. """
+        return Graph.from_sparse(matrix, weight, by).freeze()
+
+    def add_node(self, **kwargs):
+        raise TypeError("CSRGraph is immutable.")
+
+    def add_nodes(self, num_nodes):
+        raise TypeError("CSRGraph is immutable.")
+
+    def add_nodes_from(self, list_of_props):
+        raise TypeError("CSRGraph is immutable.")
+
+    def add_edge(self, u, v, **kwargs):
+        raise TypeError("CSRGraph is immutable.")
+
+    def add_edges_from(self, list_of_edges):
+        raise TypeError("CSRGraph is immutable.")
+
+    def clear(self):
+        raise TypeError("CSRGraph is immutable.")
+
+    def freeze(self, dtypes=None):
+        """
+        Returns the graph itself, or a copy sharing the adjacency arrays if some properties are to be converted
+        to array-backed property maps (see `Graph.freeze()`).
+        """
+        if not dtypes:
+            return self
+        csr = copy.copy(self)
+        csr._v_props = dict()
+        csr._e_props = dict()
+        _copy_properties(self, csr, dtypes)
+        return csr
+
+    def has_node(self, node):
+        return 0 <= node <= self._nodes
+
+    def has_edge(self, edge):
+        """
+        Expects an edge of type (u, v) or (u, v, k).
+        In former case, check if there exists an edge between u, v.
+        In latter case, check if an edge with given `k` exists.
+        """
+        assert len(edge) in [2, 3], "Invalid edge. Edge must be in (u, v) or (u, v, k) format."
+        return self._find_edge(edge) >= 0
+
+    def edge_id(self, edge):
+        """
+        Returns the dense edge id of edge (u, v, k). For an edge (u, v), returns the id of (u, v, 0).
+        """
+        eid = self._find_edge(edge)
+        if eid < 0:
+            raise ValueError(f"{repr(self)} does not contain edge {edge}.")
+        return eid
+
+    def edge(self, eid):
+        """ Returns the edge (u, v, k) with given dense edge id. """
+        u = int(np.searchsorted(self.indptr, eid, side="right")) - 1
+        return u, int(self.indices[eid]), int(self.keys[eid])
+
+    def edge_sources(self):
+        """ Returns an array with source node of every edge, indexed by edge id. """
+        return np.repeat(np.arange(self.number_of_nodes(), dtype=self.indices.dtype), np.diff(self.indptr))
+
+    def node_property_array(self, name, dtype=None):
+        """ Returns the values of node property for all nodes as an array indexed by node id. """
+        p_map = self._v_props[name]
+        if isinstance(p_map, _ArrayPropertyMap):
+            return np.asarray(p_map[:], dtype=dtype)
+        return _object_array([p_map.get(node, p_map.default) for node in self.nodes()], dtype)
+
+    def edge_property_array(self, name, dtype=None):
+        """ Returns the values of edge property for all edges as an array indexed by edge id. """
+        p_map = self._e_props[name]
+        if isinstance(p_map, _ArrayPropertyMap):
+            return np.asarray(p_map[:], dtype=dtype)
+        return _object_array([p_map.get(edge, p_map.default) for edge in self.edges()], dtype)
+
+    def nodes(self):
+        return range(self._nodes + 1)
+
+    def edges(self, u=None, v=None):
+        return zip(self.edge_sources().tolist(), self.indices.tolist(), self.keys.tolist())
+
+    def successors(self, node):
+        if not self.has_node(node):
+            return iter(())
+        s, e = self.indptr[node], self.indptr[node + 1]
+        return iter(self.indices[s:e][self.keys[s:e] == 0].tolist())
+
+    def predecessors(self, node):
+        if not self.has_node(node):
+            return iter(())
+        s, e = self.in_indptr[node], self.in_indptr[node + 1]
+        return iter(self.in_indices[s:e][self.in_keys[s:e] == 0].tolist())
+
+    def descendants(self, node):
+        return iter(reachability.descendants(self, node).tolist())
+
+    def ancestors(self, node):
+        return iter(reachability.ancestors(self, node).tolist())
+
+    def in_edges(self, node):
+        if not self.has_node(node):
+            return iter(())
+        s, e = self.in_indptr[node], self.in_indptr[node + 1]
+        return zip(self.in_indices[s:e].tolist(), [node] * (e - s), self.in_keys[s:e].tolist())
+
+    def out_edges(self, node):
+        if not self.has_node(node):
+            return iter(())
+        s, e = self.indptr[node], self.indptr[node + 1]
+        return zip([node] * (e - s), self.indices[s:e].tolist(), self.keys[s:e].tolist())
+
+    def _find_edge(self, edge):
+        u, v = edge[0], edge[1]
+        if not self.has_node(u):
+            return -1
+
+        # Out-edges of u are sorted by (v, k). Binary search for first edge (u, v, 0).
+        s, e = self.indptr[u], self.indptr[u + 1]
+        i = s + int(np.searchsorted(self.indices[s:e], v))
+        if i == e or self.indices[i] != v:
+            return -1
+        if len(edge) == 2:
+            return i
+
+        k = edge[2]
+        if 0 <= k and i + k < e and self.indices[i + k] == v:
+            return i + k
+        return -1
+
+    def _save_binary(self, file):
+        """
+        Saves graph to a versioned binary container with the following layout:
+            1. GRAPH_FILE_MAGIC (8 bytes), followed by length of header (uint64, little-endian).
+            2. JSON header: version, graph type, number of nodes/edges and a table {name: (dtype, shape, offset)}
+               of the stored arrays.
+            3. Arrays (each aligned to 64 bytes): CSR adjacency in both directions, array-backed properties,
+               graph properties that are NumPy arrays, and a pickled blob (`objects`) with property defaults,
+               categories, dict-backed properties and other graph properties.
+        """
+        arrays = {name: getattr(self, name) for name in _CSR_ARRAYS}
+        objects = {"node_properties": dict(), "edge_properties": dict(), "graph_properties": dict()}
+        for p_type, p_maps in (("node", self._v_props), ("edge", self._e_props)):
+            for name, p_map in p_maps.items():
+                if isinstance(p_map, _ArrayPropertyMap):
+                    arrays[f"{p_type}_property/{name}"] = p_map.codes()
+                    meta = {"default": p_map.default, "categories": p_map.categories if p_map.categorical else None}
+                else:
+                    meta = {"default": p_map.default, "values": dict(p_map)}
+                objects[f"{p_type}_properties"][name] = meta
+        for name, value in self.__dict__.items():
+            if name.startswith("_") or callable(value) or name in _CSR_ARRAYS:
+                continue
+            if isinstance(value, np.ndarray):
+                arrays[f"graph_property/{name}"] = value
+            else:
+                objects["graph_properties"][name] = value
+        arrays["objects"] = np.frombuffer(pickle.dumps(objects), dtype=np.uint8)
+
+        # Layout arrays
+        table = dict()
+        offset = 0
+        for name, arr in arrays.items():
+            table[name] = {"dtype": arr.dtype.str, "shape": list(arr.shape), "offset": offset}
+            offset = _align(offset + arr.nbytes)
+
+        header = json.dumps({
+            "version": GRAPH_FILE_VERSION,
+            "type": "csr-multidigraph",
+            "num_nodes": self.number_of_nodes(),
+            "num_edges": self.number_of_edges(),
+            "arrays": table,
+        }).encode("utf-8")
+        data_start = _align(len(GRAPH_FILE_MAGIC) + 8 + len(header))
+
+        with open(file, "wb") as graph_file:
+            graph_file.write(GRAPH_FILE_MAGIC)
+            graph_file.write(len(header).to_bytes(8, "little"))
+            graph_file.write(header)
+            for name, arr in arrays.items():
+                graph_file.seek(data_start + table[name]["offset"])
+                graph_file.write(np.ascontiguousarray(arr).tobytes())
+
+    @classmethod
+    def _load_binary(cls, file, mmap=True):
+        with open(file, "rb") as graph_file:
+            magic = graph_file.read(len(GRAPH_FILE_MAGIC))
+            assert magic == GRAPH_FILE_MAGIC, f"{file} is not a binary graph file."
+            header_len = int.from_bytes(graph_file.read(8), "little")
+            header = json.loads(graph_file.read(header_len).decode("utf-8"))
+        if header["version"] > GRAPH_FILE_VERSION:
+            raise ValueError(f"{file} has version {header['version']}. Supported versions: <= {GRAPH_FILE_VERSION}.")
+        data_start = _align(len(GRAPH_FILE_MAGIC) + 8 + header_len)
+
+        # Map (or read) arrays.
+        arrays = dict()
+        for name, spec in header["arrays"].items():
+            shape = tuple(spec["shape"])
+            if int(np.prod(shape)) == 0:
+                arrays[name] = np.zeros(shape, dtype=spec["dtype"])
+            elif mmap:
+                arrays[name] = np.memmap(file, dtype=spec["dtype"], mode="r", offset=data_start + spec["offset"],
+                                         shape=shape)
+            else:
+                arrays[name] = np.fromfile(file, dtype=spec["dtype"], count=int(np.prod(shape)),
+                                           offset=data_start + spec["offset"]).reshape(shape)
+
+        # Construct graph.
+        graph = cls.__new__(cls)
+        Graph.__init__(graph)
+        graph._nodes = header["num_nodes"] - 1
+        graph._num_edges = header["num_edges"]
+        for name in _CSR_ARRAYS:
+            setattr(graph, name, arrays[name])
+
+        # Construct properties.
+        objects = pickle.loads(arrays["objects"].tobytes())
+        for p_type, p_maps, dict_cls, array_cls in (
+                ("node", graph._v_props, NodePropertyMap, NodeArrayPropertyMap),
+                ("edge", graph._e_props, EdgePropertyMap, EdgeArrayPropertyMap)):
+            for name, meta in objects[f"{p_type}_properties"].items():
+                arr = arrays.get(f"{p_type}_property/{name}")
+                if arr is None:
+                    p_maps[name] = dict_cls(graph=graph, default=meta["default"])
+                    p_maps[name].update(meta["values"])
+                elif meta["categories"] is not None:
+                    p_maps[name] = array_cls(graph=graph, default=meta["default"], dtype="category")
+                    p_maps[name].categories = meta["categories"]
+                    p_maps[name]._codes = {val: code for code, val in enumerate(meta["categories"])}
+                    p_maps[name].array = arr
+                else:
+                    p_maps[name] = array_cls(graph=graph, default=meta["default"], dtype=arr.dtype)
+                    p_maps[name].array = arr
+
+        for name, value in objects["graph_properties"].items():
+            setattr(graph, name, value)
+        for name, arr in arrays.items():
+            if name.startswith("graph_property/"):
+                setattr(graph, name[len("graph_property/"):], arr)
+
+        return graph
+
+
+class SubGraph(Graph):
+    """
+    Read-only view of a graph restricted by boolean node and edge masks. Nothing is copied: adjacency
+    and properties are read from the underlying (frozen) graph, and filtered elements are skipped during iteration.
+
+    Graph representation:
+        1. graph: underlying `CSRGraph`. A `Graph` is frozen when the view is constructed.
+        2. node_mask: boolean array indexed by node id. Hidden nodes and their edges are filtered.
+        3. edge_mask: boolean array indexed by (dense) edge id of underlying graph.
+        4. v_props, e_props: property maps of underlying graph (shared, not copied).
+
+    A view of a `SubGraph` is constructed over the same underlying graph with the masks combined (logical and).
+    Later changes to masks of one view are not reflected in the other.
+
+    :note: Node ids and edge keys are those of the underlying graph.
+    """
+    def __init__(self, graph, nodes=None, edges=None):
+        """
+        :param graph: (Graph, CSRGraph or SubGraph) graph.
+        :param nodes: (np.ndarray or None) boolean mask over nodes, or array of visible nodes. Defaults to all nodes.
+        :param edges: (np.ndarray or None) boolean mask over edge ids, or array of visible edge ids.
+            Defaults to all edges.
+        """
+        super(SubGraph, self).__init__()
+        if isinstance(graph, SubGraph):
+            base, node_mask, edge_mask = graph.graph, graph.node_mask, graph.edge_mask
+        else:
+            base = graph.freeze()
+            node_mask = np.ones(base.number_of_nodes(), dtype=bool)
+            edge_mask = np.ones(base.number_of_edges(), dtype=bool)
+
+        self.graph = base
+        self.node_mask = node_mask & _to_mask(nodes, len(node_mask))
+        self.edge_mask = edge_mask & _to_mask(edges, len(edge_mask))
+        self._nodes = base._nodes
+        self._num_edges = base._num_edges
+        self._v_props = base._v_props
+        self._e_props = base._e_props
+
+    def __repr__(self):
+        return f"<SubGraph with |V|={self.number_of_nodes()}, |E|={self.number_of_edges()} of {repr(self.graph)}>"
+
+    def __getstate__(self):
+        return dict(self.__dict__)
+
+    def __setstate__(self, state):
+        self.__dict__ |= state
+
+    def filter_nodes(self, name, predicate):
+        """
+        Hides nodes whose value of node property `name` does not satisfy predicate.
+
+        :param name: (str) node property.
+        :param predicate: (callable) called once with the array of values of all nodes (see
+            `CSRGraph.node_property_array()`). Must return a boolean array, e.g. `lambda turn: turn == 1`.
+        :return: (SubGraph) self.
+        """
+        self.node_mask &= np.asarray(predicate(self.graph.node_property_array(name)), dtype=bool)
+        return self
+
+    def filter_edges(self, name, predicate):
+        """
+        Hides edges whose value of edge property `name` does not satisfy predicate.
+        See `filter_nodes()`, e.g. `lambda prob: prob > 0.1`.
+
+        :return: (SubGraph) self.
+        """
+        self.edge_mask &= np.asarray(predicate(self.graph.edge_property_array(name)), dtype=bool)
+        return self
+
+    def hide_node(self, node):
+        self.node_mask[node] = False
+
+    def show_node(self, node):
+        self.node_mask[node] = True
+
+    def hide_edge(self, edge):
+        self.edge_mask[self.graph.edge_id(edge)] = False
+
+    def show_edge(self, edge):
+        self.edge_mask[self.graph.edge_id(edge)] = True
+
+    def visible_edges(self):
+        """ Returns a boolean mask over edge ids of edges that are visible, i.e. not hidden and between visible nodes. """
+        base = self.graph
+        return self.edge_mask & self.node_mask[base.edge_sources()] & self.node_mask[base.indices]
+
+    def add_node(self, **kwargs):
+        raise TypeError("SubGraph is read-only.")
+
+    def add_nodes(self, num_nodes):
+        raise TypeError("SubGraph is read-only.")
+
+    def add_nodes_from(self, list_of_props):
+        raise TypeError("SubGraph is read-only.")
+
+    def add_edge(self, u, v, **kwargs):
+        raise TypeError("SubGraph is read-only.")
+
+    def add_edges_from(self, list_of_edges):
+        raise TypeError("SubGraph is read-only.")
+
+    def add_edges_from_arrays(self, u, v, **kwargs):
+        raise TypeError("SubGraph is read-only.")
+
+    def clear(self):
+        raise TypeError("SubGraph is read-only.")
+
+    def freeze(self, dtypes=None):
+        """
+        Packs the visible part of graph into a `CSRGraph` with the same node ids. Hidden nodes are kept as
+        isolated nodes. Keys of parallel edges are renumbered to 0, 1, ... among the visible edges.
+
+        :param dtypes: (dict) {property-name: dtype}. See `Graph.freeze()`.
+        :return: (CSRGraph)
+        """
+        dtypes = dict() if dtypes is None else dtypes
+        base = self.graph
+        eids = np.flatnonzero(self.visible_edges())
+        u, v, k = base.edge_sources()[eids].astype(np.int64), base.indices[eids].astype(np.int64), base.keys[eids]
+
+        # Edges are sorted by (u, v, k). Renumber keys within each group of parallel edges.
+        new_group = np.ones(len(eids), dtype=bool)
+        new_group[1:] = (u[1:] != u[:-1]) | (v[1:] != v[:-1])
+        group_start = np.maximum.accumulate(np.where(new_group, np.arange(len(eids)), 0))
+        new_k = np.arange(len(eids)) - group_start
+
+        csr = CSRGraph.from_edge_arrays(base.number_of_nodes(), u, v, new_k)
+        for name, p_map in base._v_props.items():
+            csr._v_props[name] = _copy_property_map(p_map, csr, NodePropertyMap, NodeArrayPropertyMap, dtypes.get(name))
+
+        old_edges = list(zip(u.tolist(), v.tolist(), k.tolist()))
+        new_edges = list(zip(u.tolist(), v.tolist(), new_k.tolist()))
+        for name, p_map in base._e_props.items():
+            dtype = dtypes.get(name)
+            if isinstance(p_map, _ArrayPropertyMap) and dtype is None:
+                new_map = _copy_property_map(p_map, csr, EdgePropertyMap, EdgeArrayPropertyMap, None)
+                new_map.array = p_map.codes()[eids]
+            elif dtype is None:
+                new_map = EdgePropertyMap(graph=csr, default=p_map.default)
+                new_map.update((new, p_map[old]) for old, new in zip(old_edges, new_edges) if old in p_map)
+            else:
+                new_map = EdgeArrayPropertyMap(graph=csr, default=p_map.default, dtype=dtype)
+                new_map[:] = base.edge_property_array(name)[eids]
+            csr._e_props[name] = new_map
+
+        for name, value in base.__dict__.items():
+            if not name.startswith("_") and not callable(value) and name not in _CSR_ARRAYS:
+                setattr(csr, name, value)
+        return csr
+
+    def has_node(self, node):
+        return 0 <= node <= self._nodes and bool(self.node_mask[node])
+
+    def has_edge(self, edge):
+        """ Expects an edge of type (u, v) or (u, v, k). See `Graph.has_edge()`. """
+        assert len(edge) in [2, 3], "Invalid edge. Edge must be in (u, v) or (u, v, k) format."
+        u, v = edge[0], edge[1]
+        if not (self.has_node(u) and self.has_node(v)):
+            return False
+        if len(edge) == 3:
+            eid = self.graph._find_edge(edge)
+            return eid >= 0 and bool(self.edge_mask[eid])
+        return bool(np.any(self.graph.indices[self._out_eids(u)] == v))
+
+    def edge_id(self, edge):
+        """ Returns the edge id of visible edge (u, v, k) in underlying graph. """
+        if not self.has_edge(edge):
+            raise ValueError(f"{repr(self)} does not contain edge {edge}.")
+        return self.graph.edge_id(edge)
+
+    def nodes(self):
+        return iter(np.flatnonzero(self.node_mask).tolist())
+
+    def edges(self, u=None, v=None):
+        base = self.graph
+        eids = np.flatnonzero(self.visible_edges())
+        return zip(base.edge_sources()[eids].tolist(), base.indices[eids].tolist(), base.keys[eids].tolist())
+
+    def successors(self, node):
+        return iter(np.unique(self.graph.indices[self._out_eids(node)]).tolist())
+
+    def predecessors(self, node):
+        pos = self._in_positions(node)
+        return iter(np.unique(self.graph.in_indices[pos]).tolist())
+
+    def in_edges(self, node):
+        pos = self._in_positions(node)
+        return zip(self.graph.in_indices[pos].tolist(), [node] * len(pos), self.graph.in_keys[pos].tolist())
+
+    def out_edges(self, node):
+        eids = self._out_eids(node)
+        return zip([node] * len(eids), self.graph.indices[eids].tolist(), self.graph.keys[eids].tolist())
+
+    def number_of_nodes(self):
+        return int(np.count_nonzero(self.node_mask))
+
+    def number_of_edges(self):
+        return int(np.count_nonzero(self.visible_edges()))
+
+    def _out_eids(self, node):
+        """ Returns ids of visible out-edges of node. """
+        if not self.has_node(node):
+            return np.zeros(0, dtype=np.int64)
+        base = self.graph
+        s, e = base.indptr[node], base.indptr[node + 1]
+        eids = np.arange(s, e)
+        return eids[self.edge_mask[s:e] & self.node_mask[base.indices[s:e]]]
+
+    def _in_positions(self, node):
+        """ Returns positions (in in-edge arrays of underlying graph) of visible in-edges of node. """
+        if not self.has_node(node):
+            return np.zeros(0, dtype=np.int64)
+        base = self.graph
+        s, e = base.in_indptr[node], base.in_indptr[node + 1]
+        pos = np.arange(s, e)
+        return pos[self.edge_mask[base.in_eids[s:e]] & self.node_mask[base.in_indices[s:e]]]
+
+
+GRAPH_FILE_MAGIC = b"GWGRAPH\x00"
+GRAPH_FILE_VERSION = 1
+_CSR_ARRAYS = ("indptr", "indices", "keys", "in_indptr", "in_indices", "in_keys", "in_eids")
+
+
+def _align(offset, alignment=64):
+    return (offset + alignment - 1) // alignment * alignment
+
+
+def _object_array(values, dtype=None):
+    if dtype is not None:
+        return np.asarray(values, dtype=dtype)
+    arr = np.empty(len(values), dtype=object)
+    for i, value in enumerate(values):
+        arr[i] = value
+    return arr
+
+
+def _attr_dicts(names, columns, count):
+    if len(names) == 0:
+        return ({} for _ in range(count))
+    return (dict(zip(names, values)) for values in zip(*(column.tolist() for column in columns)))
+
+
+def _to_mask(items, n):
+    if items is None:
+        return np.ones(n, dtype=bool)
+    items = np.asarray(items)
+    if items.dtype == bool:
+        return items
+    mask = np.zeros(n, dtype=bool)
+    mask[items] = True
+    return mask
+
+
+def _index_dtype(num_nodes):
+    return np.int32 if num_nodes < np.iinfo(np.int32).max else np.int64
+
+
+def _copy_properties(src, dst, dtypes=None):
+    """
+    Re-binds node, edge properties and copies graph properties of `src` graph to `dst` graph.
+    Properties named in `dtypes` are converted to array-backed property maps.
+    """
+    dtypes = dict() if dtypes is None else dtypes
+
+    for name, p_map in src._v_props.items():
+        dst._v_props[name] = _copy_property_map(p_map, dst, NodePropertyMap, NodeArrayPropertyMap, dtypes.get(name))
+
+    for name, p_map in src._e_props.items():
+        dst._e_props[name] = _copy_property_map(p_map, dst, EdgePropertyMap, EdgeArrayPropertyMap, dtypes.get(name))
+
+    for name, value in src.__dict__.items():
+        if not name.startswith("_") and not callable(value):
+            setattr(dst, name, value)
+
+
+def _copy_property_map(p_map, graph, dict_cls, array_cls, dtype):
+    if isinstance(p_map, _ArrayPropertyMap):
+        new_map = array_cls(graph=graph, default=p_map.default, dtype="category" if p_map.categorical else p_map.dtype)
+        if p_map.categorical:
+            new_map.categories = list(p_map.categories)
+            new_map._codes = dict(p_map._codes)
+        new_map.array = p_map.codes().copy()
+        return new_map
+
+    if dtype is None:
+        new_map = dict_cls(graph=graph, default=p_map.default)
+        new_map.update(p_map)
+        return new_map
+
+    new_map = array_cls(graph=graph, default=p_map.default, dtype=dtype)
+    for key, value in p_map.items():
+        new_map[key] = value
+    return new_map
@@ -1,4 +1,6 @@
 from abc import ABC, abstractmethod
+from encoding import AtomIndex
+from gw_build import compute_transitions, compute_labels, add_transitions, explore_reachable
 from gw_utils import GW_OBS_TYPE_SINK, GW_BOUNDARY_TYPE_BOUNCY
 from tsys import GraphTS
 
@@ -39,23 +41,75 @@ class Gridworld(ABC):
     def delta(self, state, act):
         pass
 
+    def delta_batch(self, states, act):
+        """
+        (Optional) Vectorized transition function. If implemented, it is used instead of `delta`
+        to construct the transition system graph.
+
+        :param states: (np.ndarray) (N, d) integer array. Each row is a state.
+        :param act: An element from self.actions().
+        :return: Depending on the type of gridworld, one of the following output is expected.
+            * If gridworld is deterministic: (N, d) array of next states.
+            * If gridworld is qualitative, stochastic: (N, B, d) array of next states (B = number of branches).
+            * If gridworld is quantitative, stochastic: 2-tuple of (N, B, d) array of next states and
+              (N, B) array of probabilities. Branches with zero probability are ignored.
+        """
+        raise NotImplementedError("delta_batch function is not implemented by the user.")
+
     def atoms(self):
         raise NotImplementedError("atoms function is not implemented by the user.")
 
     def label(self, state):
         raise NotImplementedError("label function is not implemented by the user.")
 
+    def label_batch(self, states):
+        """
+        (Optional) Vectorized labeling function. If implemented, it is used instead of `label`
+        to label the states of the transition system graph.
 
-def graphify(obj: Gridworld, state_properties=None, trans_properties=None):
+        :param states: (np.ndarray) (N, d) integer array. Each row is a state.
+        :return: (dict) {atom: (N,) boolean array} truth value of every atom in every state.
+            Atoms missing from dict are false in all states.
+        """
+        raise NotImplementedError("label_batch function is not implemented by the user.")
+
+
+def graphify(obj: Gridworld, state_properties=None, trans_properties=None, validate=True, workers=None,
+             encoder=None, init_states=None, reachable_only=False, progress=None):
+    """
+    Constructs the transition system graph of given gridworld.
+
+    :param obj: (Gridworld) gridworld object.
+    :param state_properties: (dict) user defined state properties {<pname>: <default-value>}.
+    :param trans_properties: (dict) user defined transition properties {<pname>: <default-value>}.
+    :param validate: (bool) If True, every transition returned by `obj.delta` is checked to lead to a valid state
+        (and, for quantitative gridworlds, that probabilities sum to 1.0).
+    :param workers: (int or None) number of worker processes used to evaluate `obj.delta`.
+        If None or 1, transitions are computed in the calling process. `obj` must be picklable if `workers > 1`.
+    :param encoder: (StateEncoder or None) If given, the states are the product space described by encoder
+        (`obj.states()` is not called) and node ids are the codes of states. The encoder replaces the
+        `map_state2node` dictionary and the `state` node property.
+    :param init_states: (iterable) initial states. Required if `reachable_only` is True.
+    :param reachable_only: (bool) If True, only the states reachable from `init_states` are added to graph.
+        The states are explored by breadth-first search (`obj.states()` is not called) and node ids are assigned
+        in order of discovery. Cannot be combined with `workers` or `encoder`.
+    :param progress: (callable or None) (if reachable_only) called as
+        `progress(num_explored, num_discovered, num_transitions)` during exploration.
+    :return: (GraphTS) gridworld graph.
+    """
     if state_properties is None:
         state_properties = dict()
 
     if trans_properties is None:
         trans_properties = dict()
 
+    if reachable_only and (init_states is None or encoder is not None or workers is not None):
+        raise ValueError("reachable_only requires init_states and cannot be combined with encoder or workers.")
+
     # Clear graph.
     graph = GraphTS()
-    graph.map_state2node = dict()
+    graph.map_state2node = dict() if encoder is None else encoder
+    graph.encoder = encoder
 
     # Update options / obj-level properties.
     graph.dim = obj.dim
@@ -63,7 +117,10 @@ def graphify(obj: Gridworld, state_properties=None, trans_properties=None):
     graph.deterministic = obj.deterministic
     graph.qualitative = obj.qualitative
     graph.actions = obj.actions()
-    graph.atoms = obj.atoms()
+    try:
+        graph.atoms = obj.atoms()
+    except NotImplementedError:
+        graph.atoms = None
 
     # Define state properties.
     _update_state_properties(graph, state_properties)
@@ -71,11 +128,12 @@ def graphify(obj: Gridworld, state_properties=None, trans_properties=None):
     # Define transition_properties.
     _update_transition_properties(graph, trans_properties)
 
-    # Add states.
-    _update_states(graph, obj)
-
-    # Add transitions.
-    _update_transitions(graph, obj)
+    # Add states and transitions.
+    if reachable_only:
+        _update_reachable(graph, obj, init_states, validate, progress)
+    else:
+        states = _update_states(graph, obj)
+        _update_transitions(graph, obj, states, validate, workers)
 
     # Generate labels for all states if user has implemented atoms, label functions.
     _make_labeled(graph, obj)
@@ -90,17 +148,12 @@ def _update_state_properties(graph, state_properties):
         raise NameError(f"Cannot use reserved property names {common_props} as state_properties.")
 
     # Add properties based on transition system properties
-    state_properties |= {"state": None}
+    if graph.encoder is None:
+        state_properties |= {"state": None}
 
     if graph.turn_based:
         state_properties |= {"turn": -1}
 
-    try:
-        if len(graph.atoms) > 0:
-            state_properties |= {"label": set()}
-    except NotImplementedError:
-        pass
-
     # Add state properties
     for name, default in state_properties.items():
         graph.add_node_property(name, default)
@@ -124,70 +177,57 @@ def _update_transition_properties(graph, trans_properties):
 
 
 def _update_states(graph, obj):
-    states = obj.states()
+    # States are encoded. Node id is the code of state.
+    if graph.encoder is not None:
+        graph.add_nodes(num_nodes=len(graph.encoder))
+        return graph.encoder
+
+    # Materialize states once. Subsequent lookups use map_state2node.
+    states = list(obj.states())
 
     # Add nodes to graph
     graph.add_nodes(num_nodes=len(states))
 
     # Update node to state mapping
-    nid = 0
-    for state in states:
-        graph.set_node_property("state", nid, state)
+    state_map = graph._v_props["state"]
+    for nid, state in enumerate(states):
+        state_map[nid] = state
         graph.map_state2node[state] = nid
-        nid += 1
 
+    return states
 
-def _update_transitions(graph, obj):
-    if obj.deterministic:
-        _update_transitions_deterministic(graph, obj)
-    else:
-        if obj.qualitative:
-            _update_transitions_qualitative(graph, obj)
-        else:
-            _update_transitions_quantitative(graph, obj)
+
+def _update_transitions(graph, obj, states, validate, workers):
+    actions = list(graph.actions)
+    u, v, aid, prob = compute_transitions(
+        obj, states, actions, graph.map_state2node, obj.deterministic, obj.qualitative, validate, workers
+    )
+    graph._trans_index = add_transitions(graph, actions, u, v, aid, prob)
+
+
+def _update_reachable(graph, obj, init_states, validate, progress):
+    actions = list(graph.actions)
+    states, state2node, (u, v, aid, prob) = explore_reachable(
+        obj, init_states, actions, obj.deterministic, obj.qualitative, validate, progress
+    )
+
+    # Add nodes to graph
+    graph.add_nodes(num_nodes=len(states))
+    graph._v_props["state"].update(enumerate(states))
+    graph.map_state2node = state2node
+
+    # Add transitions
+    graph._trans_index = add_transitions(graph, actions, u, v, aid, prob)
 
 
 def _make_labeled(graph, obj):
+    # Labels are stored as bitmasks over atoms (see `AtomIndex`), one row of `label_masks` per node.
+    if graph.atoms is None:
+        return
+    graph.atom_index = AtomIndex(graph.atoms)
+    states = graph.encoder if graph.encoder is not None else [graph.node2state(nid) for nid in graph.nodes()]
     try:
-        for nid in graph.nodes():
-            state = graph.get_node_property("state", nid)
-            graph.set_node_property("label", nid, obj.label(state))
+        graph.label_masks = compute_labels(obj, states, graph.atom_index)
     except NotImplementedError:
         graph.atoms = None
-
-
-def _update_transitions_deterministic(graph, obj):
-    for state in obj.states():
-        for act in obj.actions():
-            n_state = obj.delta(state, act)
-            assert n_state in obj.states(), f"{n_state} is not in transition system."
-
-            # Get nodes corresponding to states
-            u = graph.map_state2node[state]
-            v = graph.map_state2node[n_state]
-            graph.add_edge(u, v, action=act)
-
-
-def _update_transitions_qualitative(graph, obj):
-    for state in obj.states():
-        for act in obj.actions():
-            n_states = list(obj.delta(state, act))
-            assert all(st in obj.states() for st in n_states), \
-                f"Not all states in {n_states} are in transition system."
-            graph.add_edges_from([
-                (graph.map_state2node[state], graph.map_state2node[n_state], {"action": act}) for n_state in n_states]
-            )
-
-
-def _update_transitions_quantitative(graph, obj):
-    for state in obj.states():
-        for act in obj.actions():
-            n_states = list(obj.delta(state, act))
-            assert all(st in obj.states() for st, _ in n_states), \
-                f"Not all states in {n_states} are in transition system."
-            assert sum(p for _, p in n_states) == 1.0, \
-                f"Probabilities in {n_states} do not sum to 1.0."
-            graph.add_edges_from([
-                (graph.map_state2node[state], graph.map_state2node[n_state], {"action": act, "prob": p})
-                for n_state, p in n_states
-            ])
+        graph.atom_index = None
@@ -1,11 +1,40 @@
 import logging
-from graph import Graph
+import numpy as np
+from encoding import AtomIndex, StateTable
+from graph import Graph, CSRGraph, EdgePropertyMap, EdgeArrayPropertyMap
+from gw_build import compute_transitions, compute_labels, add_transitions, explore_reachable, update_transitions
+from tsys import TransitionIndex, to_next_states
+
+
+# Gridworld attributes stored by `Gridworld.save`.
+_SAVED_ATTRIBUTES = ("dim", "obs", "obs_type", "qualitative", "deterministic", "turn_based", "actions", "atoms",
+                     "encoder", "atom_index", "label_masks")
 
 
 class Gridworld(Graph):
     RESERVED_PROPERTIES = {"turn", "state", "action", "prob", "label"}
 
-    def __init__(self, tsgen, graphify=True):
+    def __init__(self, tsgen, graphify=True, workers=None, encoder=None, init_states=None, reachable_only=False,
+                 progress=None):
+        """
+        :param tsgen: (TSGenerator) transition system generator.
+        :param graphify: (bool) If True, the transition system graph is constructed. Otherwise, gridworld methods
+            are bound to `tsgen` methods (symbolic mode). See `to_bdd_graph()` for a symbolic transition relation.
+        :param workers: (int or None) number of worker processes used to evaluate `tsgen.delta`
+            while constructing the graph. `tsgen` must be picklable if `workers > 1`.
+        :param encoder: (StateEncoder or None) If given, the states are the product space described by encoder
+            (`tsgen.states()` is not called) and node ids are the codes of states. The encoder replaces
+            the `map_state2node` dictionary and the `state` node property.
+        :param init_states: (iterable) initial states. Required if `reachable_only` is True.
+        :param reachable_only: (bool) If True, only the states reachable from `init_states` are added to graph.
+            The states are explored by breadth-first search (`tsgen.states()` is not called) and node ids are
+            assigned in order of discovery. Cannot be combined with `workers` or `encoder`.
+        :param progress: (callable or None) (if reachable_only) called as
+            `progress(num_explored, num_discovered, num_transitions)` during exploration.
+        """
+        if reachable_only and (init_states is None or encoder is not None or workers is not None):
+            raise ValueError("reachable_only requires init_states and cannot be combined with encoder or workers.")
+
         super(Gridworld, self).__init__()
 
         # Gridworld properties
@@ -19,16 +48,26 @@ class Gridworld(Graph):
         self.delta = None
         self.atoms = None
         self.label = None
+        self.atom_index = None      # AtomIndex of atoms
+        self.label_masks = None     # (|V|, W) uint64 array of label bitmasks
 
         # Generator object, options
         self.tsgen = tsgen
         self.graphify = graphify
+        self.workers = workers
+        self.init_states = init_states
+        self.reachable_only = reachable_only
+        self.progress = progress
         self.qualitative = None
         self.deterministic = None
         self.turn_based = None
 
         # Inverse state to node map
         self.map_state2node = dict()
+        self.encoder = encoder
+
+        # (node, action) -> successors index
+        self._trans_index = None
 
         # Construct gridworld
         self._construct_gridworld()
@@ -60,7 +99,11 @@ class Gridworld(Graph):
             "states",
             "actions",
             "atoms",
-            "graphify"
+            "atom_index",
+            "label_masks",
+            "graphify",
+            "workers",
+            "encoder"
         ]
 
         graph_dict = super(Gridworld, self).__getstate__()
@@ -68,9 +111,10 @@ class Gridworld(Graph):
         return graph_dict | gw_dict
 
     def __setstate__(self, obj_dict):
-        self.__dict__ |= obj_dict
+        self.__dict__ |= {"atom_index": None, "label_masks": None, "_tombstones": dict()} | obj_dict
+        self._update_transition_index()
         self.delta = self._delta
-        if "label" in obj_dict["_v_props"]:
+        if obj_dict.get("label_masks") is not None or "label" in obj_dict["_v_props"]:
             self.label = self._label
 
     def _construct_gridworld(self):
@@ -100,55 +144,234 @@ class Gridworld(Graph):
         # Define transition_properties.
         self._update_transition_properties()
 
-        # Add states.
-        self._update_states()
+        if self.reachable_only:
+            # Add actions.
+            self._update_actions()
+
+            # Add reachable states and transitions (and index them by (node, action)).
+            self._update_reachable()
+        else:
+            # Add states.
+            self._update_states()
 
-        # Add actions.
-        self._update_actions()
+            # Add actions.
+            self._update_actions()
 
-        # Add transitions.
-        self._update_transitions()
+            # Add transitions (and index them by (node, action)).
+            self._update_transitions()
 
         # Generate labels for all states if user has implemented atoms, label functions.
         self._make_labeled()
 
+        # Set turn of all states if gridworld is turn-based and user has implemented turn function.
+        self._make_turns()
+
+    def update(self, states, predecessors=True, validate=True):
+        """
+        Incrementally updates the graph after the dynamics (or labels) of some states changed in `tsgen`,
+        e.g. when an obstacle moves. Instead of reconstructing the graph, `tsgen.delta` (and `tsgen.label`)
+        are re-evaluated only for given states and, if `predecessors` is True, their predecessors in the graph.
+        Out-edges of states whose transitions changed are removed (tombstones, see `Graph.rem_edge`) and the
+        new transitions are appended. The transition index and label masks are patched in place.
+
+        :param states: (iterable) states whose transitions (or labels) changed. States must be in the gridworld;
+            the set of states is not changed by an update.
+        :param predecessors: (bool) whether to re-evaluate the predecessors of states.
+        :param validate: (bool) whether to check that next states are valid and probabilities sum to 1.0.
+        :return: (TransitionDelta) changed nodes, removed and added transitions, and relabeled nodes.
+            Use `delta.affected(gw)` to find the nodes whose solutions must be recomputed.
+
+        :note: A state whose new successors are in `states`, but which has no edge into `states` before the update
+            (e.g. neighbors of a removed obstacle with bouncy obstacles), is not a predecessor. Include such states.
+        """
+        if self.graphify is False or self.tsgen is None:
+            raise TypeError("Gridworld must be graphified (and have a tsgen) to be updated.")
+
+        try:
+            nodes = {self.map_state2node[state] for state in states}
+        except KeyError as err:
+            raise ValueError(f"{err.args[0]} is not in gridworld. Updates cannot add states.") from None
+        if predecessors:
+            nodes |= {pred for node in list(nodes) for pred in self.predecessors(node)}
+        nodes = np.array(sorted(nodes), dtype=np.int64)
+        self._thaw()
+        if self.encoder is not None:
+            states = [tuple(state) for state in self.encoder.decode_batch(nodes).tolist()]
+        else:
+            states = [self.node2state(nid) for nid in nodes.tolist()]
+
+        delta = update_transitions(
+            self, self._trans_index, self.tsgen, nodes, states, self.map_state2node,
+            self.deterministic, self.qualitative, validate
+        )
+
+        if self.label_masks is not None and len(nodes) > 0:
+            masks = compute_labels(self.tsgen, states, self.atom_index)
+            relabeled = np.any(masks != self.label_masks[nodes], axis=1)
+            self.label_masks[nodes[relabeled]] = masks[relabeled]
+            delta.relabeled = nodes[relabeled]
+        return delta
+
+    def _thaw(self):
+        # A loaded gridworld stores edge properties in arrays indexed by edge ids of the loaded (frozen) graph,
+        # and label masks in read-only memory-mapped arrays. Convert them to writable maps and arrays.
+        for name, p_map in self._e_props.items():
+            if isinstance(p_map, EdgeArrayPropertyMap):
+                new_map = EdgePropertyMap(graph=self, default=p_map.default)
+                new_map.update(zip(p_map.graph.edges(), p_map[:].tolist()))
+                self._e_props[name] = new_map
+        if self.label_masks is not None and not self.label_masks.flags.writeable:
+            self.label_masks = np.array(self.label_masks)
+
     def save(self, file):
-        raise NotImplementedError("Not yet implemented")
+        """
+        Saves the gridworld to a binary `.graph` file (see `Graph.save`).
+
+        Along with the graph arrays, the file stores the gridworld properties, the actions (in order of their ids),
+        the atoms, labels and the states. States that are tuples of integers are stored as an (N, d) array
+        (unless the gridworld uses a `StateEncoder`, in which case only the encoder is stored).
+        Actions are dictionary-encoded. The generator object (`tsgen`) is not saved.
+        """
+        if self.graphify is False:
+            raise TypeError("Gridworld must be graphified before saving.")
+
+        csr = self.freeze(dtypes={"action": "category", "prob": np.float64})
+        for name in self.__dict__:
+            if name in csr.__dict__ and not name.startswith("_") and name not in _SAVED_ATTRIBUTES:
+                delattr(csr, name)
+        csr.actions = list(self._trans_index.id2act)
+
+        # Store integer states as array.
+        if self.encoder is None:
+            states = np.asarray([self.node2state(nid) for nid in self.nodes()])
+            if states.ndim == 2 and states.dtype.kind in "iu":
+                csr.state_array = states
+                del csr._v_props["state"]
+
+        csr._save_binary(file)
 
     @classmethod
-    def load(cls, file):
-        raise NotImplementedError("Not yet implemented.")
+    def load(cls, file, mmap=True):
+        """
+        Loads a gridworld saved by `Gridworld.save`.
 
-    def _delta(self, state, act):
-        # Get node corresponding to state
-        uid = self.map_state2node[state]
+        `delta` and `label` are bound to a transition index built from the stored arrays; the graph is not
+        reconstructed. The adjacency dictionaries (used by `Graph` methods such as `successors`) are
+        materialized from the stored arrays on first access.
 
-        # Get all out edges from that state
-        out_edges = self.out_edges(uid)
-
-        # Get next states
-        next_states = []
-        for u, v, k in out_edges:
-            edge_act = self.get_edge_property("action", (u, v, k))
-            if edge_act == act:
-                # If TS is quantitative, associate probability values.
-                if not self.deterministic and not self.qualitative:
-                    prob = self.get_edge_property("prob", (u, v, k))
-                    next_states.append((self.get_node_property("state", v), prob))
-                else:
-                    next_states.append(self.get_node_property("state", v))
-
-        # Return next states based on whether TS is deterministic or not.
-        if self.deterministic:
-            return next_states[0]
+        :param file: (str) path of file.
+        :param mmap: (bool) If True, arrays are memory-mapped (read-only).
+        :return: (Gridworld) loaded gridworld. Its `tsgen` is None.
+        """
+        csr = CSRGraph._load_binary(file, mmap)
+        gw = cls.__new__(cls)
+        Graph.__init__(gw)
+
+        # Adjacency is materialized lazily from CSR arrays (see `__getattr__`).
+        del gw._edges, gw._inv_edges
+        gw._csr = csr
+        gw._nodes = csr._nodes
+        gw._num_edges = csr._num_edges
+        gw._v_props = csr._v_props
+        gw._e_props = csr._e_props
+
+        # Gridworld properties
+        for name in _SAVED_ATTRIBUTES:
+            setattr(gw, name, getattr(csr, name, None))
+        gw.tsgen = None
+        gw.graphify = True
+        gw.workers = None
+        gw.init_states = None
+        gw.reachable_only = False
+        gw.progress = None
+
+        # States
+        if gw.encoder is None and hasattr(csr, "state_array"):
+            gw.encoder = StateTable(csr.state_array)
+        if gw.encoder is not None:
+            gw.map_state2node = gw.encoder
+            gw.states = gw.encoder
         else:
-            return next_states
+            gw.map_state2node = {state: nid for nid, state in gw._v_props["state"].items()}
+            gw.states = set(gw.map_state2node)
+
+        # Transitions: intern action categories to action ids.
+        action_map = gw._e_props["action"]
+        code2aid = np.array([gw.actions.index(act) if act in gw.actions else -1 for act in action_map.categories])
+        aid = code2aid[action_map.codes()]
+        if np.any(aid < 0):
+            unknown = {action_map.categories[code] for code in np.unique(action_map.codes()[aid < 0]).tolist()}
+            raise ValueError(f"{np.count_nonzero(aid < 0)} transitions in {file} have actions {unknown} "
+                             f"that are not in the saved actions {gw.actions}.")
+        prob = gw._e_props["prob"][:] if "prob" in gw._e_props else None
+        gw._trans_index = TransitionIndex(
+            csr.number_of_nodes(), gw.actions, csr.edge_sources(), csr.indices, aid, prob
+        )
+        gw.actions = set(gw.actions)
+
+        gw.delta = gw._delta
+        has_labels = gw.label_masks is not None or "label" in gw._v_props
+        gw.label = gw._label if gw.atoms is not None and has_labels else None
+        return gw
+
+    def __getattr__(self, name):
+        # Adjacency of a loaded gridworld is materialized from its CSR arrays on first access.
+        if name in ("_edges", "_inv_edges") and "_csr" in self.__dict__:
+            self._materialize_adjacency()
+            return self.__dict__[name]
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+    def _materialize_adjacency(self):
+        csr = self.__dict__.pop("_csr")
+        edges = dict()
+        inv_edges = dict()
+        for u, v, k in csr.edges():
+            edges.setdefault(u, dict())[v] = k
+            inv_edges.setdefault(v, set()).add(u)
+        self._edges = edges
+        self._inv_edges = inv_edges
+
+    def to_bdd_graph(self, bdd=None):
+        """
+        Encodes the gridworld symbolically. Requires the `dd` package (see `symbolic` module).
+
+        If the gridworld is graphified, the graph is encoded (states are node ids). Otherwise (symbolic mode),
+        the relation is constructed directly from `tsgen` without constructing the graph. States are encoded
+        by `encoder` (default: `StateEncoder.from_dim(dim)`).
+
+        :param bdd: (BDD or None) BDD manager. Defaults to a new manager.
+        :return: (symbolic.BDDGraph)
+        """
+        if self.graphify:
+            return super(Gridworld, self).to_bdd_graph(bdd)
+
+        import symbolic     # Optional dependency (dd).
+        return symbolic.BDDGraph.from_tsgen(self.tsgen, self.encoder, bdd=bdd)
+
+    def _delta(self, state, act):
+        succ, prob = self._trans_index.lookup(self.map_state2node[state], act)
+        return to_next_states(self, succ, prob)
+
+    def state2node(self, state):
+        return self.map_state2node[state]
+
+    def node2state(self, node):
+        if self.encoder is not None:
+            return self.encoder.decode(node)
+        return self._v_props["state"][node]
 
     def _label(self, state):
         # Get node corresponding to state
         uid = self.map_state2node[state]
 
-        return self.get_node_property("label", uid)
+        # Gridworlds saved before labels were stored as bitmasks keep a `label` node property.
+        if self.label_masks is None:
+            return self.get_node_property("label", uid)
+        return self.atom_index.decode(self.label_masks[uid])
+
+    def holds(self, atom):
+        """ Returns boolean mask over nodes that is True where atom holds (graphified gridworld). """
+        return self.atom_index.holds(self.label_masks, atom)
 
     def _update_gw_properties(self):
         """
@@ -183,17 +406,12 @@ class Gridworld(Graph):
             raise NameError(f"Cannot use reserved property names {common_props} as state_properties.")
 
         # Add properties based on transition system properties
-        user_props |= {"state": None}
+        if self.encoder is None:
+            user_props |= {"state": None}
 
         if self.turn_based:
             user_props |= {"turn": -1}
 
-        try:
-            if len(self.tsgen.atoms()) > 0:
-                user_props |= {"label": -1}
-        except NotImplementedError:
-            pass
-
         # Add state properties
         for name, default in user_props.items():
             self.add_node_property(name, default)
@@ -220,71 +438,77 @@ class Gridworld(Graph):
         self.delta = self._delta
 
     def _update_states(self):
+        # States are encoded. Node id is the code of state.
+        if self.encoder is not None:
+            self.add_nodes(num_nodes=len(self.encoder))
+            self.map_state2node = self.encoder
+            self.states = self.encoder
+            return
+
+        # Materialize states once.
+        states = list(self.tsgen.states())
+
         # Add nodes to graph
-        self.add_nodes(num_nodes=len(self.tsgen.states()))
+        self.add_nodes(num_nodes=len(states))
 
         # Update node to state mapping
-        nid = 0
-        for state in self.tsgen.states():
-            self.set_node_property("state", nid, state)
+        state_map = self._v_props["state"]
+        for nid, state in enumerate(states):
+            state_map[nid] = state
             self.map_state2node[state] = nid
-            nid += 1
 
-        self.states = set(self.tsgen.states())
+        self.states = set(states)
 
     def _update_actions(self):
         self.actions = set(self.tsgen.actions())
 
     def _update_transitions(self):
-        if self.deterministic:
-            self._update_transitions_deterministic()
-        else:
-            if self.qualitative:
-                self._update_transitions_qualitative()
-            else:
-                self._update_transitions_quantitative()
-            
+        actions = list(self.actions)
+        states = self.encoder if self.encoder is not None else [self.node2state(nid) for nid in self.nodes()]
+        u, v, aid, prob = compute_transitions(
+            self.tsgen, states, actions, self.map_state2node,
+            self.deterministic, self.qualitative, workers=self.workers
+        )
+        self._trans_index = add_transitions(self, actions, u, v, aid, prob)
+
+    def _update_reachable(self):
+        actions = list(self.actions)
+        states, state2node, (u, v, aid, prob) = explore_reachable(
+            self.tsgen, self.init_states, actions, self.deterministic, self.qualitative, progress=self.progress
+        )
+
+        # Add nodes to graph
+        self.add_nodes(num_nodes=len(states))
+        self._v_props["state"].update(enumerate(states))
+        self.map_state2node = state2node
+        self.states = set(states)
+
+        # Add transitions
+        self._trans_index = add_transitions(self, actions, u, v, aid, prob)
+
+    def _update_transition_index(self):
+        self._trans_index = TransitionIndex.from_graph(self, self.actions)
+
     def _make_labeled(self):
+        # Labels are stored as bitmasks over atoms (see `AtomIndex`), one row of `label_masks` per node.
         try:
             self.atoms = self.tsgen.atoms()
-            for nid in self.nodes():
-                state = self.get_node_property("state", nid)
-                self.set_node_property("label", nid, self.tsgen.label(state))
+            self.atom_index = AtomIndex(self.atoms)
+            states = self.encoder if self.encoder is not None else [self.node2state(nid) for nid in self.nodes()]
+            self.label_masks = compute_labels(self.tsgen, states, self.atom_index)
             self.label = self._label
         except NotImplementedError:
             self.atoms = None
+            self.atom_index = None
+            self.label_masks = None
             self.label = None
 
-    def _update_transitions_deterministic(self):
-        for state in self.states:
-            for act in self.actions:
-                n_state = self.tsgen.delta(state, act)
-                assert n_state in self.states, f"{n_state} is not in transition system."
-
-                # Get nodes corresponding to states
-                u = self.map_state2node[state]
-                v = self.map_state2node[n_state]
-                self.add_edge(u, v, action=act)
-
-    def _update_transitions_qualitative(self):
-        for state in self.states:
-            for act in self.actions:
-                n_states = list(self.tsgen.delta(state, act))
-                assert all(st in self.states for st in n_states), \
-                    f"Not all states in {n_states} are in transition system."
-                self.add_edges_from([
-                    (self.map_state2node[state], self.map_state2node[n_state], {"action": act}) for n_state in n_states]
-                )
-
-    def _update_transitions_quantitative(self):
-        for state in self.states:
-            for act in self.actions:
-                n_states = list(self.tsgen.delta(state, act))
-                assert all(st in self.states for st, _ in n_states), \
-                    f"Not all states in {n_states} are in transition system."
-                assert sum(p for _, p in n_states) == 1.0, \
-                    f"Probabilities in {n_states} do not sum to 1.0."
-                self.add_edges_from([
-                    (self.map_state2node[state], self.map_state2node[n_state], {"action": act, "prob": p})
-                    for n_state, p in n_states
-                ])
+    def _make_turns(self):
+        if not self.turn_based:
+            return
+        try:
+            turn = self._v_props["turn"]
+            for nid in self.nodes():
+                turn[nid] = self.tsgen.turn(self.node2state(nid))
+        except (NotImplementedError, AttributeError):
+            pass
@@ -0,0 +1,433 @@
+"""
+Transition construction kernels shared by `gridworld.graphify` and `gridworld2.Gridworld`.
+
+Transitions are computed as compact edge arrays `(u, v, action_id, prob)`, which are inserted into the
+graph in one bulk insert using `Graph.add_edges_from_arrays`.
+"""
+import itertools
+import logging
+import math
+import numpy as np
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from encoding import StateEncoder, StateTable
+from reachability import gather_positions, reachable
+from tsys import TransitionIndex
+
+
+# Per-process context of worker processes. Set by `_init_worker`.
+_worker_ctx = None
+
+
+def compute_transitions(gen, states, actions, state2node, deterministic, qualitative, validate=True, workers=None):
+    """
+    Evaluates `gen.delta(state, act)` for every state and action.
+
+    If `gen` implements the vectorized `delta_batch(states, act)` hook and states are tuples of integers,
+    transitions are computed for all states at once per action (`workers` is ignored in this case).
+
+    :param gen: (object) object implementing `delta(state, act)`. Must be picklable if `workers > 1`.
+    :param states: (list or StateEncoder) states in node order, i.e. `states[i]` is the state of node `i`.
+        If a `StateEncoder` is given, node `i` is the state with code `i`.
+    :param actions: (list) actions. The i-th action has action id `i`.
+    :param state2node: (dict or StateEncoder) state to node map.
+    :param deterministic: (bool) whether `delta` returns a single state.
+    :param qualitative: (bool) whether `delta` returns a set of states or set of (state, prob) pairs.
+    :param validate: (bool) whether to check that next states are valid and probabilities sum to 1.0.
+    :param workers: (int or None) number of worker processes. If None or 1, transitions are computed serially.
+    :return: 4-tuple of arrays (u, v, action_id, prob). `prob` is None, unless gridworld is quantitative stochastic.
+    """
+    batch = _transitions_batch(gen, states, actions, deterministic, qualitative, validate)
+    if batch is not None:
+        return batch
+
+    # Serial evaluation, also if there are too few states to partition among workers.
+    ctx = (gen, actions, state2node, deterministic, qualitative, validate)
+    chunk_size = max(1, math.ceil(len(states) / (4 * workers))) if workers is not None and workers > 1 else 0
+    if chunk_size == 0 or len(states) <= chunk_size:
+        return _transitions(ctx, states)
+
+    # Partition states into chunks. Use more chunks than workers to balance load.
+    iter_states = iter(states)
+    chunks = iter(lambda: list(itertools.islice(iter_states, chunk_size)), [])
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=ctx) as executor:
+        results = list(executor.map(_transitions_chunk, chunks))
+
+    u, v, aid, prob = zip(*results)
+    prob = None if prob[0] is None else np.concatenate(prob)
+    return np.concatenate(u), np.concatenate(v), np.concatenate(aid), prob
+
+
+def compute_transitions_range(gen, encoder, start, stop, actions, deterministic, qualitative, validate=True):
+    """
+    Evaluates `gen.delta(state, act)` for the states with codes `start, ..., stop - 1` of `encoder`.
+    Used to compute transitions chunk by chunk when the state space is too large for a single batch.
+
+    :return: 4-tuple of arrays (u, v, action_id, prob), where u, v are codes of states.
+        See `compute_transitions` for the other parameters.
+    """
+    states = encoder.decode_batch(np.arange(start, stop, dtype=np.int64))
+    batch = _transitions_batch(gen, states, actions, deterministic, qualitative, validate, encoder.encode_batch)
+    if batch is not None:
+        u, v, aid, prob = batch
+        return u + start, v, aid, prob
+
+    ctx = (gen, actions, encoder, deterministic, qualitative, validate)
+    return _transitions(ctx, [tuple(state) for state in states.tolist()])
+
+
+def compute_labels(gen, states, atom_index):
+    """
+    Evaluates the labels of states as bitmasks (see `AtomIndex`).
+
+    If `gen` implements the vectorized `label_batch(states)` hook and states are tuples of integers,
+    labels of all states are computed at once. Otherwise, `gen.label(state)` is called for every state.
+
+    :param gen: (object) object implementing `label(state)`.
+    :param states: (list or StateEncoder) states in node order.
+    :param atom_index: (AtomIndex) bit positions of atoms.
+    :return: (np.ndarray) (len(states), atom_index.num_words) uint64 array of label masks.
+    """
+    if hasattr(gen, "label_batch") and len(states) > 0:
+        if isinstance(states, StateEncoder):
+            arr = states.decode_batch(np.arange(len(states)))
+        else:
+            arr = np.asarray(states)
+        if arr.ndim == 2 and arr.dtype.kind in "iu":
+            try:
+                return atom_index.encode_holds(gen.label_batch(arr), len(arr))
+            except NotImplementedError:
+                pass
+    return atom_index.encode_batch(gen.label(state) for state in states)
+
+
+def add_transitions(graph, actions, u, v, aid, prob=None):
+    """
+    Bulk inserts transitions computed by `compute_transitions` into graph.
+
+    :return: (TransitionIndex) (node, action) -> successors index of inserted transitions.
+    """
+    edge_props = {"action": [actions[a] for a in aid.tolist()]}
+    if prob is not None:
+        edge_props["prob"] = prob.tolist()
+    graph.add_edges_from_arrays(u, v, **edge_props)
+    return TransitionIndex(graph.number_of_nodes(), actions, u, v, aid, prob)
+
+
+def update_transitions(graph, index, gen, nodes, states, state2node, deterministic, qualitative, validate=True):
+    """
+    Re-evaluates `gen.delta(state, act)` for the given states and patches graph and index in place.
+
+    Only nodes whose transitions changed are patched: their out-edges are removed from graph (tombstones, see
+    `Graph.rem_edge`) and the new transitions are appended with `action` (and `prob`) edge properties.
+    The graph is patched in time proportional to the changed transitions; see `TransitionIndex.update` for
+    the cost of patching the index.
+
+    :param graph: (Graph) transition system graph.
+    :param index: (TransitionIndex) (node, action) -> successors index of graph. Action ids of new transitions
+        are the ids of `index`.
+    :param nodes: (np.ndarray) sorted array of distinct nodes to re-evaluate.
+    :param states: (list) states of nodes, i.e. `states[i]` is the state of `nodes[i]`.
+    :param state2node: (dict or StateEncoder) state to node map of graph.
+    :return: (TransitionDelta) changed nodes and removed, added transitions.
+        See `compute_transitions` for the other parameters.
+    """
+    nodes = np.asarray(nodes, dtype=np.int64)
+    actions = index.id2act
+    lookup = state2node.encode_batch if hasattr(state2node, "encode_batch") else \
+        lambda arr: np.fromiter((state2node.get(tuple(st), -1) for st in arr.tolist()), dtype=np.int64)
+    batch = _transitions_batch(gen, states, actions, deterministic, qualitative, validate, lookup)
+    if batch is not None:
+        u, v, aid, prob = batch
+        u = nodes[u]
+    else:
+        u, v, aid, prob = _transitions((gen, actions, state2node, deterministic, qualitative, validate), states)
+    new = (u, v, aid, prob)
+
+    # Current transitions of nodes. Transitions of node u occupy slots `u * |A|, ..., (u + 1) * |A| - 1`.
+    pos = gather_positions(index.indptr[::index.num_actions], nodes)
+    slots = np.searchsorted(index.indptr, pos, side="right") - 1
+    o_u, o_aid = np.divmod(slots, index.num_actions)
+    old = (o_u, index.succ[pos], o_aid, None if index.prob is None else index.prob[pos])
+
+    # Patch only the nodes whose (sorted) transitions differ.
+    changed = nodes[_differs(nodes, old, new)]
+    old = _select(old, changed)
+    new = _select(new, changed)
+    for uid in changed.tolist():
+        for vid in list(graph.successors(uid)):
+            graph.rem_edge(uid, vid)
+    u, v, aid, prob = new
+    edge_props = {"action": [actions[a] for a in aid.tolist()]}
+    if prob is not None:
+        edge_props["prob"] = prob.tolist()
+    graph.add_edges_from_arrays(u, v, **edge_props)
+    index.update(changed, *new)
+    return TransitionDelta(changed, old, new)
+
+
+class TransitionDelta:
+    """
+    Changes of a transition system made by an incremental update (see `Gridworld.update`).
+
+    Attributes:
+        * nodes: (np.ndarray) nodes whose transitions changed.
+        * removed, added: 4-tuples (u, v, action_id, prob) of arrays of removed and added transitions.
+            `prob` is None, unless transition system is quantitative stochastic.
+        * relabeled: (np.ndarray) nodes whose labels changed.
+    """
+    def __init__(self, nodes, removed, added, relabeled=None):
+        self.nodes = nodes
+        self.removed = removed
+        self.added = added
+        self.relabeled = np.zeros(0, dtype=np.int64) if relabeled is None else relabeled
+
+    def __repr__(self):
+        return f"<TransitionDelta with |nodes|={len(self.nodes)}, |removed|={len(self.removed[0])}, " \
+               f"|added|={len(self.added[0])}, |relabeled|={len(self.relabeled)}>"
+
+    def __bool__(self):
+        return len(self.nodes) > 0 or len(self.relabeled) > 0
+
+    def affected(self, graph):
+        """
+        Returns boolean mask over nodes of graph that can reach a changed or relabeled node.
+        Solutions (e.g. values, winning regions) of other nodes are unchanged, so solvers can be warm-started.
+        """
+        return reachable(graph, np.union1d(self.nodes, self.relabeled), reverse=True, as_mask=True)
+
+
+def _differs(nodes, old, new):
+    """ Returns boolean mask over (sorted) nodes whose transitions differ in old and new (u, v, aid, prob) arrays. """
+    differs = np.zeros(len(nodes), dtype=bool)
+    sorted_cols = []
+    for u, v, aid, prob in (old, new):
+        cols = (v, aid, u) if prob is None else (prob, v, aid, u)
+        order = np.lexsort(cols)
+        sorted_cols.append([np.asarray(col)[order] for col in cols])
+    counts = [np.bincount(np.searchsorted(nodes, cols[-1]), minlength=len(nodes)) for cols in sorted_cols]
+    differs |= counts[0] != counts[1]
+
+    # Nodes with equal number of transitions occupy aligned positions in both sorted arrays.
+    same = ~differs
+    o_idx = np.searchsorted(nodes, sorted_cols[0][-1])
+    n_idx = np.searchsorted(nodes, sorted_cols[1][-1])
+    o_keep, n_keep = same[o_idx], same[n_idx]
+    mismatch = np.zeros(int(o_keep.sum()), dtype=bool)
+    for o_col, n_col in zip(sorted_cols[0], sorted_cols[1]):
+        if o_col.dtype.kind == "f":
+            mismatch |= ~np.isclose(o_col[o_keep], n_col[n_keep])
+        else:
+            mismatch |= o_col[o_keep] != n_col[n_keep]
+    differs[o_idx[o_keep][mismatch]] = True
+    return differs
+
+
+def _select(transitions, nodes):
+    u, v, aid, prob = transitions
+    keep = np.isin(u, nodes)
+    return u[keep], v[keep], aid[keep], None if prob is None else prob[keep]
+
+
+def explore_reachable(gen, init_states, actions, deterministic, qualitative, validate=True, progress=None,
+                      progress_every=100000):
+    """
+    Explores the states reachable from `init_states` by breadth-first search.
+    `gen.delta` is evaluated only on discovered states. Node ids are assigned in the order of discovery.
+
+    :param gen: (object) object implementing `delta(state, act)`.
+    :param init_states: (iterable) initial states.
+    :param actions: (list) actions. The i-th action has action id `i`.
+    :param deterministic: (bool) whether `delta` returns a single state.
+    :param qualitative: (bool) whether `delta` returns a set of states or set of (state, prob) pairs.
+    :param validate: (bool) whether to check that probabilities sum to 1.0.
+    :param progress: (callable or None) called as `progress(num_explored, num_discovered, num_transitions)`
+        every `progress_every` explored states and once after exploration completes.
+    :param progress_every: (int) number of explored states between two progress reports.
+    :return: 3-tuple (states, state2node, transitions), where `states[i]` is the state of node `i` and
+        `transitions` is the 4-tuple (u, v, action_id, prob) of arrays, as returned by `compute_transitions`.
+    """
+    states = []
+    state2node = dict()
+    for state in init_states:
+        if state not in state2node:
+            state2node[state] = len(states)
+            states.append(state)
+
+    u, v, aid, prob = [], [], [], []
+    queue = deque(states)
+    num_explored = 0
+    while len(queue) > 0:
+        state = queue.popleft()
+        uid = state2node[state]
+        for a, act in enumerate(actions):
+            if deterministic:
+                n_state = gen.delta(state, act)
+                n_states = [] if n_state is None else [(n_state, None)]
+            elif qualitative:
+                n_states = [(n_state, None) for n_state in gen.delta(state, act)]
+            else:
+                n_states = list(gen.delta(state, act))
+                if validate:
+                    assert len(n_states) == 0 or math.isclose(sum(p for _, p in n_states), 1.0), \
+                        f"Probabilities in {n_states} do not sum to 1.0."
+
+            for n_state, p in n_states:
+                vid = state2node.get(n_state)
+                if vid is None:
+                    vid = state2node[n_state] = len(states)
+                    states.append(n_state)
+                    queue.append(n_state)
+                u.append(uid)
+                v.append(vid)
+                aid.append(a)
+                prob.append(p)
+
+        num_explored += 1
+        if num_explored % progress_every == 0:
+            _report_progress(progress, num_explored, len(states), len(u))
+
+    _report_progress(progress, num_explored, len(states), len(u))
+    quantitative = not deterministic and not qualitative
+    transitions = (
+        np.asarray(u, dtype=np.int64),
+        np.asarray(v, dtype=np.int64),
+        np.asarray(aid, dtype=np.int64),
+        np.asarray(prob, dtype=np.float64) if quantitative else None
+    )
+    return states, state2node, transitions
+
+
+def _report_progress(progress, num_explored, num_discovered, num_transitions):
+    logging.info(f"Explored {num_explored} states, discovered {num_discovered} states, "
+                 f"{num_transitions} transitions.")
+    if progress is not None:
+        progress(num_explored, num_discovered, num_transitions)
+
+
+def _transitions_batch(gen, states, actions, deterministic, qualitative, validate, lookup=None):
+    """
+    Computes transitions using `gen.delta_batch`.
+    Returns None if `gen` does not implement `delta_batch` or states are not tuples of integers.
+    Next states are encoded by `lookup` (default: position in `states`).
+    """
+    if not hasattr(gen, "delta_batch") or len(states) == 0:
+        return None
+
+    if isinstance(states, StateEncoder):
+        arr = states.decode_batch(np.arange(len(states)))
+        lookup = states.encode_batch
+    else:
+        arr = np.asarray(states)
+        if arr.ndim != 2 or arr.dtype.kind not in "iu":
+            return None
+        lookup = StateTable(arr).encode_batch if lookup is None else lookup
+
+    try:
+        out = [gen.delta_batch(arr, act) for act in actions]
+    except NotImplementedError:
+        return None
+
+    num_states = len(arr)
+    u, v, aid, prob = [], [], [], []
+    for a, result in enumerate(out):
+        if deterministic:
+            n_states = np.asarray(result).reshape(num_states, 1, -1)
+            probs = None
+        elif qualitative:
+            n_states = np.asarray(result[0] if isinstance(result, tuple) else result)
+            probs = None
+        else:
+            n_states, probs = np.asarray(result[0]), np.asarray(result[1], dtype=np.float64)
+
+        num_branches = n_states.shape[1]
+        a_u = np.repeat(np.arange(num_states, dtype=np.int64), num_branches)
+        flat = n_states.reshape(num_states * num_branches, -1)
+        a_v = lookup(flat)
+
+        # Branches filled with -1 denote disabled actions (no transition).
+        enabled = np.any(flat != -1, axis=1)
+        if validate:
+            assert np.all(a_v[enabled] >= 0), \
+                f"{flat[enabled & (a_v < 0)][0]} is not in transition system."
+            if probs is not None:
+                total = probs.sum(axis=1)[enabled.reshape(num_states, num_branches).any(axis=1)]
+                assert np.all(np.isclose(total, 1.0)), \
+                    f"Probabilities in {probs[~np.isclose(probs.sum(axis=1), 1.0)][0]} do not sum to 1.0."
+
+        # Quantitative: drop zero-probability (padding) branches. Qualitative: drop duplicate branches.
+        if probs is not None:
+            keep = (probs.ravel() > 0) & enabled
+            prob.append(probs.ravel()[keep])
+        else:
+            # Targets may be encoded beyond num_states (e.g. codes of a chunk or subset of states).
+            num_targets = max(num_states, int(a_v.max()) + 1)
+            _, first = np.unique(np.where(enabled, a_u * num_targets + a_v, -1), return_index=True)
+            keep = np.sort(first[enabled[first]])
+
+        u.append(a_u[keep])
+        v.append(a_v[keep])
+        aid.append(np.full(len(u[-1]), a, dtype=np.int64))
+
+    # Order transitions by source node, then action, as in the serial construction.
+    u, v, aid = np.concatenate(u), np.concatenate(v), np.concatenate(aid)
+    order = np.argsort(u, kind="stable")
+    prob = np.concatenate(prob)[order] if len(prob) > 0 else None
+    return u[order], v[order], aid[order], prob
+
+
+def _init_worker(*ctx):
+    global _worker_ctx
+    _worker_ctx = ctx
+
+
+def _transitions_chunk(states):
+    return _transitions(_worker_ctx, states)
+
+
+def _transitions(ctx, states):
+    gen, actions, state2node, deterministic, qualitative, validate = ctx
+    u, v, aid, prob = [], [], [], []
+    for state in states:
+        uid = state2node[state]
+        for a, act in enumerate(actions):
+            if deterministic:
+                n_state = gen.delta(state, act)
+                if n_state is None:
+                    continue
+                if validate:
+                    assert n_state in state2node, f"{n_state} is not in transition system."
+                u.append(uid)
+                v.append(state2node[n_state])
+                aid.append(a)
+
+            elif qualitative:
+                n_states = list(gen.delta(state, act))
+                if validate:
+                    assert all(st in state2node for st in n_states), \
+                        f"Not all states in {n_states} are in transition system."
+                for n_state in n_states:
+                    u.append(uid)
+                    v.append(state2node[n_state])
+                    aid.append(a)
+
+            else:
+                n_states = list(gen.delta(state, act))
+                if validate:
+                    assert all(st in state2node for st, _ in n_states), \
+                        f"Not all states in {n_states} are in transition system."
+                    assert len(n_states) == 0 or math.isclose(sum(p for _, p in n_states), 1.0), \
+                        f"Probabilities in {n_states} do not sum to 1.0."
+                for n_state, p in n_states:
+                    u.append(uid)
+                    v.append(state2node[n_state])
+                    aid.append(a)
+                    prob.append(p)
+
+    quantitative = not deterministic and not qualitative
+    return (
+        np.asarray(u, dtype=np.int64),
+        np.asarray(v, dtype=np.int64),
+        np.asarray(aid, dtype=np.int64),
+        np.asarray(prob, dtype=np.float64) if quantitative else None
+    )
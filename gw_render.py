@@ -0,0 +1,213 @@
+"""
+Headless rendering of gridworld trajectories into NumPy framebuffers.
+
+The static scene (background color, grid lines, obstacles) is rendered once into a cached (H, W, 3) uint8
+background image. Sprites are small RGB tiles. To render a frame, only the rectangles covered by sprites in
+the previous frame are restored from the cached background (dirty rectangles), and sprites are copied at their
+new positions. A frame therefore costs O(sprite area) instead of O(screen area), so no display or pygame
+window is needed and recorded trajectories render at thousands of frames per second.
+
+Frames can be exported as binary PPM images (no dependencies), as a `.npy` stack, or as GIF/MP4 videos
+(requires `imageio`; MP4 also requires `imageio-ffmpeg`).
+"""
+import os
+import numpy as np
+
+
+COLOR_BACKGROUND = (255, 255, 255)
+COLOR_GRIDLINES = (175, 175, 175)
+COLOR_OBSTACLE = (0, 0, 0)
+
+
+class Framebuffer:
+    def __init__(self, background):
+        """
+        :param background: (np.ndarray) (H, W, 3) uint8 image of the static scene. It is cached (not copied).
+        """
+        self.background = np.asarray(background, dtype=np.uint8)
+        self.frame = self.background.copy()
+        self._dirty = []
+
+    def __repr__(self):
+        return f"<Framebuffer with shape={self.frame.shape}>"
+
+    @property
+    def shape(self):
+        return self.frame.shape
+
+    def clear(self):
+        """ Restores the dirty rectangles from the cached background. """
+        for top, bottom, left, right in self._dirty:
+            self.frame[top:bottom, left:right] = self.background[top:bottom, left:right]
+        dirty, self._dirty = self._dirty, []
+        return dirty
+
+    def blit(self, tile, top, left):
+        """
+        Copies tile into frame with its top-left corner at pixel (top, left). The tile is clipped to the frame.
+
+        :param tile: (np.ndarray) (h, w, 3) uint8 image.
+        :return: (tuple) dirty rectangle (top, bottom, left, right) in pixels.
+        """
+        height, width = self.frame.shape[:2]
+        bottom, right = min(top + tile.shape[0], height), min(left + tile.shape[1], width)
+        top_c, left_c = max(top, 0), max(left, 0)
+        if top_c >= bottom or left_c >= right:
+            return None
+        self.frame[top_c:bottom, left_c:right] = tile[top_c - top: bottom - top, left_c - left: right - left]
+        rect = (top_c, bottom, left_c, right)
+        self._dirty.append(rect)
+        return rect
+
+
+class GridRenderer:
+    def __init__(self, dim, cell_size=(40, 40), obstacles=None, colors=None):
+        """
+        Renders states of a gridworld. Cell (row, col) is drawn at pixel `(row * cell_h, col * cell_w)`,
+        i.e. origin is the top-left cell.
+
+        :param dim: (tuple) (rows, cols) of gridworld.
+        :param cell_size: (tuple) (height, width) of a cell in pixels.
+        :param obstacles: (iterable or None) cells (row, col) drawn as obstacles in the background.
+        :param colors: (dict or None) overrides of colors {"background", "gridlines", "obstacle"}.
+        """
+        self.dim = tuple(dim)
+        self.cell_size = tuple(cell_size)
+        self.colors = {"background": COLOR_BACKGROUND, "gridlines": COLOR_GRIDLINES, "obstacle": COLOR_OBSTACLE}
+        self.colors.update(colors or dict())
+        self.sprites = []
+        self.framebuffer = Framebuffer(self._render_background(obstacles))
+
+    def __repr__(self):
+        return f"<GridRenderer with dim={self.dim}, cell_size={self.cell_size}, sprites={len(self.sprites)}>"
+
+    @property
+    def screen_size(self):
+        """ (height, width) of frames in pixels. """
+        return self.dim[0] * self.cell_size[0], self.dim[1] * self.cell_size[1]
+
+    def add_sprite(self, tile, locate):
+        """
+        Adds a sprite. Sprites are drawn in the order they are added.
+
+        :param tile: (np.ndarray or tuple) (h, w, 3) image, or an RGB color of a tile of half the cell size.
+        :param locate: (callable or int) function mapping a state to the sprite's cell (row, col),
+            or the index of the sprite's (row, col) in a state, i.e. `state[locate: locate + 2]`.
+        """
+        if np.ndim(tile) == 1:
+            tile_h, tile_w = max(self.cell_size[0] // 2, 1), max(self.cell_size[1] // 2, 1)
+            tile = np.broadcast_to(np.asarray(tile, dtype=np.uint8), (tile_h, tile_w, 3))
+        tile = np.ascontiguousarray(tile, dtype=np.uint8)
+        self.sprites.append((tile, locate))
+
+    def sprite_positions(self, states):
+        """
+        Returns (T, S, 2) array of top-left pixels (top, left) of the S sprites in each of T states.
+        Every sprite is centered in its cell.
+        """
+        states = np.asarray(states)
+        if states.ndim == 1:
+            states = states[:, np.newaxis]
+        positions = np.zeros((len(states), len(self.sprites), 2), dtype=np.int64)
+        cell = np.asarray(self.cell_size, dtype=np.int64)
+        for i, (tile, locate) in enumerate(self.sprites):
+            if callable(locate):
+                cells = np.asarray([locate(state) for state in states.tolist()], dtype=np.int64).reshape(-1, 2)
+            else:
+                cells = states[:, locate: locate + 2].astype(np.int64)
+            offset = (cell - np.asarray(tile.shape[:2])) // 2
+            positions[:, i] = cells * cell + offset
+        return positions
+
+    def frames(self, states, copy=True):
+        """
+        Renders one frame per state. Only the dirty rectangles of the previous frame are redrawn.
+
+        :param states: (iterable) states, e.g. a trajectory or `ESM.state_history`.
+        :param copy: (bool) If False, the same framebuffer array is yielded (and overwritten) for every frame.
+        :return: (generator) (H, W, 3) uint8 frames.
+        """
+        framebuffer = self.framebuffer
+        states = list(states)
+        if len(states) == 0:
+            return
+        positions = self.sprite_positions(states).tolist()
+        for position in positions:
+            framebuffer.clear()
+            for (tile, _), (top, left) in zip(self.sprites, position):
+                framebuffer.blit(tile, top, left)
+            yield framebuffer.frame.copy() if copy else framebuffer.frame
+        framebuffer.clear()
+
+    def render(self, states):
+        """ Returns (T, H, W, 3) uint8 array of frames of states. """
+        height, width = self.screen_size
+        states = list(states)
+        video = np.empty((len(states), height, width, 3), dtype=np.uint8)
+        for t, frame in enumerate(self.frames(states, copy=False)):
+            video[t] = frame
+        return video
+
+    def export(self, states, path, fps=10):
+        """ Renders states and writes frames to path. See `export`. """
+        export(self.frames(states, copy=False), path, fps)
+
+    def _render_background(self, obstacles):
+        height, width = self.screen_size
+        cell_h, cell_w = self.cell_size
+        image = np.empty((height, width, 3), dtype=np.uint8)
+        image[:] = self.colors["background"]
+        for row, col in (obstacles or []):
+            image[row * cell_h: (row + 1) * cell_h, col * cell_w: (col + 1) * cell_w] = self.colors["obstacle"]
+
+        # Grid lines: 1-pixel border of every cell.
+        image[::cell_h, :] = self.colors["gridlines"]
+        image[cell_h - 1::cell_h, :] = self.colors["gridlines"]
+        image[:, ::cell_w] = self.colors["gridlines"]
+        image[:, cell_w - 1::cell_w] = self.colors["gridlines"]
+        return image
+
+
+def export(frames, path, fps=10):
+    """
+    Writes (H, W, 3) uint8 frames to path. The format is determined by the extension of path.
+        * no extension: directory with one binary PPM image `frame_{t}.ppm` per frame.
+        * `.npy`: (T, H, W, 3) uint8 array.
+        * `.gif`, `.mp4`, ...: video written with `imageio`.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == "":
+        save_frames(frames, path)
+    elif ext == ".npy":
+        np.save(path, np.stack([np.array(frame) for frame in frames]))
+    else:
+        save_video(frames, path, fps)
+
+
+def save_frames(frames, directory):
+    """ Writes every (H, W, 3) uint8 frame as binary PPM image `directory/frame_{t}.ppm`. Returns number of frames. """
+    os.makedirs(directory, exist_ok=True)
+    count = 0
+    for t, frame in enumerate(frames):
+        with open(os.path.join(directory, f"frame_{t}.ppm"), "wb") as file:
+            file.write(f"P6\n{frame.shape[1]} {frame.shape[0]}\n255\n".encode("ascii"))
+            file.write(np.ascontiguousarray(frame).tobytes())
+        count += 1
+    return count
+
+
+def save_video(frames, path, fps=10):
+    """
+    Writes (H, W, 3) uint8 frames to a GIF/MP4 video (streamed, frames are not held in memory).
+
+    :note: Requires `imageio` (`pip install imageio`), and `imageio-ffmpeg` for MP4.
+    """
+    import imageio.v2 as imageio
+
+    if path.lower().endswith(".gif"):
+        writer = imageio.get_writer(path, mode="I", duration=1000 / fps, loop=0)
+    else:
+        writer = imageio.get_writer(path, fps=fps)
+    with writer:
+        for frame in frames:
+            writer.append_data(frame)
@@ -1,3 +1,6 @@
+import numbers
+import numpy as np
+
 # GLOBALS: OBSTACLE TYPES
 GW_OBS_TYPE_SINK = "sink"
 GW_OBS_TYPE_BOUNCY = "bouncy"
@@ -22,15 +25,177 @@ GW_ACT_5 = GW_ACT_4 | GW_ACT_STAY
 GW_ACT_8 = GW_ACT_4 | GW_ACT_NE | GW_ACT_NW | GW_ACT_SE | GW_ACT_SW
 GW_ACT_9 = GW_ACT_8 | GW_ACT_STAY
 
+# GLOBALS: OFFSETS (row, col) OF STANDARD ACTIONS
+GW_OFFSETS = {act: func(0, 0) for act, func in GW_ACT_9.items()}
+
 
 def bouncy_boundary(row, col, dim):
     return max(min(row, dim[0] - 1), 0), max(min(col, dim[1] - 1), 0)
 
 
+def bouncy_boundary_batch(rows, cols, dim):
+    """ Vectorized `bouncy_boundary` over arrays of rows and cols. """
+    return np.clip(rows, 0, dim[0] - 1), np.clip(cols, 0, dim[1] - 1)
+
+
+def bouncy_move_batch(states, func, dim):
+    """
+    Applies an action function (e.g. `GW_ACT_4[act]`) to an (N, 2) array of positions `(row, col)` and clips
+    the next positions to the grid (bouncy boundary). Returns (N, 2) array of next positions.
+    """
+    states = np.asarray(states)
+    n_rows, n_cols = bouncy_boundary_batch(*func(states[:, 0], states[:, 1]), dim)
+    return np.stack([n_rows, n_cols], axis=1)
+
+
+def round_boundary(row, col, dim):
+    return row % dim[0], col % dim[1]
+
+
+def round_boundary_batch(rows, cols, dim):
+    """ Vectorized `round_boundary` over arrays of rows and cols. """
+    return np.mod(rows, dim[0]), np.mod(cols, dim[1])
+
+
 def bouncy_obstacle(row, col, n_row, n_col, obs):
-    for o_row, o_col in obs:
-        if n_row == o_row and n_col == o_col:
-            return row, col
-    return n_row, n_col
+    """
+    :param obs: (iterable or np.ndarray) obstacle cells, or boolean occupancy grid (see `occupancy_grid`).
+        Pass a set or an occupancy grid for O(1) lookup. Cells outside the grid are not obstacles.
+    """
+    if isinstance(obs, np.ndarray):
+        # Negative indices would wrap around, so bounds are checked before lookup.
+        blocked = 0 <= n_row < obs.shape[0] and 0 <= n_col < obs.shape[1] and bool(obs[n_row, n_col])
+    elif isinstance(obs, (set, frozenset)):
+        blocked = (n_row, n_col) in obs
+    else:
+        blocked = any(n_row == o_row and n_col == o_col for o_row, o_col in obs)
+    return (row, col) if blocked else (n_row, n_col)
+
+
+def bouncy_obstacle_batch(rows, cols, n_rows, n_cols, occupied):
+    """ Vectorized `bouncy_obstacle`. A move into an occupied cell of `occupied` (boolean grid) is undone. """
+    blocked = occupied[n_rows, n_cols]
+    return np.where(blocked, rows, n_rows), np.where(blocked, cols, n_cols)
+
+
+def sink_obstacle_batch(rows, cols, n_rows, n_cols, occupied):
+    """ Moves into occupied cells of `occupied` (boolean grid) are allowed, but an occupied cell is never left. """
+    sunk = occupied[rows, cols]
+    return np.where(sunk, rows, n_rows), np.where(sunk, cols, n_cols)
+
+
+def occupancy_grid(obstacles, dim):
+    """ Returns boolean grid of shape `dim` that is True at obstacle cells (iterable or (K, 2) array of cells). """
+    occupied = np.zeros(dim, dtype=bool)
+    obstacles = np.asarray(list(obstacles) if not isinstance(obstacles, np.ndarray) else obstacles, dtype=np.int64)
+    if obstacles.size > 0:
+        occupied[obstacles[:, 0], obstacles[:, 1]] = True
+    return occupied
+
+
+class GridDynamics:
+    """
+    Vectorized dynamics of a single agent on a grid.
+
+    Actions are rows of an offset table `(d_row, d_col)`, obstacles are a boolean occupancy grid and
+    boundary/obstacle semantics are applied with masks, so moving N positions costs a few array operations
+    regardless of the number of obstacles. A move is applied in order:
+        1. offset of action is added to position,
+        2. boundary: `bouncy` clips the position to the grid, `round` wraps around (toroidal grid),
+        3. obstacles: `bouncy` undoes a move into an obstacle, `sink` keeps an agent in an obstacle forever.
+    """
+    def __init__(self, dim, actions=None, obstacles=None, obs_type=GW_OBS_TYPE_BOUNCY,
+                 boundary_type=GW_BOUNDARY_TYPE_BOUNCY):
+        """
+        :param dim: (tuple) (num_rows, num_cols) of grid.
+        :param actions: (dict or iterable or None) {action: (d_row, d_col) or action function} (e.g. `GW_ACT_4`),
+            or names of standard actions in `GW_OFFSETS`. Defaults to `GW_ACT_4`.
+            An action function must be a translation, i.e. its offset is `func(0, 0)`.
+        :param obstacles: (iterable or np.ndarray or None) obstacle cells, or boolean occupancy grid of shape dim.
+        :param obs_type: (str) `GW_OBS_TYPE_BOUNCY` or `GW_OBS_TYPE_SINK`.
+        :param boundary_type: (str) `GW_BOUNDARY_TYPE_BOUNCY` or `GW_BOUNDARY_TYPE_ROUND`.
+        """
+        if obs_type not in (GW_OBS_TYPE_BOUNCY, GW_OBS_TYPE_SINK):
+            raise ValueError(f"Unknown obstacle type: {obs_type}.")
+        if boundary_type not in (GW_BOUNDARY_TYPE_BOUNCY, GW_BOUNDARY_TYPE_ROUND):
+            raise ValueError(f"Unknown boundary type: {boundary_type}.")
+
+        actions = GW_ACT_4 if actions is None else actions
+        if not isinstance(actions, dict):
+            actions = {act: GW_OFFSETS[act] for act in actions}
+
+        self.dim = tuple(dim)
+        self.actions = list(actions)
+        self.act2id = {act: aid for aid, act in enumerate(self.actions)}
+        self.offsets = np.array([func(0, 0) if callable(func) else func for func in actions.values()],
+                                dtype=np.int64).reshape(len(self.actions), 2)
+        if obstacles is None:
+            self.occupied = np.zeros(self.dim, dtype=bool)
+        elif isinstance(obstacles, np.ndarray) and obstacles.dtype == bool:
+            assert obstacles.shape == self.dim, f"Expected occupancy grid of shape {self.dim}."
+            self.occupied = obstacles
+        else:
+            self.occupied = occupancy_grid(obstacles, self.dim)
+        self.obs_type = obs_type
+        self.boundary_type = boundary_type
+        self._table = None
+
+    def __repr__(self):
+        return f"<GridDynamics with dim={self.dim}, |A|={len(self.actions)}, " \
+               f"obstacles={int(self.occupied.sum())}, obs_type={self.obs_type}, boundary_type={self.boundary_type}>"
+
+    def step(self, rows, cols, act):
+        """
+        Applies actions to positions.
+
+        :param rows: (np.ndarray) rows of positions.
+        :param cols: (np.ndarray) cols of positions.
+        :param act: An action, an action id (integer that is not an action), or array of action ids
+            (one per position, broadcastable).
+        :return: 2-tuple (n_rows, n_cols) of arrays of next positions.
+        """
+        if isinstance(act, (np.ndarray, list)):
+            aid = np.asarray(act, dtype=np.int64)
+        elif act in self.act2id:
+            aid = self.act2id[act]
+        elif isinstance(act, numbers.Integral) and 0 <= act < len(self.actions):
+            aid = int(act)
+        else:
+            raise KeyError(f"Unknown action or action id: {act}.")
+        rows, cols = np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64)
+        n_rows, n_cols = rows + self.offsets[aid, 0], cols + self.offsets[aid, 1]
+
+        if self.boundary_type == GW_BOUNDARY_TYPE_ROUND:
+            n_rows, n_cols = round_boundary_batch(n_rows, n_cols, self.dim)
+        else:
+            n_rows, n_cols = bouncy_boundary_batch(n_rows, n_cols, self.dim)
+
+        if self.obs_type == GW_OBS_TYPE_SINK:
+            return sink_obstacle_batch(rows, cols, n_rows, n_cols, self.occupied)
+        return bouncy_obstacle_batch(rows, cols, n_rows, n_cols, self.occupied)
+
+    def step_all(self, rows, cols):
+        """ Applies every action to positions. Returns 2-tuple of (N, |A|) arrays of next rows, cols. """
+        aid = np.arange(len(self.actions))[np.newaxis, :]
+        return self.step(np.asarray(rows)[:, np.newaxis], np.asarray(cols)[:, np.newaxis], aid)
+
+    def delta(self, state, act):
+        """ Returns next position (row, col) of a single position. """
+        n_row, n_col = self.step(state[0], state[1], act)
+        return int(n_row), int(n_col)
 
+    def delta_batch(self, states, act):
+        """ Returns (N, 2) array of next positions of (N, 2) array of positions (see `Gridworld.delta_batch`). """
+        states = np.asarray(states)
+        return np.stack(self.step(states[:, 0], states[:, 1], act), axis=1)
 
+    def transition_table(self):
+        """
+        Returns (num_rows * num_cols, |A|) array whose entry (c, a) is the cell reached from cell c
+        (row-major index `row * num_cols + col`) under action a. Computed once and cached.
+        """
+        if self._table is None:
+            rows, cols = np.divmod(np.arange(self.dim[0] * self.dim[1], dtype=np.int64), self.dim[1])
+            n_rows, n_cols = self.step_all(rows, cols)
+            self._table = n_rows * self.dim[1] + n_cols
+        return self._table
@@ -1,4 +1,6 @@
 from esm import ESM
+import gw_render
+import os
 import pygame
 import logging
 import sys
@@ -14,8 +16,13 @@ class GWSim(ESM):
     MODE_MANUAL = "manual"
     MODE_AUTO = "auto"
 
-    def __init__(self, gw_graph, screen_dim, step_duration=TIMER_STEP_MS, len_history=float("inf")):
-        super(GWSim, self).__init__(gw_graph, len_history)
+    def __init__(self, gw_graph, screen_dim, step_duration=TIMER_STEP_MS, len_history=float("inf"), spill_file=None,
+                 headless=False):
+        """
+        :param headless: (bool) If True, SDL dummy video driver is used, i.e. no window is opened.
+            Use `frames` or `export` to render (recorded) trajectories.
+        """
+        super(GWSim, self).__init__(gw_graph, len_history, spill_file)
         self.screen_width = screen_dim[0]
         self.screen_height = screen_dim[1]
         self.col_width = self.screen_width // self.graph.dim[1]
@@ -25,7 +32,16 @@ class GWSim(ESM):
         self.nature_sprite = None
         self.background_sprite = None
         self.p1_sprite = None
+        self.headless = headless
+        if headless:
+            # The video driver is chosen when the display is initialized (e.g. by an earlier `pygame.init()`).
+            # Re-initialize the display with the dummy driver.
+            pygame.display.quit()
+            os.environ["SDL_VIDEODRIVER"] = "dummy"
+            pygame.display.init()
         self.screen = pygame.display.set_mode((self.screen_width, self.screen_height))
+        self._background = None     # Cached surface with grid and background sprites
+        self._dirty_rects = []      # Screen rectangles covered by sprites in last frame
         self.mode = GWSim.MODE_MANUAL
         self.step_duration = step_duration
 
@@ -54,19 +70,42 @@ class GWSim(ESM):
 
     def add_background_sprite(self, sprite):
         self.background_sprite = sprite
+        self._background = None
 
-    def draw_grid(self):
-        # Draw grid lines
+    def draw_grid(self, surface=None):
+        # Draw grid lines (one line per row and column)
+        surface = self.screen if surface is None else surface
         for x in range(0, self.screen_width, self.col_width):
-            for y in range(0, self.screen_height, self.row_height):
-                rect = pygame.Rect(x, y, self.col_width, self.row_height)
-                pygame.draw.rect(self.screen, COLOR_GRIDLINES, rect, 1)
+            pygame.draw.line(surface, COLOR_GRIDLINES, (x, 0), (x, self.screen_height - 1))
+            pygame.draw.line(surface, COLOR_GRIDLINES, (x + self.col_width - 1, 0),
+                             (x + self.col_width - 1, self.screen_height - 1))
+        for y in range(0, self.screen_height, self.row_height):
+            pygame.draw.line(surface, COLOR_GRIDLINES, (0, y), (self.screen_width - 1, y))
+            pygame.draw.line(surface, COLOR_GRIDLINES, (0, y + self.row_height - 1),
+                             (self.screen_width - 1, y + self.row_height - 1))
+
+    def get_background(self):
+        """
+        Returns the surface with static scene (white screen, grid and background sprites).
+        It is rendered once and cached until the background sprites change.
+        """
+        if self._background is None:
+            self._background = pygame.Surface((self.screen_width, self.screen_height))
+            self._background.fill((255, 255, 255))
+            self.draw_grid(self._background)
+            if self.background_sprite is not None:
+                for obs in self.background_sprite:
+                    self._background.blit(obs.surf, obs.rect)
+        return self._background
 
     def terminate(self, *args, **kwargs):
         # TODO. Save the play and exit.
         # file = self.generate_file_name()
         # self.save(file)
 
+        # Write evicted steps still buffered to spill file
+        self.history.flush()
+
         # Quit game
         pygame.display.quit()
         pygame.quit()
@@ -104,6 +143,11 @@ class GWSim(ESM):
             print(vis_utils.BColors.OKGREEN, "Setting mode to AUTO", vis_utils.BColors.ENDC)
             logging.debug("Setting mode to AUTO")
 
+        # Draw static scene once. Afterwards, only the rectangles covered by sprites are redrawn.
+        self.screen.blit(self.get_background(), (0, 0))
+        pygame.display.flip()
+        self._dirty_rects = []
+
         # Main loop
         while True:
             # Get all events in queue
@@ -116,24 +160,18 @@ class GWSim(ESM):
             if self.mode == GWSim.MODE_AUTO:
                 self.step_forward()
 
-            # Fill the screen with white
-            self.screen.fill((255, 255, 255))
-
-            # Draw Gridworld
-            self.draw_grid()
-
             # Update sprite positions based on current state
-            self.render_state()
+            dirty_rects = self.render_state()
 
-            # Update screen
-            pygame.display.flip()
+            # Update changed parts of screen
+            pygame.display.update(dirty_rects)
 
             # Control FPS
             if self.mode == GWSim.MODE_AUTO:
                 pygame.time.delay(self.step_duration)
 
     def step_forward(self):
-        if self.step_counter < len(self.state_history) - 1:
+        if self.step_counter < len(self.history) - 1:
             self.step_counter += 1
             logging.debug(f"Step counter points to history. Incremented to {self.step_counter}")
             return
@@ -147,17 +185,17 @@ class GWSim(ESM):
         #     logging.error(err_msg)
         #     raise ValueError(err_msg)
         # 
-        # # Apply transition to game
-        # self.state_history.append(next_node)
-        # self.action_history.append((p1_act, nature_act))
-        # self.step_counter += 1
+        # # Apply transition to game (evicts the oldest step, if history is full)
+        # self.push(next_state, (p1_act, nature_act))
         # logging.debug(f"Step counter advanced to new state. Incremented to {self.step_counter}.")
 
     def step_backward(self):
         if self.step_counter > 0:
             self.step_counter -= 1
         else:
-            print(vis_utils.BColors.WARNING, "Cannot step backwards. Step counter @ 0.", vis_utils.BColors.ENDC)
+            print(vis_utils.BColors.WARNING, f"Cannot step backwards. Step counter @ 0 "
+                                             f"({self.history.offset} older steps evicted from history).",
+                  vis_utils.BColors.ENDC)
         print(f"step counter: {self.step_counter}")
 
     def justify(self):
@@ -172,17 +210,19 @@ class GWSim(ESM):
             self.mode = GWSim.MODE_MANUAL
 
     def render_state(self):
-        # # Get current state from node
-        # curr_state = self.graph.node2state(self.curr_state)
+        """
+        Erases sprites of last frame (by restoring the cached background) and draws sprites at current state.
 
-        # Move player1 sprite
-        self.p1_sprite.move(self.curr_state)
-        self.screen.blit(self.p1_sprite.surf, self.p1_sprite.rect)
+        :return: (list of pygame.Rect) rectangles of the screen that changed.
+        """
+        background = self.get_background()
+        erased = [self.screen.blit(background, rect, rect) for rect in self._dirty_rects]
 
-        # Move cloud sprite
-        if self.nature_sprite is not None:
-            self.nature_sprite.move(self.curr_state)
-            self.screen.blit(self.nature_sprite.surf, self.nature_sprite.rect)
+        # Move sprites
+        self._dirty_rects = []
+        for sprite in self._sprites():
+            sprite.move(self.curr_state)
+            self._dirty_rects.append(self.screen.blit(sprite.surf, sprite.rect))
 
         # TODO. How to handle collisions?
         # # Check collision state (If colliding, offset them to avoid overlapping)
@@ -191,9 +231,40 @@ class GWSim(ESM):
         #     self.p1_sprite.rect.top += self.tile_size[1] // 2
         #     self.nature_sprite.rect.left -= self.tile_size[0] // 2
         #     self.nature_sprite.rect.top -= self.tile_size[1] // 2
-        if self.background_sprite is not None:
-            for obs in self.background_sprite:
-                self.screen.blit(obs.surf, obs.rect)
+        return erased + self._dirty_rects
+
+    def frames(self, states=None, copy=True):
+        """
+        Renders states without a display into NumPy frames. The cached background and the sprite surfaces
+        are converted to arrays once; every frame only redraws the rectangles covered by sprites.
+
+        :param states: (iterable or None) states to render. Defaults to the states in history.
+        :param copy: (bool) If False, the same framebuffer array is yielded (and overwritten) for every frame.
+        :return: (generator) (screen_height, screen_width, 3) uint8 frames.
+        """
+        states = self.state_history if states is None else states
+        sprites = self._sprites()
+        tiles = [pygame.surfarray.array3d(sprite.surf).swapaxes(0, 1) for sprite in sprites]
+        framebuffer = gw_render.Framebuffer(pygame.surfarray.array3d(self.get_background()).swapaxes(0, 1))
+        for state in states:
+            framebuffer.clear()
+            for sprite, tile in zip(sprites, tiles):
+                sprite.move(state)
+                framebuffer.blit(tile, sprite.rect.top, sprite.rect.left)
+            yield framebuffer.frame.copy() if copy else framebuffer.frame
+
+    def export(self, path, states=None, fps=None):
+        """
+        Renders states (defaults to the states in history) and writes frames to path.
+        See `gw_render.export` for supported formats.
+
+        :param fps: (float or None) frames per second of video. Defaults to one frame per `step_duration`.
+        """
+        fps = 1000 / self.step_duration if fps is None else fps
+        gw_render.export(self.frames(states, copy=False), path, fps)
+
+    def _sprites(self):
+        return [sprite for sprite in (self.p1_sprite, self.p2_sprite, self.nature_sprite) if sprite is not None]
 
     def handle_events(self, events):
         # Call event handlers
@@ -0,0 +1,269 @@
+"""
+Solvers for Markov decision processes given by quantitative transition system graphs
+(e.g. output of `graphify` for a quantitative gridworld).
+
+The `action` and `prob` edge properties are converted once into one `scipy.sparse` CSR transition matrix
+per action. Value iteration, policy evaluation/iteration and maximal reachability probability are then
+computed using sparse matrix-vector products over all states at once.
+
+Actions are identified by their index in `MDP.actions`. Policies are arrays over nodes holding action ids;
+-1 denotes a node with no enabled action.
+
+:note: A node without enabled actions is absorbing with value 0.
+"""
+import logging
+import numpy as np
+import scipy.sparse as sp
+import scipy.sparse.linalg as spla
+from reachability import gather_positions
+
+
+class MDP:
+    def __init__(self, graph, actions=None):
+        """
+        Constructs per-action transition matrices of a quantitative graph.
+
+        :param graph: (Graph or CSRGraph) graph with `action` and `prob` edge properties.
+            A `Graph` is frozen before the matrices are built.
+        :param actions: (Iterable or None) actions. Defaults to `graph.actions`, if available,
+            or else to the set of values of `action` edge property.
+        """
+        csr = graph.freeze()
+        for name in ("action", "prob"):
+            if not csr.has_edge_property(name):
+                raise ValueError(f"{repr(csr)} has no `{name}` edge property.")
+
+        matrices = csr.to_numpy(weight="prob", by="action")
+        if actions is None:
+            actions = getattr(csr, "actions", None)
+        if actions is None:
+            actions = list(matrices)
+        unknown = set(matrices) - set(actions)
+        if unknown:
+            raise ValueError(f"Edges of {repr(csr)} are labeled with unknown actions {unknown}.")
+
+        self.graph = csr
+        self.actions = list(actions)
+        self.act2id = {act: aid for aid, act in enumerate(self.actions)}
+
+        # Row `aid * n + u` of stacked matrix is the distribution over successors of `u` under action `aid`.
+        n = csr.number_of_nodes()
+        empty = sp.csr_matrix((n, n))
+        self.transitions = [matrices.get(act, empty) for act in self.actions]
+        self._stacked = sp.vstack(self.transitions, format="csr")
+        self.enabled = (np.diff(self._stacked.indptr) > 0).reshape(len(self.actions), n).T
+        self._by_state = None
+
+    def __repr__(self):
+        return f"<MDP with |S|={self.num_states}, |A|={self.num_actions}>"
+
+    @property
+    def num_states(self):
+        return self.graph.number_of_nodes()
+
+    @property
+    def num_actions(self):
+        return len(self.actions)
+
+    def policy_actions(self, policy):
+        """ Returns an object array with the action (None for -1) chosen by policy at every node. """
+        actions = np.empty(self.num_actions + 1, dtype=object)
+        for aid, act in enumerate(self.actions):
+            actions[aid] = act
+        return actions[np.asarray(policy)]
+
+    def q_values(self, values, reward=0.0, gamma=1.0):
+        """
+        Computes `reward + gamma * P[a] @ values` for all nodes and actions.
+
+        :return: (np.ndarray) (|S|, |A|) array. Entries of disabled actions are -inf.
+        """
+        q = (self._stacked @ values).reshape(self.num_actions, self.num_states).T
+        q = self._reward_matrix(reward) + gamma * q
+        q[~self.enabled] = -np.inf
+        return q
+
+    def value_iteration(self, reward, gamma=0.95, tol=1e-6, max_iter=10000, gauss_seidel=False, init=None):
+        """
+        Computes optimal (maximal) expected discounted total reward.
+
+        :param reward: (float or np.ndarray) reward of every node (|S|,) or of every node-action pair (|S|, |A|).
+        :param gamma: (float) discount factor.
+        :param tol: (float) iteration stops when no value changes by more than `tol`.
+        :param max_iter: (int) maximum number of iterations (sweeps, if `gauss_seidel`).
+        :param gauss_seidel: (bool) If True, values are updated in-place node by node.
+            Needs fewer iterations, but each sweep runs a Python loop over nodes.
+        :param init: (np.ndarray or None) initial values (warm start). Defaults to zeros.
+        :return: 2-tuple (values, policy) of arrays over nodes.
+        """
+        reward = self._reward_matrix(reward)
+        values = self._iterate(reward, gamma, None, tol, max_iter, gauss_seidel, init)
+        return values, self._greedy_policy(self.q_values(values, reward, gamma))
+
+    def policy_evaluation(self, policy, reward, gamma=0.95, tol=1e-6, max_iter=10000, init=None, direct=False):
+        """
+        Computes expected discounted total reward of a memoryless deterministic policy.
+
+        :param policy: (np.ndarray) action id for every node (-1 for none).
+        :param direct: (bool) If True, the linear system `(I - gamma * P_pi) v = r_pi` is solved directly
+            (requires gamma < 1). Otherwise, it is solved iteratively starting from `init`.
+        :return: (np.ndarray) values of nodes.
+
+        See `value_iteration` for the other parameters.
+        """
+        n = self.num_states
+        policy = np.asarray(policy, dtype=np.int64)
+        nodes = np.arange(n)
+        has_action = policy >= 0
+        rows = np.where(has_action, policy * n + nodes, 0)
+        p_pi = sp.diags(has_action.astype(np.float64)) @ self._stacked[rows]
+        r_pi = np.where(has_action, self._reward_matrix(reward)[nodes, np.maximum(policy, 0)], 0.0)
+
+        if direct:
+            return spla.spsolve((sp.identity(n, format="csc") - gamma * p_pi).tocsc(), r_pi)
+
+        values = np.zeros(n) if init is None else np.array(init, dtype=np.float64)
+        delta = np.inf
+        for _ in range(max_iter):
+            new_values = r_pi + gamma * (p_pi @ values)
+            delta = np.max(np.abs(new_values - values), initial=0.0)
+            values = new_values
+            if delta <= tol:
+                return values
+        logging.warning(f"Policy evaluation did not converge within {max_iter} iterations (delta={delta}).")
+        return values
+
+    def policy_iteration(self, reward, gamma=0.95, tol=1e-6, max_iter=1000, init=None):
+        """
+        Computes optimal (maximal) expected discounted total reward using policy iteration.
+        Every policy is evaluated by solving its linear system directly (requires gamma < 1).
+
+        :param init: (np.ndarray or None) initial policy (warm start). Defaults to the first enabled action.
+        :param tol: (float) an action replaces the current one only if it improves Q-value by more than `tol`.
+        :return: 2-tuple (values, policy) of arrays over nodes.
+
+        See `value_iteration` for the other parameters.
+        """
+        reward = self._reward_matrix(reward)
+        nodes = np.arange(self.num_states)
+        if init is None:
+            policy = np.where(self.enabled.any(axis=1), np.argmax(self.enabled, axis=1), -1)
+        else:
+            policy = np.array(init, dtype=np.int64)
+
+        for _ in range(max_iter):
+            values = self.policy_evaluation(policy, reward, gamma, direct=True)
+            q = self.q_values(values, reward, gamma)
+            best = self._greedy_policy(q)
+            current = np.where(policy >= 0, q[nodes, np.maximum(policy, 0)], -np.inf)
+            improve = (best >= 0) & (q[nodes, np.maximum(best, 0)] > current + tol)
+            if not improve.any():
+                return values, policy
+            policy = np.where(improve, best, policy)
+        logging.warning(f"Policy iteration did not converge within {max_iter} iterations.")
+        return values, policy
+
+    def max_reach_prob(self, targets, tol=1e-6, max_iter=10000, gauss_seidel=False, init=None):
+        """
+        Computes maximal probability of eventually visiting `targets`.
+
+        :param targets: (np.ndarray) boolean mask over nodes, or array of nodes.
+        :param init: (np.ndarray or None) initial values (warm start). Must not exceed the solution
+            for iteration to converge to it. Defaults to zeros.
+        :return: 2-tuple (values, policy) of arrays over nodes. Following policy from a node with
+            positive value reaches `targets` with the (approximately) optimal probability.
+
+        See `value_iteration` for the other parameters.
+        """
+        targets = np.asarray(targets)
+        if targets.dtype != bool:
+            mask = np.zeros(self.num_states, dtype=bool)
+            mask[targets] = True
+            targets = mask
+
+        values = self._iterate(0.0, 1.0, targets, tol, max_iter, gauss_seidel, init)
+        return values, self._reach_policy(values, targets, tol)
+
+    def _reward_matrix(self, reward):
+        reward = np.asarray(reward, dtype=np.float64)
+        if reward.ndim == 1:
+            reward = reward[:, np.newaxis]
+        return np.broadcast_to(reward, (self.num_states, self.num_actions))
+
+    def _greedy_policy(self, q):
+        return np.where(self.enabled.any(axis=1), np.argmax(q, axis=1), -1)
+
+    def _iterate(self, reward, gamma, targets, tol, max_iter, gauss_seidel, init):
+        """ Value iteration. Nodes in `targets` (if given) are fixed to 1. """
+        reward = self._reward_matrix(reward)
+        has_action = self.enabled.any(axis=1)
+        values = np.zeros(self.num_states) if init is None else np.array(init, dtype=np.float64)
+        values[~has_action] = 0.0
+        if targets is not None:
+            values[targets] = 1.0
+
+        update = has_action if targets is None else has_action & ~targets
+        sweep = self._gauss_seidel_sweep if gauss_seidel else self._jacobi_sweep
+        delta = np.inf
+        for _ in range(max_iter):
+            delta = sweep(values, reward, gamma, update)
+            if delta <= tol:
+                return values
+        logging.warning(f"Value iteration did not converge within {max_iter} iterations (delta={delta}).")
+        return values
+
+    def _jacobi_sweep(self, values, reward, gamma, update):
+        new_values = np.max(self.q_values(values, reward, gamma), axis=1)
+        delta = np.max(np.abs(new_values[update] - values[update]), initial=0.0)
+        values[update] = new_values[update]
+        return delta
+
+    def _gauss_seidel_sweep(self, values, reward, gamma, update):
+        # Rows of every node are contiguous: row `u * |A| + aid`.
+        if self._by_state is None:
+            n, num_act = self.num_states, self.num_actions
+            order = (np.arange(n)[:, np.newaxis] + n * np.arange(num_act)[np.newaxis, :]).reshape(-1)
+            self._by_state = self._stacked[order]
+        indptr, indices, data = self._by_state.indptr, self._by_state.indices, self._by_state.data
+
+        num_act = self.num_actions
+        delta = 0.0
+        for u in np.flatnonzero(update):
+            row_ptr = indptr[u * num_act: (u + 1) * num_act + 1]
+            lo, hi = row_ptr[0], row_ptr[-1]
+            cumsum = np.concatenate([[0.0], np.cumsum(data[lo:hi] * values[indices[lo:hi]])])
+            q = reward[u] + gamma * (cumsum[row_ptr[1:] - lo] - cumsum[row_ptr[:-1] - lo])
+            value = np.max(q[self.enabled[u]])
+            delta = max(delta, abs(value - values[u]))
+            values[u] = value
+        return delta
+
+    def _reach_policy(self, values, targets, tol):
+        """
+        Chooses, for every node with positive value, an optimal action with a successor closer to targets.
+        Taking any optimal action could otherwise loop forever among nodes with equal values.
+        """
+        n = self.num_states
+        q = self.q_values(values)
+        policy = self._greedy_policy(q)
+
+        # Edges (in stacked matrix) of near-optimal actions at nodes with positive value, grouped by target.
+        stacked = self._stacked.tocoo()
+        aid, src = np.divmod(stacked.row, n)
+        keep = (values[src] > 0) & ~targets[src] & (q[src, aid] >= values[src] - tol)
+        aid, src, dst = aid[keep], src[keep], stacked.col[keep]
+        order = np.argsort(dst, kind="stable")
+        aid, src = aid[order], src[order]
+        in_indptr = np.concatenate([[0], np.cumsum(np.bincount(dst, minlength=n))])
+
+        # Backward BFS from targets: every newly reached node picks an action into the previous level.
+        done = targets.copy()
+        frontier = np.flatnonzero(done)
+        while len(frontier) > 0:
+            pos = gather_positions(in_indptr, frontier)
+            pos = pos[~done[src[pos]]]
+            nodes, first = np.unique(src[pos], return_index=True)
+            policy[nodes] = aid[pos[first]]
+            done[nodes] = True
+            frontier = nodes
+        return policy
@@ -0,0 +1,273 @@
+"""
+Multi-agent gridworlds as products of single-agent gridworlds.
+
+Every agent moves on its own copy of a grid of dimension `(rows, cols)`. Its dynamics is a transition table
+built once: `succ[cell, aid, b]` is the cell reached from `cell` (row-major index `row * cols + col`) under the
+agent's action `aid` in branch `b`, and `prob[cell, aid, b]` is the probability of that branch (quantitative
+agents only). A branch with successor -1 denotes a disabled action.
+
+The joint state of `k` agents is the flat tuple `(r_1, c_1, ..., r_k, c_k)`, followed by `turn` in turn-based
+products. Joint transitions are computed by `delta_batch` for arrays of joint states by indexing the per-agent
+tables, i.e. the geometry of a grid is never re-simulated:
+    * concurrent: all agents move at once. Actions are tuples `(a_1, ..., a_k)`. The branches of a joint
+      transition are the outer product of the branches of agents (probabilities are multiplied).
+    * turn-based: only the agent `turn` (1, ..., k) moves; afterwards, the turn passes to the next agent.
+      Actions are the union of actions of agents. An action that the moving agent does not have is disabled.
+
+Collisions (two agents in the same cell) are resolved by the collision rule:
+    * `COLLISION_ALLOW`: agents may share a cell.
+    * `COLLISION_BLOCK`: a joint move that ends in a collision is undone (agents stay; the turn still passes).
+    * `COLLISION_SINK`: a joint state with a collision is absorbing.
+
+Example:
+    p1 = GridAgent.from_dynamics(GridDynamics((5, 5), GW_ACT_4, obstacles=[(2, 2)]))
+    p2 = GridAgent.from_dynamics(GridDynamics((5, 5), GW_ACT_5))
+    tsgen = ProductGridworld([p1, p2], turn_based=True, collision=COLLISION_SINK)
+    gw = Gridworld(tsgen, encoder=tsgen.encoder)
+"""
+import itertools
+import numpy as np
+from encoding import StateEncoder
+from gw_build import compute_transitions
+from tsgen import TSGenerator
+
+
+# GLOBALS: COLLISION RULES
+COLLISION_ALLOW = "allow"
+COLLISION_BLOCK = "block"
+COLLISION_SINK = "sink"
+
+
+class GridAgent:
+    def __init__(self, dim, actions, succ, prob=None):
+        """
+        :param dim: (tuple) (rows, cols) of grid.
+        :param actions: (list) actions of agent. The i-th action has action id `i`.
+        :param succ: (np.ndarray) (rows * cols, |A|) or (rows * cols, |A|, B) integer array of successor cells.
+        :param prob: (np.ndarray or None) (rows * cols, |A|, B) array of branch probabilities (quantitative agent).
+        """
+        self.dim = tuple(dim)
+        self.actions = list(actions)
+        self.act2id = {act: aid for aid, act in enumerate(self.actions)}
+        succ = np.asarray(succ, dtype=np.int64)
+        self.succ = succ[:, :, np.newaxis] if succ.ndim == 2 else succ
+        self.prob = None if prob is None else np.asarray(prob, dtype=np.float64).reshape(self.succ.shape)
+        assert self.succ.shape[:2] == (self.dim[0] * self.dim[1], len(self.actions)), \
+            f"Expected transition table of shape {(self.dim[0] * self.dim[1], len(self.actions))}[+(B,)]. " \
+            f"Received {self.succ.shape}."
+
+    def __repr__(self):
+        return f"<GridAgent with dim={self.dim}, |A|={len(self.actions)}, branches={self.num_branches}>"
+
+    @property
+    def num_branches(self):
+        return self.succ.shape[2]
+
+    @property
+    def deterministic(self):
+        return self.num_branches == 1 and self.prob is None
+
+    @classmethod
+    def from_dynamics(cls, dynamics):
+        """ Constructs a (deterministic) agent from `gw_utils.GridDynamics`. """
+        return cls(dynamics.dim, dynamics.actions, dynamics.transition_table())
+
+    @classmethod
+    def from_tsgen(cls, tsgen, validate=True):
+        """
+        Constructs an agent from a single-agent generator with states `(row, col)` (e.g. `examples2/simple_gw.py`).
+        `tsgen.delta` (or `delta_batch`) is evaluated once for every cell and action.
+        """
+        dim = tuple(tsgen.dim() if callable(tsgen.dim) else tsgen.dim)
+        deterministic = getattr(tsgen, "DETERMINISTIC", None)
+        qualitative = getattr(tsgen, "QUALITATIVE", None)
+        deterministic = tsgen.deterministic if deterministic is None else deterministic
+        qualitative = tsgen.qualitative if qualitative is None else qualitative
+
+        encoder = StateEncoder.from_dim(dim)
+        actions = list(tsgen.actions())
+        u, v, aid, prob = compute_transitions(tsgen, encoder, actions, encoder, deterministic, qualitative, validate)
+
+        # Pad transitions of every (cell, action) slot to the maximum number of branches.
+        num_slots = encoder.size * len(actions)
+        slot = u * len(actions) + aid
+        counts = np.bincount(slot, minlength=num_slots)
+        start = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        branch = np.arange(len(slot)) - start[slot]
+        num_branches = max(int(counts.max(initial=0)), 1)
+
+        succ = np.full((num_slots, num_branches), -1, dtype=np.int64)
+        succ[slot, branch] = v
+        # Padding branches repeat the first successor (qualitative) or have probability 0 (quantitative).
+        has_succ = counts > 0
+        first = np.where(has_succ, succ[:, 0], -1)
+        succ = np.where(succ >= 0, succ, first[:, np.newaxis])
+        probs = None
+        if prob is not None:
+            probs = np.zeros((num_slots, num_branches))
+            probs[slot, branch] = prob
+            probs = probs.reshape(encoder.size, len(actions), num_branches)
+        return cls(dim, actions, succ.reshape(encoder.size, len(actions), num_branches), probs)
+
+
+class ProductGridworld(TSGenerator):
+    def __init__(self, agents, turn_based=True, collision=COLLISION_ALLOW):
+        """
+        :param agents: (list of GridAgent) agents on grids of the same dimension. Agent `i` is player `i + 1`.
+        :param turn_based: (bool) If True, agents move one at a time. Otherwise, all agents move concurrently.
+        :param collision: (str) collision rule `COLLISION_ALLOW`, `COLLISION_BLOCK` or `COLLISION_SINK`.
+        """
+        if collision not in (COLLISION_ALLOW, COLLISION_BLOCK, COLLISION_SINK):
+            raise ValueError(f"Unknown collision rule: {collision}.")
+        if len({agent.dim for agent in agents}) != 1:
+            raise ValueError(f"Agents must move on grids of the same dimension. Received {[a.dim for a in agents]}.")
+        quantitative = [agent.prob is not None for agent in agents]
+        if any(quantitative) and not all(quantitative):
+            raise ValueError("Cannot compose quantitative agents with deterministic or qualitative agents.")
+
+        self.agents = list(agents)
+        self.collision = collision
+        self._dim = agents[0].dim
+
+        # Generator type (instance attributes override the TSGenerator class attributes).
+        self.TURN_BASED = turn_based
+        self.QUALITATIVE = not all(quantitative)
+        self.DETERMINISTIC = all(agent.deterministic for agent in agents)
+
+        # Joint states (r_1, c_1, ..., r_k, c_k[, turn]) are encoded by a mixed-radix encoder.
+        ranges = [range(n) for _ in self.agents for n in self._dim]
+        if turn_based:
+            ranges.append(range(1, len(self.agents) + 1))
+        self.encoder = StateEncoder(*ranges)
+
+        if turn_based:
+            self._actions = list(dict.fromkeys(act for agent in self.agents for act in agent.actions))
+        else:
+            self._actions = list(itertools.product(*(agent.actions for agent in self.agents)))
+
+    def __repr__(self):
+        return f"<ProductGridworld with {len(self.agents)} agents, dim={self._dim}, " \
+               f"turn_based={self.TURN_BASED}, collision={self.collision}>"
+
+    def dim(self):
+        return self._dim
+
+    def states(self):
+        """ Joint states. Returns the state encoder (iterable over states). """
+        return self.encoder
+
+    def actions(self):
+        return list(self._actions)
+
+    def turn(self, state):
+        if not self.TURN_BASED:
+            raise NotImplementedError("turn is not defined for concurrent products.")
+        return state[-1]
+
+    def positions(self, states):
+        """ Returns (N, k) array of cells (row-major index) of the k agents in (N, d) array of joint states. """
+        states = np.asarray(states, dtype=np.int64)
+        num_agents = len(self.agents)
+        return states[:, 0:2 * num_agents:2] * self._dim[1] + states[:, 1:2 * num_agents:2]
+
+    def delta(self, state, act):
+        n_states = self.delta_batch(np.asarray([state], dtype=np.int64), act)
+        if self.DETERMINISTIC:
+            n_state = n_states[0]
+            return None if np.all(n_state == -1) else tuple(n_state.tolist())
+        if self.QUALITATIVE:
+            return {tuple(n_state) for n_state in n_states[0].tolist() if n_state[0] != -1}
+
+        dist = dict()
+        for n_state, p in zip(n_states[0][0].tolist(), n_states[1][0].tolist()):
+            if n_state[0] != -1 and p > 0:
+                dist[tuple(n_state)] = dist.get(tuple(n_state), 0.0) + p
+        return list(dist.items())
+
+    def delta_batch(self, states, act):
+        """
+        Vectorized joint transition function (see `TSGenerator.delta_batch`).
+        Next states of disabled actions are filled with -1.
+        """
+        states = np.asarray(states, dtype=np.int64)
+        cells = self.positions(states)
+        if self.TURN_BASED:
+            turn = states[:, -1]
+            succ, prob = self._turn_successors(cells, turn, act)
+        else:
+            turn = None
+            succ, prob = self._joint_successors(cells, act)
+
+        # Resolve collisions.
+        disabled = np.any(succ < 0, axis=2)
+        stay = np.broadcast_to(cells[:, np.newaxis, :], succ.shape)
+        absorbing = np.zeros(len(states), dtype=bool)
+        if self.collision == COLLISION_BLOCK:
+            succ = np.where(_has_collision(succ)[:, :, np.newaxis], stay, succ)
+        elif self.collision == COLLISION_SINK:
+            absorbing = _has_collision(cells)
+            succ = np.where(absorbing[:, np.newaxis, np.newaxis], stay, succ)
+            disabled &= ~absorbing[:, np.newaxis]
+            if prob is not None:
+                prob = np.where(absorbing[:, np.newaxis], np.eye(1, prob.shape[1]), prob)
+
+        # Assemble joint next states.
+        n_states = np.empty(succ.shape[:2] + (states.shape[1],), dtype=np.int64)
+        num_pos = 2 * len(self.agents)
+        n_states[:, :, 0:num_pos:2], n_states[:, :, 1:num_pos:2] = np.divmod(succ, self._dim[1])
+        if self.TURN_BASED:
+            n_turn = np.where(absorbing, turn, turn % len(self.agents) + 1)
+            n_states[:, :, -1] = n_turn[:, np.newaxis]
+        n_states[disabled] = -1
+
+        if self.DETERMINISTIC:
+            return n_states[:, 0, :]
+        if self.QUALITATIVE:
+            return n_states
+        return n_states, prob
+
+    def _turn_successors(self, cells, turn, act):
+        num_branches = max(agent.num_branches for agent in self.agents)
+        succ = np.repeat(cells[:, np.newaxis, :], num_branches, axis=1)
+        prob = None
+        if not self.QUALITATIVE:
+            prob = np.zeros((len(cells), num_branches))
+
+        for i, agent in enumerate(self.agents):
+            rows = np.flatnonzero(turn == i + 1)
+            aid = agent.act2id.get(act)
+            if aid is None:
+                succ[rows] = -1
+                continue
+            a_succ = agent.succ[cells[rows, i], aid]
+            # Pad branches of agent (repeat first successor, with probability 0).
+            pad = num_branches - agent.num_branches
+            succ[rows, :, i] = np.concatenate([a_succ, np.repeat(a_succ[:, :1], pad, axis=1)], axis=1)
+            if prob is not None:
+                prob[rows, :agent.num_branches] = agent.prob[cells[rows, i], aid]
+        return succ, prob
+
+    def _joint_successors(self, cells, act):
+        num_agents = len(self.agents)
+        shape = (len(cells),) + tuple(agent.num_branches for agent in self.agents)
+        succ = np.empty(shape + (num_agents,), dtype=np.int64)
+        prob = None if self.QUALITATIVE else np.ones(shape)
+
+        # Outer product of branches: agent i varies along axis i + 1.
+        for i, (agent, a_act) in enumerate(zip(self.agents, act)):
+            aid = agent.act2id[a_act]
+            axes = [1] * num_agents
+            axes[i] = agent.num_branches
+            succ[..., i] = agent.succ[cells[:, i], aid].reshape((len(cells),) + tuple(axes))
+            if prob is not None:
+                prob = prob * agent.prob[cells[:, i], aid].reshape((len(cells),) + tuple(axes))
+
+        num_branches = int(np.prod(shape[1:]))
+        return succ.reshape(len(cells), num_branches, num_agents), \
+            None if prob is None else prob.reshape(len(cells), num_branches)
+
+
+def _has_collision(cells):
+    """ Returns mask over cells[..., :] (last axis: agents) that is True if two agents share a cell. """
+    ordered = np.sort(cells, axis=-1)
+    return np.any(np.diff(ordered, axis=-1) == 0, axis=-1)
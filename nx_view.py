@@ -0,0 +1,151 @@
+"""
+Read-only networkx views of `Graph` and `CSRGraph`.
+
+A view is a frozen `networkx.MultiDiGraph` (or `networkx.DiGraph`) whose node and adjacency dictionaries
+are replaced by mappings that read the adjacency and the property maps of the underlying graph on demand.
+Nothing is copied when the view is created; the neighbors of a node are collected when the node is accessed.
+
+:note: Attribute dictionaries of the view are read-only. Changes to the underlying graph are visible in the view.
+"""
+import networkx as nx
+import numpy as np
+from collections.abc import Mapping
+
+
+def view(graph, node_properties=None, edge_properties=None, multigraph=True):
+    """
+    Returns a read-only networkx view of graph.
+
+    :param graph: (Graph or CSRGraph) graph.
+    :param node_properties: (iterable of str or None) node properties visible as node attributes. Defaults to all.
+    :param edge_properties: (iterable of str or None) edge properties visible as edge attributes. Defaults to all.
+    :param multigraph: (bool) If False, the view is a `networkx.DiGraph` in which parallel edges are collapsed.
+        Attributes of a collapsed edge are those of the edge with the largest key.
+    :return: (networkx.MultiDiGraph or networkx.DiGraph)
+    """
+    v_props = _select(graph._v_props, node_properties)
+    e_props = _select(graph._e_props, edge_properties)
+
+    nx_graph = nx.MultiDiGraph() if multigraph else nx.DiGraph()
+    nx_graph._node = _NodeMap(graph, v_props)
+    nx_graph._adj = _AdjacencyMap(graph, e_props, multigraph, reverse=False)
+    nx_graph._succ = nx_graph._adj
+    nx_graph._pred = _AdjacencyMap(graph, e_props, multigraph, reverse=True)
+    return nx.freeze(nx_graph)
+
+
+def _select(p_maps, names):
+    if names is None:
+        return dict(p_maps)
+    return {name: p_maps[name] for name in names}
+
+
+def _is_node(graph, node):
+    return isinstance(node, (int, np.integer)) and 0 <= node and graph.has_node(node)
+
+
+class _PropertyMap(Mapping):
+    """ Attribute dictionary {property-name: value} of one node or edge. """
+    def __init__(self, p_maps, key):
+        self._p_maps = p_maps
+        self._key = key
+
+    def __getitem__(self, name):
+        return self._p_maps[name][self._key]
+
+    def __iter__(self):
+        return iter(self._p_maps)
+
+    def __len__(self):
+        return len(self._p_maps)
+
+
+class _NodeMap(Mapping):
+    """ {node: attribute dictionary}. """
+    def __init__(self, graph, v_props):
+        self._graph = graph
+        self._v_props = v_props
+
+    def __getitem__(self, node):
+        if not _is_node(self._graph, node):
+            raise KeyError(node)
+        return _PropertyMap(self._v_props, node)
+
+    def __contains__(self, node):
+        return _is_node(self._graph, node)
+
+    def __iter__(self):
+        return iter(self._graph.nodes())
+
+    def __len__(self):
+        return self._graph.number_of_nodes()
+
+
+class _AdjacencyMap(Mapping):
+    """ {node: {neighbor: ...}} over out-edges (or in-edges, if `reverse`). """
+    def __init__(self, graph, e_props, multigraph, reverse):
+        self._graph = graph
+        self._e_props = e_props
+        self._multigraph = multigraph
+        self._reverse = reverse
+
+    def __getitem__(self, node):
+        if not _is_node(self._graph, node):
+            raise KeyError(node)
+        return _NeighborMap(self, node)
+
+    def __contains__(self, node):
+        return _is_node(self._graph, node)
+
+    def __iter__(self):
+        return iter(self._graph.nodes())
+
+    def __len__(self):
+        return self._graph.number_of_nodes()
+
+
+class _NeighborMap(Mapping):
+    """ {neighbor: {key: attribute dictionary}}, or {neighbor: attribute dictionary} if not multigraph. """
+    def __init__(self, adj, node):
+        self._adj = adj
+        self._node = node
+        self._keys = dict()
+        edges = adj._graph.in_edges(node) if adj._reverse else adj._graph.out_edges(node)
+        for u, v, k in edges:
+            self._keys.setdefault(u if adj._reverse else v, []).append(k)
+
+    def __getitem__(self, nbr):
+        keys = self._keys[nbr]
+        u, v = (nbr, self._node) if self._adj._reverse else (self._node, nbr)
+        if self._adj._multigraph:
+            return _KeyMap(self._adj._e_props, u, v, keys)
+        return _PropertyMap(self._adj._e_props, (u, v, max(keys)))
+
+    def __contains__(self, nbr):
+        return nbr in self._keys
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+
+class _KeyMap(Mapping):
+    """ {key: attribute dictionary} of parallel edges from u to v. """
+    def __init__(self, e_props, u, v, keys):
+        self._e_props = e_props
+        self._u = u
+        self._v = v
+        self._keys = keys
+
+    def __getitem__(self, k):
+        if k not in self._keys:
+            raise KeyError(k)
+        return _PropertyMap(self._e_props, (self._u, self._v, k))
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
@@ -0,0 +1,87 @@
+"""
+Reachability over CSR adjacency using NumPy boolean visited masks.
+
+Nodes are expanded frontier-at-a-time (level-synchronous BFS): the neighbors of all nodes in the current
+frontier are gathered in one vectorized operation. All functions accept multiple sources.
+
+:note: Functions operate on `CSRGraph`. A `Graph` is frozen (in O(|E|)) before the search.
+"""
+import numpy as np
+
+
+def bfs_levels(graph, sources, reverse=False, visited=None):
+    """
+    Generates BFS levels (frontiers) from given sources.
+
+    :param graph: (Graph or CSRGraph) graph.
+    :param sources: (int or iterable of int) source nodes. The first level consists of the sources.
+    :param reverse: (bool) If True, in-edges are followed instead of out-edges.
+    :param visited: (np.ndarray or None) boolean mask of nodes to treat as already visited. Updated in-place.
+    :return: Generator over (np.ndarray) frontiers. Every node appears in at most one frontier.
+    """
+    csr = graph.freeze()
+    indptr, indices = (csr.in_indptr, csr.in_indices) if reverse else (csr.indptr, csr.indices)
+    if visited is None:
+        visited = np.zeros(csr.number_of_nodes(), dtype=bool)
+
+    frontier = np.unique(np.asarray(sources, dtype=np.int64).reshape(-1))
+    frontier = frontier[~visited[frontier]]
+    visited[frontier] = True
+    while len(frontier) > 0:
+        yield frontier
+        nbrs = gather_neighbors(indptr, indices, frontier)
+        frontier = np.unique(nbrs[~visited[nbrs]])
+        visited[frontier] = True
+
+
+def reachable(graph, sources, reverse=False, as_mask=False):
+    """
+    Computes the set of nodes reachable from sources (including sources).
+
+    :param graph: (Graph or CSRGraph) graph.
+    :param sources: (int or iterable of int) source nodes.
+    :param reverse: (bool) If True, computes the nodes that can reach any of the sources.
+    :param as_mask: (bool) If True, returns a boolean mask over nodes. Otherwise, returns a sorted array of nodes.
+    """
+    # Size the mask by the frozen graph, which keeps node ids of (e.g. hidden nodes of) a `SubGraph`.
+    csr = graph.freeze()
+    visited = np.zeros(csr.number_of_nodes(), dtype=bool)
+    for _ in bfs_levels(csr, sources, reverse, visited):
+        pass
+    return visited if as_mask else np.flatnonzero(visited)
+
+
+def descendants(graph, sources, as_mask=False):
+    """
+    Computes the nodes reachable from sources by a path of length at least one.
+    A source is included only if it lies on a cycle.
+    """
+    csr = graph.freeze()
+    sources = np.asarray(sources, dtype=np.int64).reshape(-1)
+    return reachable(csr, gather_neighbors(csr.indptr, csr.indices, sources), as_mask=as_mask)
+
+
+def ancestors(graph, sources, as_mask=False):
+    """
+    Computes the nodes that reach any of the sources by a path of length at least one.
+    A source is included only if it lies on a cycle.
+    """
+    csr = graph.freeze()
+    sources = np.asarray(sources, dtype=np.int64).reshape(-1)
+    return reachable(csr, gather_neighbors(csr.in_indptr, csr.in_indices, sources), reverse=True, as_mask=as_mask)
+
+
+def gather_neighbors(indptr, indices, nodes):
+    """
+    Returns the concatenation of `indices[indptr[u]:indptr[u + 1]]` for all `u` in nodes (with repetitions).
+    """
+    return indices[gather_positions(indptr, nodes)].astype(np.int64)
+
+
+def gather_positions(indptr, nodes):
+    """
+    Returns the concatenation of `range(indptr[u], indptr[u + 1])` for all `u` in nodes.
+    """
+    starts = indptr[nodes]
+    counts = indptr[nodes + 1] - starts
+    return np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
@@ -0,0 +1,215 @@
+"""
+Headless Monte Carlo simulation of policies on (stochastic) transition system graphs.
+
+K trajectories are advanced in lockstep: at every step, the actions and successors of all trajectories are
+sampled with one vectorized operation. Successors are sampled from cumulative probabilities stored per
+(node, action) slot of a `TransitionIndex`: within slot `s`, transition `i` has key `s + cdf_i`, where `cdf_i`
+is the normalized cumulative probability. A uniform sample `r` in slot `s` selects the first transition whose
+key exceeds `s + r` (one `np.searchsorted` over all trajectories). In qualitative transition systems,
+successors are sampled uniformly.
+
+Random numbers are drawn from seeded `np.random.Generator` streams. When sampling is sharded over worker
+processes, every shard uses an independent stream spawned from the seed, so results are reproducible.
+"""
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from tsys import TransitionIndex
+
+
+# Per-process sampler of worker processes. Set by `_init_worker`.
+_worker_sampler = None
+
+
+class TrajectorySampler:
+    def __init__(self, graph, policy, actions=None):
+        """
+        :param graph: (Graph) transition system graph with `action` (and, if quantitative, `prob`) edge properties.
+            The transition index of a gridworld graph is reused, if available.
+        :param policy: The action to choose at every node. One of
+            * (dict) {node: action}. Nodes not in dict have no action.
+            * (np.ndarray) (|V|,) array of actions, or of action ids (integers, -1 for no action).
+            * (np.ndarray) (|V|, |A|) array of action probabilities (stochastic policy). Columns are action ids.
+        :param actions: (iterable or None) actions defining action ids. Defaults to actions of transition index.
+        """
+        index = getattr(graph, "_trans_index", None)
+        if index is None or (actions is not None and list(actions) != index.id2act):
+            index = TransitionIndex.from_graph(graph, None if actions is None else list(actions))
+        self.index = index
+        self.actions = index.id2act
+        self.num_nodes = index.num_nodes
+        self.node_dtype = np.int32 if self.num_nodes < np.iinfo(np.int32).max else np.int64
+
+        # Keys for sampling successors: slot + normalized cumulative probability within slot.
+        num_slots = len(index.indptr) - 1
+        degree = np.diff(index.indptr)
+        slot_of = np.repeat(np.arange(num_slots, dtype=np.int64), degree)
+        weight = np.ones(len(index.succ)) if index.prob is None else index.prob
+        self._succ_key = slot_of + _slot_cdf(weight, index.indptr, slot_of)
+
+        # Policy as array of action ids or as keys for sampling actions (same scheme, one slot per node).
+        self.stochastic = False
+        self._action = None
+        self._action_key = None
+        self._has_action = None
+        self._set_policy(policy)
+
+    def __repr__(self):
+        return f"<TrajectorySampler with |V|={self.num_nodes}, |A|={len(self.actions)}, " \
+               f"stochastic={self.stochastic}>"
+
+    def sample(self, init, horizon, num_samples=None, targets=None, seed=None, workers=None):
+        """
+        Samples trajectories of the policy.
+
+        :param init: (int or np.ndarray) initial node of all trajectories, or array of K initial nodes.
+        :param horizon: (int) number of steps.
+        :param num_samples: (int or None) number of trajectories K, if `init` is a single node.
+        :param targets: (np.ndarray or None) boolean mask over nodes, or array of nodes. A trajectory stops
+            at its first visit to targets.
+        :param seed: (int, np.random.SeedSequence or None) seed of random number streams.
+        :param workers: (int or None) number of worker processes. Trajectories are split into one shard per worker.
+        :return: (np.ndarray) (K, horizon + 1) integer array. Row `i` is the i-th trajectory of nodes.
+            Once a trajectory stops (at targets, or at a node without action or successors), the remaining
+            entries are -1.
+        """
+        init, targets = self._prepare(init, num_samples, targets)
+        shards = self._shards(init, seed, workers)
+        args = [(shard_init, horizon, targets, shard_seed, True) for shard_init, shard_seed in shards]
+        return np.concatenate(self._map(_simulate, args, workers), axis=0)
+
+    def success_rate(self, init, targets, horizon, num_samples=None, seed=None, workers=None):
+        """
+        Estimates the probability of visiting `targets` within `horizon` steps. Trajectories are not stored.
+
+        :return: 2-tuple (rate, hits) of the fraction of trajectories that visited targets, and the
+            (K,) boolean array of hits. See `sample` for the parameters.
+        """
+        init, targets = self._prepare(init, num_samples, targets)
+        shards = self._shards(init, seed, workers)
+        args = [(shard_init, horizon, targets, shard_seed, False) for shard_init, shard_seed in shards]
+        hits = np.concatenate(self._map(_simulate, args, workers))
+        return float(hits.mean()) if len(hits) > 0 else 0.0, hits
+
+    def step(self, nodes, rng):
+        """
+        Advances trajectories currently at `nodes` by one step.
+
+        :param nodes: (np.ndarray) current nodes.
+        :param rng: (np.random.Generator) random number generator.
+        :return: (np.ndarray) next nodes. -1 for trajectories at a node without action or successors.
+        """
+        nodes = np.asarray(nodes, dtype=np.int64)
+        if self.stochastic:
+            action = np.searchsorted(self._action_key, nodes + rng.random(len(nodes)), side="right")
+            action = np.minimum(action, (nodes + 1) * len(self.actions) - 1) - nodes * len(self.actions)
+            action[~self._has_action[nodes]] = -1
+        else:
+            action = self._action[nodes]
+
+        slot = nodes * len(self.actions) + np.maximum(action, 0)
+        start, end = self.index.indptr[slot], self.index.indptr[slot + 1]
+        alive = (action >= 0) & (end > start)
+
+        # Sample only slots with several successors (a deterministic slot has a single transition).
+        pos = start
+        branch = np.flatnonzero(alive & (end - start > 1))
+        if len(branch) > 0:
+            sampled = np.searchsorted(self._succ_key, slot[branch] + rng.random(len(branch)), side="right")
+            pos[branch] = np.minimum(sampled, end[branch] - 1)
+        return np.where(alive, self.index.succ[np.where(alive, pos, 0)], -1)
+
+    def _set_policy(self, policy):
+        num_actions = len(self.actions)
+        if isinstance(policy, dict):
+            action = np.full(self.num_nodes, -1, dtype=np.int64)
+            for node, act in policy.items():
+                action[node] = self.index.act2id[act]
+            self._action = action
+            return
+
+        policy = np.asarray(policy)
+        if policy.ndim == 2:
+            assert policy.shape == (self.num_nodes, num_actions), \
+                f"Expected policy of shape {(self.num_nodes, num_actions)}. Received {policy.shape}."
+            weight = policy.astype(np.float64).ravel()
+            indptr = np.arange(0, len(weight) + 1, num_actions, dtype=np.int64)
+            slot_of = np.repeat(np.arange(self.num_nodes, dtype=np.int64), num_actions)
+            self._action_key = slot_of + _slot_cdf(weight, indptr, slot_of)
+            self._has_action = policy.sum(axis=1) > 0
+            self.stochastic = True
+        elif policy.dtype.kind in "iu":
+            self._action = policy.astype(np.int64)
+        else:
+            self._action = np.array([-1 if act is None else self.index.act2id[act] for act in policy.tolist()],
+                                    dtype=np.int64)
+
+    def _prepare(self, init, num_samples, targets):
+        init = np.asarray(init, dtype=np.int64)
+        if init.ndim == 0:
+            init = np.full(1 if num_samples is None else num_samples, init, dtype=np.int64)
+        if targets is not None:
+            targets = np.asarray(targets)
+            if targets.dtype != bool:
+                mask = np.zeros(self.num_nodes, dtype=bool)
+                mask[targets] = True
+                targets = mask
+        return init, targets
+
+    def _shards(self, init, seed, workers):
+        num_shards = 1 if workers is None or workers <= 1 else workers
+        seed_seq = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+        return list(zip(np.array_split(init, num_shards), seed_seq.spawn(num_shards)))
+
+    def _map(self, func, args, workers):
+        if workers is None or workers <= 1:
+            return [func(self, *arg) for arg in args]
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(self,)) as executor:
+            return list(executor.map(_simulate_in_worker, args))
+
+
+def _slot_cdf(weight, indptr, slot_of):
+    """ Returns the cumulative sum of weights within every slot, normalized to 1.0 at the end of the slot. """
+    cum = np.concatenate([[0.0], np.cumsum(weight)])
+    base = cum[indptr[:-1]]
+    mass = cum[indptr[1:]] - base
+    cdf = (cum[1:] - base[slot_of]) / np.where(mass > 0, mass, 1.0)[slot_of]
+    ends = indptr[1:][np.diff(indptr) > 0] - 1
+    cdf[ends] = 1.0
+    return cdf
+
+
+def _simulate(sampler, init, horizon, targets, seed, record):
+    """ Simulates trajectories from init. Returns trajectories if `record`, else the boolean array of hits. """
+    rng = np.random.default_rng(seed)
+    nodes = init.copy()
+    trajectories = np.full((len(init), horizon + 1), -1, dtype=sampler.node_dtype) if record else None
+    hit = np.zeros(len(init), dtype=bool) if targets is None else targets[init]
+    active = np.flatnonzero(~hit)
+    if record:
+        trajectories[:, 0] = init
+
+    for t in range(1, horizon + 1):
+        if len(active) == 0:
+            break
+        nxt = sampler.step(nodes[active], rng)
+        nodes[active] = nxt
+        if record:
+            trajectories[active, t] = nxt
+        alive = nxt >= 0
+        if targets is not None:
+            reached = np.zeros(len(active), dtype=bool)
+            reached[alive] = targets[nxt[alive]]
+            hit[active[reached]] = True
+            alive &= ~reached
+        active = active[alive]
+
+    return trajectories if record else hit
+
+
+def _init_worker(sampler):
+    global _worker_sampler
+    _worker_sampler = sampler
+
+
+def _simulate_in_worker(args):
+    return _simulate(_worker_sampler, *args)
@@ -0,0 +1,259 @@
+"""
+Symbolic transition systems encoded as binary decision diagrams (BDDs).
+
+States are the codes of a `StateEncoder`. Component `i` of a state is encoded in binary (most significant bit
+first) by boolean variables `s{i}_{b}` in the current state and `t{i}_{b}` in the next state. Actions are
+encoded by their index in `actions` using variables `a_{b}`. The transition relation `T(a, s, t)` is a single
+BDD. The variable order places action variables first, followed by the bits of all components with current
+and next state bits interleaved.
+
+Sets of states are BDDs over current state variables. Pre-images, post-images, reachability and attractors
+are computed as symbolic fixpoints, so they never enumerate states.
+
+:note: Requires the `dd` package (`pip install dd`). The CUDD bindings (`dd.cudd`) are used if available,
+    otherwise the pure-Python implementation (`dd.autoref`).
+"""
+import numpy as np
+from encoding import StateEncoder
+from gw_build import compute_transitions_range
+
+try:
+    from dd.cudd import BDD
+except ImportError:
+    from dd.autoref import BDD
+
+
+class BDDGraph:
+    def __init__(self, encoder, actions, bdd=None):
+        """
+        Constructs a symbolic transition system without transitions.
+
+        :param encoder: (StateEncoder) encoding of states.
+        :param actions: (list) actions. The i-th action has action id `i`.
+        :param bdd: (BDD or None) BDD manager. Variables are declared in it. Defaults to a new manager.
+        """
+        self.encoder = encoder
+        self.actions = list(actions)
+        self.bdd = BDD() if bdd is None else bdd
+
+        # Declare variables in order: actions, then current/next bits of every component (interleaved).
+        self.action_vars = [f"a_{b}" for b in range(_num_bits(len(self.actions)))]
+        self.state_vars = [[f"s{i}_{b}" for b in range(_num_bits(n))] for i, n in enumerate(encoder.shape)]
+        self.next_vars = [[f"t{i}_{b}" for b in range(_num_bits(n))] for i, n in enumerate(encoder.shape)]
+        self._cur = [var for comp_vars in self.state_vars for var in comp_vars]
+        self._nxt = [var for comp_vars in self.next_vars for var in comp_vars]
+        self._rel_vars = self.action_vars + [var for pair in zip(self._cur, self._nxt) for var in pair]
+        self.bdd.declare(*self._rel_vars)
+        self._cur2nxt = dict(zip(self._cur, self._nxt))
+        self._nxt2cur = dict(zip(self._nxt, self._cur))
+
+        # Valid state codes: index of every component is within its range.
+        self.valid = self.bdd.true
+        for comp_vars, n in zip(self.state_vars, encoder.shape):
+            self.valid &= _rows_to_bdd(self.bdd, _to_bits(np.arange(n), len(comp_vars)), comp_vars)
+
+        self.relation = self.bdd.false
+
+    def __repr__(self):
+        return f"<BDDGraph with |S|={self.encoder.size}, |A|={len(self.actions)}>"
+
+    @classmethod
+    def from_graph(cls, graph, bdd=None):
+        """
+        Encodes a graph. States are node ids. Edges are labeled by the `action` edge property, if present.
+
+        :param graph: (Graph or CSRGraph) graph. A `Graph` is frozen first.
+        :return: (BDDGraph)
+        """
+        csr = graph.freeze()
+        if csr.has_edge_property("action"):
+            # Actions are interned in order of first occurrence (actions need not be comparable).
+            act2id = dict()
+            aid = np.fromiter((act2id.setdefault(act, len(act2id)) for act in csr.edge_property_array("action")),
+                              dtype=np.int64, count=csr.number_of_edges())
+            actions = list(act2id)
+        else:
+            actions, aid = [None], np.zeros(csr.number_of_edges(), dtype=np.int64)
+
+        bdd_graph = cls(StateEncoder(max(csr.number_of_nodes(), 1)), actions, bdd)
+        bdd_graph.add_transitions(csr.edge_sources(), aid, csr.indices)
+        return bdd_graph
+
+    @classmethod
+    def from_tsgen(cls, tsgen, encoder=None, chunk_size=2 ** 16, validate=True, bdd=None):
+        """
+        Encodes the transition system defined by a generator (e.g. `TSGenerator` or `gridworld.Gridworld`).
+        Transitions are computed for `chunk_size` states at a time (using `delta_batch`, if implemented) and
+        added to the relation, so the explicit transitions are never held in memory at once.
+
+        :param tsgen: (object) generator implementing `actions()` and `delta(state, act)`.
+        :param encoder: (StateEncoder or None) encoding of states. Defaults to `StateEncoder.from_dim(dim)`,
+            i.e. states `(row, col)`.
+        :param chunk_size: (int) number of states evaluated per chunk.
+        :param validate: (bool) whether to check that next states are valid.
+        :return: (BDDGraph)
+        """
+        if encoder is None:
+            encoder = StateEncoder.from_dim(tsgen.dim() if callable(tsgen.dim) else tsgen.dim)
+        deterministic = getattr(tsgen, "DETERMINISTIC", None)
+        qualitative = getattr(tsgen, "QUALITATIVE", None)
+        deterministic = tsgen.deterministic if deterministic is None else deterministic
+        qualitative = tsgen.qualitative if qualitative is None else qualitative
+
+        bdd_graph = cls(encoder, list(tsgen.actions()), bdd)
+        for start in range(0, encoder.size, chunk_size):
+            stop = min(start + chunk_size, encoder.size)
+            u, v, aid, _ = compute_transitions_range(
+                tsgen, encoder, start, stop, bdd_graph.actions, deterministic, qualitative, validate
+            )
+            bdd_graph.add_transitions(u, aid, v)
+        return bdd_graph
+
+    def add_transitions(self, u, aid, v):
+        """
+        Adds transitions (u[i], aid[i], v[i]) to relation.
+
+        :param u: (np.ndarray) codes of source states.
+        :param aid: (np.ndarray) action ids.
+        :param v: (np.ndarray) codes of target states.
+        """
+        bits = [_to_bits(np.asarray(aid, dtype=np.int64), len(self.action_vars))]
+        u_idx = np.unravel_index(np.asarray(u, dtype=np.int64), self.encoder.shape)
+        v_idx = np.unravel_index(np.asarray(v, dtype=np.int64), self.encoder.shape)
+        for comp_vars, u_i, v_i in zip(self.state_vars, u_idx, v_idx):
+            u_bits, v_bits = _to_bits(u_i, len(comp_vars)), _to_bits(v_i, len(comp_vars))
+            bits.append(np.stack([u_bits, v_bits], axis=2).reshape(len(u_i), -1))
+        self.relation |= _rows_to_bdd(self.bdd, np.concatenate(bits, axis=1), self._rel_vars)
+
+    def encode_states(self, states):
+        """
+        :param states: (np.ndarray) boolean mask over state codes, or array of state codes.
+        :return: (BDD node) set of states.
+        """
+        states = np.asarray(states)
+        codes = np.flatnonzero(states) if states.dtype == bool else states.astype(np.int64).reshape(-1)
+        idx = np.unravel_index(codes, self.encoder.shape)
+        bits = [_to_bits(idx_i, len(comp_vars)) for comp_vars, idx_i in zip(self.state_vars, idx)]
+        return _rows_to_bdd(self.bdd, np.concatenate(bits, axis=1), self._cur)
+
+    def decode_states(self, states):
+        """
+        :param states: (BDD node) set of states.
+        :return: (np.ndarray) sorted array of state codes.
+        """
+        idx = [[] for _ in self.state_vars]
+        for assignment in self.bdd.pick_iter(states & self.valid, care_vars=set(self._cur)):
+            for i, comp_vars in enumerate(self.state_vars):
+                idx[i].append(sum(int(assignment[var]) << b for b, var in enumerate(reversed(comp_vars))))
+        if len(idx[0]) == 0:
+            return np.zeros(0, dtype=np.int64)
+        return np.sort(np.ravel_multi_index(tuple(np.asarray(idx_i) for idx_i in idx), self.encoder.shape))
+
+    def count(self, states):
+        """ Returns the number of states in the set (without enumerating them). """
+        return int(self.bdd.count(states & self.valid, nvars=len(self._cur)))
+
+    def encode_actions(self, actions):
+        """ Returns a BDD over action variables that is true for given actions. """
+        aid = np.asarray([self.actions.index(act) for act in actions], dtype=np.int64)
+        return _rows_to_bdd(self.bdd, _to_bits(aid, len(self.action_vars)), self.action_vars)
+
+    def post(self, states, actions=None):
+        """
+        Returns the set of successors of states, i.e. `{t | exists s in states, a: T(a, s, t)}`.
+
+        :param states: (BDD node) set of states.
+        :param actions: (iterable or None) actions to consider. Defaults to all actions.
+        """
+        relation = self._relation(actions)
+        succ = self.bdd.exist(self.action_vars + self._cur, relation & states)
+        return self.bdd.let(self._nxt2cur, succ)
+
+    def pre(self, states, actions=None):
+        """
+        Returns the set of predecessors of states, i.e. `{s | exists a, t in states: T(a, s, t)}`.
+
+        :param states: (BDD node) set of states.
+        :param actions: (iterable or None) actions to consider. Defaults to all actions.
+        """
+        relation = self._relation(actions)
+        return self.bdd.exist(self.action_vars + self._nxt, relation & self.bdd.let(self._cur2nxt, states))
+
+    def pre_forall(self, states):
+        """ Returns the states that have a transition, and all of whose transitions lead into states. """
+        return self.pre(self.bdd.true) & ~self.pre(~states & self.valid)
+
+    def pre_controllable(self, states):
+        """ Returns the states with an (enabled) action all of whose transitions lead into states. """
+        nxt_states = self.bdd.let(self._cur2nxt, states)
+        enabled = self.bdd.exist(self._nxt, self.relation)
+        leave = self.bdd.exist(self._nxt, self.relation & ~nxt_states)
+        return self.bdd.exist(self.action_vars, enabled & ~leave)
+
+    def reachable(self, init):
+        """ Returns the set of states reachable from `init` (including `init`). """
+        reach, frontier = init, init
+        while frontier != self.bdd.false:
+            frontier = self.post(frontier) & ~reach
+            reach |= frontier
+        return reach
+
+    def attractor(self, targets, player_states=None):
+        """
+        Computes the set of states from which the player can force a visit to `targets`.
+
+        If `player_states` is given, the game is turn-based (see `games.attractor`): the player chooses a
+        transition at `player_states`, and the opponent at all other states. Otherwise, the player chooses an
+        action at every state, and the successor under that action is chosen adversarially.
+
+        :param targets: (BDD node) set of target states.
+        :param player_states: (BDD node or None) states controlled by the player.
+        :return: (BDD node) attractor.
+        """
+        attr = targets & self.valid
+        while True:
+            if player_states is None:
+                new_attr = attr | self.pre_controllable(attr)
+            else:
+                new_attr = attr | (player_states & self.pre(attr)) | (~player_states & self.pre_forall(attr))
+            if new_attr == attr:
+                return attr
+            attr = new_attr
+
+    def _relation(self, actions):
+        if actions is None:
+            return self.relation
+        return self.relation & self.encode_actions(actions)
+
+
+def _num_bits(n):
+    return max(1, (n - 1).bit_length())
+
+
+def _to_bits(values, num_bits):
+    """ Returns (N, num_bits) boolean array of binary representation of values (most significant bit first). """
+    shifts = np.arange(num_bits - 1, -1, -1, dtype=np.int64)
+    return ((np.asarray(values, dtype=np.int64)[:, np.newaxis] >> shifts) & 1).astype(bool)
+
+
+def _rows_to_bdd(bdd, rows, names):
+    """
+    Constructs the BDD that is true exactly for the given rows (assignments to variables `names`).
+    `names` must be ordered consistently with the variable order of bdd.
+
+    Rows are sorted lexicographically, so that rows sharing a prefix of assignments form a contiguous block.
+    Each block is split on the next variable, i.e. the BDD is constructed top-down with one `ite` per node of
+    the (unreduced) decision tree of the rows.
+    """
+    rows = np.unique(np.asarray(rows, dtype=bool).reshape(len(rows), len(names)), axis=0)
+    variables = [bdd.var(name) for name in names]
+
+    def build(lo, hi, level):
+        if lo == hi:
+            return bdd.false
+        if level == len(names):
+            return bdd.true
+        split = lo + int(np.searchsorted(rows[lo:hi, level], True))
+        return bdd.ite(variables[level], build(split, hi, level + 1), build(lo, split, level + 1))
+
+    return build(0, len(rows), 0)
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+import games
+from automaton import DFA, product
+from encoding import AtomIndex
+from tsys import GraphTS
+
+
+def labeled_chain():
+    # 0 -> 1 -> 2 -> 3 -> 3, plus 0 -> 4 -> 4. "goal" holds at 3, "bad" at 4. Turns are unset (-1).
+    graph = GraphTS()
+    graph.add_nodes(5)
+    graph.add_node_property("turn", -1)
+    graph.add_edges_from_arrays(np.array([0, 1, 2, 3, 0, 4]), np.array([1, 2, 3, 3, 4, 4]))
+    graph.atom_index = AtomIndex({"goal", "bad"})
+    graph.label_masks = graph.atom_index.encode_batch([set(), set(), set(), {"goal"}, {"bad"}])
+    return graph
+
+
+def eventually_goal():
+    dfa = DFA(num_states=2, init=0, accepting={1})
+    dfa.add_transition(0, 1, pos={"goal"})
+    dfa.add_transition(0, 0, neg={"goal", "bad"})
+    dfa.add_transition(1, 1)
+    return dfa
+
+
+def test_product_explores_reachable_states():
+    prod = product(labeled_chain(), eventually_goal(), init=[0])
+    # Node 4 ("bad") is rejected by the DFA.
+    assert prod.number_of_nodes() == 4
+    assert prod.number_of_edges() == 4
+    assert [tuple(prod.node2state(i)) for i in range(4)] == [(0, 0), (1, 0), (2, 0), (3, 1)]
+    assert prod.accepting.tolist() == [False, False, False, True]
+    assert prod.init_nodes.tolist() == [0]
+
+
+def test_product_reachability_one_player():
+    prod = product(labeled_chain(), eventually_goal(), init=[0])
+    win, strategy = games.solve_reachability(prod, prod.accepting, player=None)
+    assert win[:].sum() > prod.accepting.sum()
+    assert win[:].all()
+    assert strategy[:].sum() == 3
+
+
+def test_dfa_step_order_and_guards():
+    dfa = DFA(num_states=3, init=0, accepting={2})
+    dfa.add_transition(0, 2, pos={"goal"}, guard=lambda label: "bad" not in label)
+    dfa.add_transition(0, 1, pos={"goal"})
+    dfa.add_transition(0, 0, neg={"bad"})
+    assert dfa.step(0, {"goal"}) == 2
+    assert dfa.step(0, {"goal", "bad"}) == 1
+    assert dfa.step(0, set()) == 0
+    assert dfa.step(0, {"bad"}) == -1
+    assert dfa.moves({"goal"}).tolist() == [2, -1, -1]
+
+
+def test_product_rejecting_initial_labels():
+    dfa = DFA(num_states=1, init=0)
+    dfa.add_transition(0, 0, neg={"bad"})
+    with pytest.raises(ValueError):
+        product(labeled_chain(), dfa, init=[4])
@@ -0,0 +1,42 @@
+import itertools
+import numpy as np
+import pytest
+from encoding import AtomIndex, StateEncoder
+
+
+def test_state_encoder_round_trip():
+    encoder = StateEncoder(3, range(2, 8, 2), range(-1, 2))
+    states = list(itertools.product(range(3), range(2, 8, 2), range(-1, 2)))
+    assert list(encoder) == states
+    assert [encoder.encode(state) for state in states] == list(range(encoder.size))
+    assert all(encoder.decode(encoder[state]) == state for state in states)
+
+    codes = encoder.encode_batch(np.array(states))
+    assert codes.tolist() == list(range(encoder.size))
+    assert np.array_equal(encoder.decode_batch(codes), np.array(states))
+
+
+def test_state_encoder_invalid_states():
+    encoder = StateEncoder(range(2, 8, 2), 3)
+    assert (3, 0) not in encoder and (8, 0) not in encoder and (2, 3) not in encoder and 5 not in encoder
+    assert encoder.encode_batch([[3, 0], [8, 0], [2, 3], [6, 2]]).tolist() == [-1, -1, -1, 8]
+    with pytest.raises(KeyError):
+        encoder.encode((3, 0))
+    with pytest.raises(KeyError):
+        encoder.decode(encoder.size)
+
+
+def test_atom_index_round_trip():
+    atoms = [f"p{i}" for i in range(70)]        # Two words per mask.
+    index = AtomIndex(atoms)
+    labels = [set(), {"p0"}, {"p63", "p64"}, {"p1", "p69", "p30"}, {"p64"}]
+    masks = index.encode_batch(labels)
+    assert masks.shape == (5, 2) and masks.dtype == np.uint64
+    assert [index.decode(mask) for mask in masks] == labels
+    assert index.holds(masks, "p64").tolist() == [False, False, True, False, True]
+    assert index.holds_all(masks, {"p63", "p64"}).tolist() == [False, False, True, False, False]
+    assert index.holds_any(masks, {"p0", "p69"}).tolist() == [False, True, False, True, False]
+    assert np.array_equal(index.encode_holds({"p64": index.holds(masks, "p64")}, 5), index.encode_batch(
+        [set(), set(), {"p64"}, set(), {"p64"}]))
+    with pytest.raises(KeyError):
+        index.encode({"q"})
@@ -0,0 +1,54 @@
+import numpy as np
+from esm import ESM, History
+
+
+class IdentityGraph:
+    def state2node(self, state):
+        return state
+
+    def node2state(self, node):
+        return node
+
+
+class Replay(ESM):
+    def step_forward(self):
+        if self.step_counter < len(self.history) - 1:
+            self.step_counter += 1
+
+    def step_backward(self):
+        if self.step_counter > 0:
+            self.step_counter -= 1
+
+
+def test_push_after_step_backward_discards_redo_tail():
+    esm = Replay(IdentityGraph())
+    esm.initialize(0)
+    for state in (1, 2, 3):
+        esm.push(state, "a")
+    esm.step_backward()
+    esm.step_backward()
+    esm.push(5, "b")
+    assert esm.state_history == [0, 1, 5]
+    assert esm.action_history == ["a", "b"]
+    assert esm.curr_state == 5
+    esm.step_forward()
+    assert esm.curr_state == 5
+
+
+def test_spill_flushed_per_block(tmp_path):
+    spill_file = str(tmp_path / "spill.bin")
+    esm = Replay(IdentityGraph(), len_history=2, spill_file=spill_file, spill_block=3)
+    esm.initialize(0)
+    for state in range(1, 8):
+        esm.push(state, "a")
+
+    # Steps 0..5 were evicted: two full blocks are on disk without an explicit flush.
+    nodes, actions = History.read_spill(spill_file)
+    assert nodes.tolist() == [0, 1, 2, 3, 4, 5]
+    assert actions.tolist() == [-1, 0, 0, 0, 0, 0]
+    assert esm.state_history == [6, 7]
+
+    esm.push(8, "a")
+    esm.history.flush()
+    assert History.read_spill(spill_file)[0].tolist() == list(range(7))
+    assert np.array_equal(esm.history.window()[0], [7, 8])
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+import games
+from graph import Graph
+
+
+def diamond_game():
+    # 0 -> {1, 2}, 1 -> 3, 2 -> 2 (sink loop). Target: 3.
+    graph = Graph()
+    graph.add_nodes(4)
+    graph.add_edges_from_arrays(np.array([0, 0, 1, 2]), np.array([1, 2, 3, 2]))
+    return graph
+
+
+def test_attractor_turn_convention():
+    graph = diamond_game()
+    attr, strategy, _ = games.attractor(graph, [3], games.P1, turn=np.full(4, games.P1))
+    assert np.flatnonzero(attr).tolist() == [0, 1, 3]
+    assert strategy[0] == 0
+
+    attr, _, _ = games.attractor(graph, [3], games.P1, turn=np.full(4, games.P2))
+    assert np.flatnonzero(attr).tolist() == [1, 3]
+
+
+def test_attractor_unset_turn_raises():
+    graph = diamond_game()
+    with pytest.raises(ValueError):
+        games.attractor(graph, [3], games.P1)
+    with pytest.raises(ValueError):
+        games.attractor(graph, [3], games.P1, turn=np.full(4, -1))
+
+
+def test_one_player_game():
+    graph = diamond_game()
+    attr, _, _ = games.attractor(graph, [3], None)
+    assert np.flatnonzero(attr).tolist() == [0, 1, 3]
+
+    win, _ = games.solve_safety(graph, [0, 2], player=None)
+    assert np.flatnonzero(win[:]).tolist() == [0, 2]
@@ -0,0 +1,75 @@
+import pickle
+import numpy as np
+from encoding import AtomIndex
+from graph import Graph, SubGraph
+
+
+def test_array_property_map_growth_and_freeze():
+    graph = Graph()
+    graph.add_node_property("turn", -1, dtype=np.int64)
+    for i in range(5):
+        graph.add_node()
+        graph.set_node_property("turn", i, i % 2)
+    assert len(graph._v_props["turn"]) == 5
+    assert graph._v_props["turn"][:].tolist() == [0, 1, 0, 1, 0]
+
+    csr = graph.freeze()
+    assert csr.node_property_array("turn").tolist() == [0, 1, 0, 1, 0]
+    sub = SubGraph(csr).filter_nodes("turn", lambda turn: turn == 1)
+    assert np.flatnonzero(sub.node_mask).tolist() == [1, 3]
+
+
+def test_to_numpy_by_mixed_values():
+    graph = Graph()
+    graph.add_nodes(3)
+    graph.add_edge_property("action")
+    graph.add_edges_from_arrays([0, 0, 1, 2], [1, 2, 2, 0], action=["a", None, "a", 1])
+    matrices = graph.to_numpy(by="action")
+    assert list(matrices) == ["a", None, 1]
+    assert matrices["a"].toarray().tolist() == [[0, 1, 0], [0, 0, 1], [0, 0, 0]]
+    assert matrices[None].toarray().tolist() == [[0, 0, 1], [0, 0, 0], [0, 0, 0]]
+    assert matrices[1].toarray().tolist() == [[0, 0, 0], [0, 0, 0], [1, 0, 0]]
+
+
+def test_label_node_property_from_masks():
+    graph = Graph()
+    graph.add_nodes(3)
+    graph.atom_index = AtomIndex({"goal", "wall"})
+    graph.label_masks = graph.atom_index.encode_batch([set(), {"goal"}, {"goal", "wall"}])
+    assert graph.get_node_property("label", 0) == set()
+    assert graph.get_node_property("label", 2) == {"goal", "wall"}
+    assert graph.freeze().get_node_property("label", 1) == {"goal"}
+
+
+def test_pickle_frozen_graph_keeps_graph_properties():
+    graph = Graph()
+    graph.add_nodes(2)
+    graph.add_edge_property("action", None)
+    graph.add_edge(0, 1, action="a")
+    graph.actions = ["a"]
+    csr = pickle.loads(pickle.dumps(graph.freeze()))
+    assert csr.actions == ["a"]
+    assert csr.edge_property_array("action").tolist() == ["a"]
+    assert csr.indices.tolist() == [1]
+
+
+def test_add_edges_from_arrays_matches_add_edge():
+    rng = np.random.default_rng(0)
+    bulk, ref = Graph(), Graph()
+    for graph in (bulk, ref):
+        graph.add_nodes(6)
+        graph.add_edge_property("action", None)
+        graph.add_edge(0, 1, action="x")
+        graph.add_edge(0, 1, action="y")
+        graph.rem_edge(0, 1, 1)
+
+    u, v = rng.integers(0, 6, size=(2, 40))
+    acts = rng.integers(0, 3, size=40).tolist()
+    bulk.add_edges_from_arrays(u, v, action=acts)
+    for ui, vi, act in zip(u.tolist(), v.tolist(), acts):
+        ref.add_edge(ui, vi, action=act)
+
+    assert bulk._edges == ref._edges
+    assert bulk._inv_edges == ref._inv_edges
+    assert dict(bulk._e_props["action"]) == dict(ref._e_props["action"])
+    assert bulk.number_of_edges() == ref.number_of_edges() == 41
@@ -0,0 +1,40 @@
+import pytest
+from gridworld import Gridworld, graphify
+
+
+class Ring(Gridworld):
+    """ Deterministic gridworld on a 1xN ring. `delta` of the last cell may leave the grid (invalid). """
+    def __init__(self, n, leak=False):
+        super(Ring, self).__init__((1, n))
+        self.n = n
+        self.leak = leak
+        self.num_states_calls = 0
+
+    def states(self):
+        self.num_states_calls += 1
+        return ((0, c) for c in range(self.n))
+
+    def actions(self):
+        return ["cw", "ccw"]
+
+    def delta(self, state, act):
+        if self.leak and state[1] == self.n - 1:
+            return 0, self.n
+        return 0, (state[1] + (1 if act == "cw" else -1)) % self.n
+
+
+def test_graphify_materializes_states_once():
+    ring = Ring(5)
+    graph = graphify(ring)
+    assert ring.num_states_calls == 1
+    assert graph.number_of_nodes() == 5 and graph.number_of_edges() == 10
+    for c in range(5):
+        node = graph.state2node((0, c))
+        assert graph.node2state(node) == (0, c)
+        assert graph.delta((0, c), "cw") == (0, (c + 1) % 5)
+        assert graph.delta((0, c), "ccw") == (0, (c - 1) % 5)
+
+
+def test_graphify_validates_next_states():
+    with pytest.raises(AssertionError):
+        graphify(Ring(5, leak=True))
@@ -0,0 +1,99 @@
+import itertools
+import numpy as np
+import pytest
+from collections import Counter
+from gridworld2 import Gridworld
+from gw_utils import GridDynamics, GW_ACT_4, GW_OBS_TYPE_SINK
+from tsgen import TSGenerator
+
+
+class ObstacleGridworld(TSGenerator):
+    def __init__(self, obstacles):
+        self.obstacles = set(obstacles)
+
+    def dim(self):
+        return 5, 5
+
+    def states(self):
+        return set(itertools.product(range(5), range(5)))
+
+    def actions(self):
+        return set(GW_ACT_4)
+
+    def delta(self, state, act):
+        raise NotImplementedError
+
+    def delta_batch(self, states, act):
+        dynamics = GridDynamics(self.dim(), GW_ACT_4, obstacles=list(self.obstacles), obs_type=GW_OBS_TYPE_SINK)
+        return dynamics.delta_batch(states, act)
+
+    def atoms(self):
+        return {"obs"}
+
+    def label(self, state):
+        return {"obs"} if state in self.obstacles else set()
+
+
+def transitions(gw):
+    return Counter(
+        (state, act, gw.delta(state, act)) for state in itertools.product(range(5), range(5)) for act in GW_ACT_4
+    )
+
+
+def edges(gw):
+    csr = gw.freeze()
+    acts = csr.edge_property_array("action")
+    return Counter((gw.node2state(u), gw.node2state(v), acts[eid]) for eid, (u, v, _) in enumerate(csr.edges()))
+
+
+def neighborhood(cells):
+    return {(r + dr, c + dc) for r, c in cells for dr, dc in [(0, 0), (0, 1), (1, 0), (0, -1), (-1, 0)]
+            if 0 <= r + dr < 5 and 0 <= c + dc < 5}
+
+
+def test_update_matches_reconstruction():
+    tsgen = ObstacleGridworld({(2, 2)})
+    gw = Gridworld(tsgen)
+    tsgen.obstacles = {(2, 3)}
+    delta = gw.update(neighborhood({(2, 2), (2, 3)}))
+
+    ref = Gridworld(ObstacleGridworld({(2, 3)}))
+    assert len(delta.nodes) > 0
+    assert transitions(gw) == transitions(ref)
+    assert edges(gw) == edges(ref)
+    assert set(delta.relabeled.tolist()) == {gw.state2node((2, 2)), gw.state2node((2, 3))}
+
+
+def test_update_loaded_gridworld(tmp_path):
+    Gridworld(ObstacleGridworld({(2, 2)})).save(str(tmp_path / "gw.graph"))
+    gw = Gridworld.load(str(tmp_path / "gw.graph"))
+    gw.tsgen = ObstacleGridworld({(1, 1)})
+    gw.update(neighborhood({(2, 2), (1, 1)}))
+
+    ref = Gridworld(ObstacleGridworld({(1, 1)}))
+    assert transitions(gw) == transitions(ref)
+    assert edges(gw) == edges(ref)
+    assert gw.label((1, 1)) == {"obs"} and gw.label((2, 2)) == set()
+
+
+def test_update_loaded_gridworld_labels_only(tmp_path):
+    Gridworld(ObstacleGridworld({(2, 2)})).save(str(tmp_path / "gw.graph"))
+    gw = Gridworld.load(str(tmp_path / "gw.graph"))
+    gw.tsgen = ObstacleGridworld({(2, 2)})
+    gw.tsgen.label = lambda state: {"obs"} if state == (0, 0) else set()
+    delta = gw.update([(2, 2), (0, 0)], predecessors=False)
+
+    assert len(delta.nodes) == 0
+    assert np.array_equal(np.sort(delta.relabeled), np.sort([gw.state2node((2, 2)), gw.state2node((0, 0))]))
+    assert gw.label((0, 0)) == {"obs"} and gw.label((2, 2)) == set()
+
+
+def test_load_rejects_unknown_actions(tmp_path):
+    gw = Gridworld(ObstacleGridworld({(2, 2)}))
+    gw.save(tmp_path / "gw.graph")
+    assert transitions(Gridworld.load(tmp_path / "gw.graph")) == transitions(gw)
+
+    gw.add_edge(gw.state2node((0, 0)), gw.state2node((4, 4)))      # Edge without action.
+    gw.save(tmp_path / "bad.graph")
+    with pytest.raises(ValueError):
+        Gridworld.load(tmp_path / "bad.graph")
@@ -0,0 +1,17 @@
+from gw_build import compute_transitions
+
+
+class Chain:
+    def delta(self, state, act):
+        return min(state + 1, 9)
+
+
+def test_compute_transitions_workers_empty_states():
+    u, v, aid, prob = compute_transitions(Chain(), [], ["a"], dict(), True, True, workers=4)
+    assert len(u) == len(v) == len(aid) == 0 and prob is None
+
+
+def test_compute_transitions_workers():
+    states = list(range(10))
+    u, v, aid, _ = compute_transitions(Chain(), states, ["a"], {s: s for s in states}, True, True, workers=2)
+    assert sorted(zip(u.tolist(), v.tolist())) == [(s, min(s + 1, 9)) for s in states]
@@ -0,0 +1,46 @@
+import numpy as np
+from gw_render import GridRenderer, COLOR_BACKGROUND, COLOR_OBSTACLE, export
+
+
+def full_render(renderer, state):
+    # Reference: draws the whole scene from scratch (no dirty rectangles).
+    frame = renderer.framebuffer.background.copy()
+    for (tile, _), (top, left) in zip(renderer.sprites, renderer.sprite_positions([state])[0].tolist()):
+        frame[top: top + tile.shape[0], left: left + tile.shape[1]] = tile
+    return frame
+
+
+def test_frames_match_full_redraw():
+    renderer = GridRenderer((3, 4), cell_size=(10, 10), obstacles=[(1, 1)])
+    renderer.add_sprite((255, 0, 0), 0)
+    renderer.add_sprite((0, 0, 255), lambda state: (state[2], state[3]))
+    states = [(0, 0, 2, 3), (0, 1, 2, 2), (1, 1, 2, 2), (2, 3, 0, 0)]
+
+    video = renderer.render(states)
+    assert video.shape == (4, 30, 40, 3)
+    for frame, state in zip(video, states):
+        assert np.array_equal(frame, full_render(renderer, state))
+
+    # Framebuffer is restored to background after rendering.
+    assert np.array_equal(renderer.framebuffer.frame, renderer.framebuffer.background)
+
+
+def test_background_and_sprite_positions():
+    renderer = GridRenderer((2, 2), cell_size=(10, 10), obstacles=[(1, 0)])
+    assert tuple(renderer.framebuffer.background[5, 5]) == COLOR_BACKGROUND
+    assert tuple(renderer.framebuffer.background[15, 5]) == COLOR_OBSTACLE
+    renderer.add_sprite((255, 0, 0), 0)
+    # A tile of half the cell size is centered in its cell.
+    assert renderer.sprite_positions([(1, 1)]).tolist() == [[[12, 12]]]
+
+
+def test_export_ppm_and_npy(tmp_path):
+    renderer = GridRenderer((2, 2), cell_size=(4, 4))
+    renderer.add_sprite((255, 0, 0), 0)
+    states = [(0, 0), (1, 1)]
+    renderer.export(states, str(tmp_path / "frames"))
+    data = (tmp_path / "frames" / "frame_1.ppm").read_bytes()
+    assert data.startswith(b"P6\n8 8\n255\n") and len(data) == len(b"P6\n8 8\n255\n") + 8 * 8 * 3
+
+    export(renderer.frames(states), str(tmp_path / "video.npy"))
+    assert np.array_equal(np.load(tmp_path / "video.npy"), renderer.render(states))
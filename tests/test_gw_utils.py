@@ -0,0 +1,23 @@
+import numpy as np
+import pytest
+from gw_utils import GridDynamics, GW_ACT_4, bouncy_obstacle, occupancy_grid
+
+
+def test_bouncy_obstacle_grid_out_of_bounds():
+    grid = occupancy_grid([(2, 2)], (3, 3))
+    assert bouncy_obstacle(0, 0, -1, 0, grid) == (-1, 0)       # grid[-1, 0] is not checked (no wrap-around).
+    assert bouncy_obstacle(1, 2, 2, 2, grid) == (1, 2)
+    assert bouncy_obstacle(0, 0, 0, 3, grid) == (0, 3)
+    assert bouncy_obstacle(1, 2, 2, 2, {(2, 2)}) == bouncy_obstacle(1, 2, 2, 2, grid)
+
+
+def test_step_accepts_integer_action_ids():
+    dynamics = GridDynamics((3, 3), GW_ACT_4)
+    for aid, act in enumerate(dynamics.actions):
+        expected = dynamics.delta((1, 1), act)
+        assert dynamics.delta((1, 1), aid) == expected
+        assert dynamics.delta((1, 1), np.int64(aid)) == expected
+    with pytest.raises(KeyError):
+        dynamics.delta((1, 1), len(dynamics.actions))
+    with pytest.raises(KeyError):
+        dynamics.delta((1, 1), -1)
@@ -0,0 +1,19 @@
+import numpy as np
+from graph import Graph
+from mdp import MDP
+
+
+def two_state_mdp():
+    graph = Graph()
+    graph.add_nodes(2)
+    graph.add_edge_property("action")
+    graph.add_edge_property("prob")
+    graph.add_edges_from_arrays([0, 0, 1], [0, 1, 1], action=["a", "a", "a"], prob=[0.5, 0.5, 1.0])
+    return MDP(graph)
+
+
+def test_zero_iterations_return_init():
+    mdp = two_state_mdp()
+    values, _ = mdp.value_iteration(np.ones(2), max_iter=0)
+    assert np.array_equal(values, np.zeros(2))
+    assert np.array_equal(mdp.policy_evaluation(np.zeros(2, dtype=np.int64), np.ones(2), max_iter=0), np.zeros(2))
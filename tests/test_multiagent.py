@@ -0,0 +1,58 @@
+import pytest
+from gridworld2 import Gridworld
+from multiagent import GridAgent, ProductGridworld, COLLISION_ALLOW, COLLISION_BLOCK, COLLISION_SINK
+
+# Agents on a 1x3 corridor with actions "L" and "R" (bouncy boundary).
+TABLE = {(c, "L"): max(c - 1, 0) for c in range(3)} | {(c, "R"): min(c + 1, 2) for c in range(3)}
+
+
+def corridor_agent():
+    return GridAgent((1, 3), ["L", "R"], [[TABLE[c, "L"], TABLE[c, "R"]] for c in range(3)])
+
+
+def reference_delta(state, act, turn_based, collision):
+    cells = (state[1], state[3])
+    if collision == COLLISION_SINK and cells[0] == cells[1]:
+        return state
+    if turn_based:
+        turn = state[4]
+        moved = tuple(TABLE[c, act] if i == turn - 1 else c for i, c in enumerate(cells))
+    else:
+        moved = tuple(TABLE[c, a] for c, a in zip(cells, act))
+    if collision == COLLISION_BLOCK and moved[0] == moved[1]:
+        moved = cells
+    n_state = (0, moved[0], 0, moved[1])
+    return n_state + (turn % 2 + 1,) if turn_based else n_state
+
+
+@pytest.mark.parametrize("turn_based", [True, False])
+@pytest.mark.parametrize("collision", [COLLISION_ALLOW, COLLISION_BLOCK, COLLISION_SINK])
+def test_product_matches_reference(turn_based, collision):
+    tsgen = ProductGridworld([corridor_agent(), corridor_agent()], turn_based=turn_based, collision=collision)
+    num_states = 18 if turn_based else 9
+    num_actions = 2 if turn_based else 4
+    assert tsgen.encoder.size == num_states and len(tsgen.actions()) == num_actions
+
+    for state in tsgen.encoder:
+        for act in tsgen.actions():
+            assert tsgen.delta(state, act) == reference_delta(state, act, turn_based, collision)
+
+    gw = Gridworld(tsgen, encoder=tsgen.encoder)
+    assert gw.number_of_nodes() == num_states
+    assert gw.number_of_edges() == num_states * num_actions
+
+
+def test_collision_rules_differ_on_collision():
+    # Agent 1 at cell 0 moves right onto agent 2 at cell 1.
+    state = (0, 0, 0, 1, 1)
+    results = {
+        collision: ProductGridworld([corridor_agent()] * 2, collision=collision).delta(state, "R")
+        for collision in (COLLISION_ALLOW, COLLISION_BLOCK, COLLISION_SINK)
+    }
+    assert results == {
+        COLLISION_ALLOW: (0, 1, 0, 1, 2),
+        COLLISION_BLOCK: (0, 0, 0, 1, 2),
+        COLLISION_SINK: (0, 1, 0, 1, 2),
+    }
+    sink = ProductGridworld([corridor_agent()] * 2, collision=COLLISION_SINK)
+    assert sink.delta((0, 1, 0, 1, 2), "L") == (0, 1, 0, 1, 2)
@@ -0,0 +1,39 @@
+import numpy as np
+from graph import Graph
+from mdp import MDP
+from sampling import TrajectorySampler
+
+
+def branching_chain():
+    # Action "a": 0 -> 1 (0.3) | 2 (0.7), 2 -> 0 (0.5) | 3 (0.5). Nodes 1 (target) and 3 (trap) are absorbing.
+    graph = Graph()
+    graph.add_nodes(4)
+    graph.add_edge_property("action")
+    graph.add_edge_property("prob")
+    graph.add_edges_from_arrays([0, 0, 1, 2, 2, 3], [1, 2, 1, 0, 3, 3], action=["a"] * 6,
+                                prob=[0.3, 0.7, 1.0, 0.5, 0.5, 1.0])
+    return graph
+
+
+def test_success_rate_matches_reach_probability():
+    graph = branching_chain()
+    exact, _ = MDP(graph).max_reach_prob([1], tol=1e-12)
+    assert np.isclose(exact[0], 0.3 / 0.65)
+
+    sampler = TrajectorySampler(graph, np.zeros(4, dtype=np.int64))
+    num_samples = 20000
+    rate, hits = sampler.success_rate(0, [1], horizon=100, num_samples=num_samples, seed=0)
+    assert len(hits) == num_samples
+    assert abs(rate - exact[0]) < 4 * np.sqrt(exact[0] * (1 - exact[0]) / num_samples)
+
+
+def test_sample_is_reproducible_and_stops_at_targets():
+    sampler = TrajectorySampler(branching_chain(), {0: "a", 2: "a"})
+    runs = sampler.sample(0, horizon=10, num_samples=50, targets=[1], seed=7)
+    assert np.array_equal(runs, sampler.sample(0, horizon=10, num_samples=50, targets=[1], seed=7))
+    assert runs.shape == (50, 11) and np.all(runs[:, 0] == 0)
+    for run in runs:
+        visited = run[run >= 0]
+        assert np.all(np.isin(visited[:-1], [0, 2]))
+        # A trajectory stops at the target, or at the trap (no action there).
+        assert len(visited) == 11 or visited[-1] in (1, 3)
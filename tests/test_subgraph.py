@@ -0,0 +1,35 @@
+import numpy as np
+import games
+import reachability
+from graph import Graph, SubGraph
+
+
+def path_graph(n):
+    graph = Graph()
+    graph.add_nodes(n)
+    graph.add_edges_from_arrays(np.arange(n - 1), np.arange(1, n))
+    return graph
+
+
+def test_reachable_subgraph_hidden_nodes():
+    graph = path_graph(6)
+
+    sub = SubGraph(graph)
+    sub.hide_node(1)
+    assert reachability.reachable(sub, [2]).tolist() == [2, 3, 4, 5]
+    assert reachability.reachable(sub, [0]).tolist() == [0]
+
+    sub = SubGraph(graph)
+    sub.hide_node(4)
+    mask = reachability.reachable(sub, [0], as_mask=True)
+    assert len(mask) == 6
+    assert np.flatnonzero(mask).tolist() == [0, 1, 2, 3]
+
+
+def test_attractor_subgraph_hidden_nodes():
+    sub = SubGraph(path_graph(6))
+    sub.hide_node(1)
+    turn = np.full(6, games.P1)
+    attr, strategy, rank = games.attractor(sub, [5], games.P1, turn=turn)
+    assert np.flatnonzero(attr).tolist() == [2, 3, 4, 5]
+    assert rank.tolist() == [-1, -1, 3, 2, 1, 0]
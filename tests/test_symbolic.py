@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+import games
+import reachability
+from graph import Graph
+
+pytest.importorskip("dd")
+import symbolic     # noqa: E402 (requires dd)
+
+ROWS, COLS = 3, 4
+
+
+def grid_graph():
+    # Moves right and down on a 3x4 grid. Row 0 has a one-way wall between columns 1 and 2.
+    # The bottom-right corner has a self-loop without action (mixed action values: str and None).
+    graph = Graph()
+    graph.add_nodes(ROWS * COLS)
+    graph.add_edge_property("action", None)
+    for r in range(ROWS):
+        for c in range(COLS):
+            node = r * COLS + c
+            if c + 1 < COLS and not (r == 0 and c == 1):
+                graph.add_edge(node, node + 1, action="right")
+            if r + 1 < ROWS:
+                graph.add_edge(node, node + COLS, action="down")
+    graph.add_edge(ROWS * COLS - 1, ROWS * COLS - 1)
+    return graph
+
+
+def test_post_pre_match_graph():
+    graph = grid_graph()
+    bdd_graph = symbolic.BDDGraph.from_graph(graph)
+    assert bdd_graph.actions == ["right", "down", None]
+    for node in graph.nodes():
+        states = bdd_graph.encode_states([node])
+        assert bdd_graph.decode_states(bdd_graph.post(states)).tolist() == sorted(set(graph.successors(node)))
+        assert bdd_graph.decode_states(bdd_graph.pre(states)).tolist() == sorted(set(graph.predecessors(node)))
+    assert bdd_graph.decode_states(bdd_graph.post(bdd_graph.encode_states([1]), actions=["right"])).tolist() == []
+
+
+def test_reachable_matches_graph():
+    graph = grid_graph()
+    bdd_graph = symbolic.BDDGraph.from_graph(graph)
+    for node in graph.nodes():
+        reach = bdd_graph.reachable(bdd_graph.encode_states([node]))
+        assert bdd_graph.decode_states(reach).tolist() == sorted(reachability.reachable(graph, [node]).tolist())
+        assert bdd_graph.count(reach) == len(reachability.reachable(graph, [node]))
+
+
+def test_attractor_matches_games():
+    graph = grid_graph()
+    bdd_graph = symbolic.BDDGraph.from_graph(graph)
+    targets = np.array([3, 8])
+    turn = np.where(np.arange(ROWS * COLS) // COLS % 2 == 0, games.P1, games.P2)
+
+    attr, _, _ = games.attractor(graph, targets, games.P1, turn=turn)
+    player_states = bdd_graph.encode_states(turn == games.P1)
+    sym_attr = bdd_graph.attractor(bdd_graph.encode_states(targets), player_states)
+    assert bdd_graph.decode_states(sym_attr).tolist() == np.flatnonzero(attr).tolist()
+
+    attr, _, _ = games.attractor(graph, targets, None)
+    sym_attr = bdd_graph.attractor(bdd_graph.encode_states(targets))
+    assert bdd_graph.decode_states(sym_attr).tolist() == np.flatnonzero(attr).tolist()
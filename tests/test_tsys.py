@@ -0,0 +1,64 @@
+import numpy as np
+from tsys import GraphTS, TransitionIndex
+
+
+def chain_ts():
+    ts = GraphTS()
+    ts.add_nodes(3)
+    ts.add_node_property("state", None)
+    for node in range(3):
+        ts.set_node_property("state", node, f"s{node}")
+        ts.map_state2node[f"s{node}"] = node
+    ts.add_edge_property("action", None)
+    ts.add_edges_from_arrays(np.array([0, 1]), np.array([1, 2]), action=["a", "b"])
+    ts.actions = ["a", "b"]
+    return ts
+
+
+def test_delta_not_enabled():
+    ts = chain_ts()
+    assert ts.delta("s0", "a") == "s1"
+    assert ts.delta("s0", "b") is None
+    assert ts.delta("s2", "a") is None
+
+
+def test_rem_edge_invalidates_transition_index():
+    ts = chain_ts()
+    assert ts.enabled_actions("s1") == {"b"}
+    ts.rem_edge(1, 2)
+    assert ts.enabled_actions("s1") == set()
+    assert ts.delta("s1", "b") is None
+
+
+def test_transition_index_update_matches_rebuild():
+    rng = np.random.default_rng(1)
+    num_nodes, actions = 6, ["a", "b", "c"]
+    u, v, aid = rng.integers(0, num_nodes, 30), rng.integers(0, num_nodes, 30), rng.integers(0, 3, 30)
+    prob = rng.random(30)
+
+    for nodes, size in (([1, 4], None), ([0, 2, 5], 7), ([3], 0)):
+        nodes = np.array(nodes)
+        # New transitions of nodes: same number per node (size None) or `size` transitions in total.
+        if size is None:
+            new_u = np.concatenate([u[u == node] for node in nodes])
+        else:
+            new_u = rng.choice(nodes, size)
+        new_v, new_aid, new_prob = rng.integers(0, num_nodes, len(new_u)), rng.integers(0, 3, len(new_u)), \
+            rng.random(len(new_u))
+
+        index = TransitionIndex(num_nodes, actions, u, v, aid, prob)
+        index.update(nodes, new_u, new_v, new_aid, new_prob)
+
+        keep = ~np.isin(u, nodes)
+        u = np.concatenate([u[keep], new_u])
+        v = np.concatenate([v[keep], new_v])
+        aid = np.concatenate([aid[keep], new_aid])
+        prob = np.concatenate([prob[keep], new_prob])
+        ref = TransitionIndex(num_nodes, actions, u, v, aid, prob)
+
+        assert np.array_equal(index.indptr, ref.indptr)
+        for node in range(num_nodes):
+            for act in actions:
+                succ, p = index.lookup(node, act)
+                ref_succ, ref_p = ref.lookup(node, act)
+                assert sorted(zip(succ.tolist(), p.tolist())) == sorted(zip(ref_succ.tolist(), ref_p.tolist()))
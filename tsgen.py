@@ -18,12 +18,46 @@ class TSGenerator(ABC):
     def delta(self, state, act):
         pass
 
+    def delta_batch(self, states, act):
+        """
+        (Optional) Vectorized transition function. If implemented, it is used instead of `delta`
+        to construct the transition system graph.
+
+        :param states: (np.ndarray) (N, d) integer array. Each row is a state.
+        :param act: An element from self.actions().
+        :return: Depending on the type of gridworld, one of the following output is expected.
+            * If gridworld is deterministic: (N, d) array of next states.
+            * If gridworld is qualitative, stochastic: (N, B, d) array of next states (B = number of branches).
+            * If gridworld is quantitative, stochastic: 2-tuple of (N, B, d) array of next states and
+              (N, B) array of probabilities. Branches with zero probability are ignored.
+            A next state filled with -1 denotes that the action is disabled (no transition).
+        """
+        raise NotImplementedError("delta_batch function is not implemented by the user.")
+
+    def turn(self, state):
+        """
+        (Optional) Player whose turn it is at state (turn-based transition systems).
+        If implemented, it is stored as `turn` node property.
+        """
+        raise NotImplementedError("turn function is not implemented by the user.")
+
     def atoms(self):
         raise NotImplementedError("atoms function is not implemented by the user.")
 
     def label(self, state):
         raise NotImplementedError("label function is not implemented by the user.")
 
+    def label_batch(self, states):
+        """
+        (Optional) Vectorized labeling function. If implemented, it is used instead of `label`
+        to label the states of the transition system graph.
+
+        :param states: (np.ndarray) (N, d) integer array. Each row is a state.
+        :return: (dict) {atom: (N,) boolean array} truth value of every atom in every state.
+            Atoms missing from dict are false in all states.
+        """
+        raise NotImplementedError("label_batch function is not implemented by the user.")
+
     # noinspection PyMethodMayBeStatic
     def state_properties(self):
         """
@@ -1,3 +1,4 @@
+import numpy as np
 import graph
 
 
@@ -7,15 +8,37 @@ class GraphTS(graph.Graph):
 
         # Additional class attributes
         self.map_state2node = dict()
+        self.encoder = None
         self.actions = None
         self.atoms = None
+        self.atom_index = None      # AtomIndex of atoms
+        self.label_masks = None     # (|V|, W) uint64 array of label bitmasks
         self.deterministic = True
         self.qualitative = True
         self.turn_based = True
 
+        # (node, action) -> successors index. Built lazily, invalidated when edges are added or removed.
+        self._trans_index = None
+
     def __repr__(self):
         return f"<GraphTS with |V|={self.number_of_nodes()}, |E|={self.number_of_edges()}>"
 
+    def add_edge(self, u, v, **kwargs):
+        self._trans_index = None
+        return super(GraphTS, self).add_edge(u, v, **kwargs)
+
+    def add_edges_from_arrays(self, u, v, **kwargs):
+        self._trans_index = None
+        super(GraphTS, self).add_edges_from_arrays(u, v, **kwargs)
+
+    def rem_edge(self, u, v, k=None):
+        self._trans_index = None
+        return super(GraphTS, self).rem_edge(u, v, k)
+
+    def clear(self):
+        super(GraphTS, self).clear()
+        self._trans_index = None
+
     def states(self):
         return self.nodes()
 
@@ -23,14 +46,173 @@ class GraphTS(graph.Graph):
         return self.actions
 
     def enabled_actions(self, state):
-        pass
+        index = self.build_transition_index()
+        node = self.state2node(state)
+        return {act for act in index.id2act if len(index.lookup(node, act)[0]) > 0}
 
     def delta(self, state, act):
-        pass
+        succ, prob = self.build_transition_index().lookup(self.state2node(state), act)
+        return to_next_states(self, succ, prob)
 
     def node2state(self, node):
-        pass
+        if self.encoder is not None:
+            return self.encoder.decode(node)
+        return self.get_node_property("state", node)
+
+    def label(self, state):
+        """ Returns the set of atoms that hold in state. """
+        return self.atom_index.decode(self.label_masks[self.state2node(state)])
+
+    def holds(self, atom):
+        """ Returns boolean mask over nodes that is True where atom holds. """
+        return self.atom_index.holds(self.label_masks, atom)
 
     def state2node(self, state):
         return self.map_state2node[state]
 
+    def build_transition_index(self):
+        """ Builds (if needed) and returns the `TransitionIndex` of the transition system. """
+        if self._trans_index is None:
+            self._trans_index = TransitionIndex.from_graph(self, self.actions)
+        return self._trans_index
+
+
+class TransitionIndex:
+    """
+    Precomputed lookup table: (node, action) -> successors [, probabilities].
+
+    Actions are interned to integer ids (see `act2id`, `id2act`). For a node `u` and action id `a`,
+    the successors are stored contiguously in `succ[indptr[s]:indptr[s + 1]]` with slot `s = u * num_actions + a`.
+    If transition system is quantitative, `prob` stores the corresponding transition probabilities.
+    """
+    def __init__(self, num_nodes, actions, u, v, aid, prob=None):
+        """
+        :param num_nodes: (int) number of nodes in transition system.
+        :param actions: (iterable) actions. The i-th action is interned to id `i`.
+        :param u, v, aid: (np.ndarray) source node, target node and action id of every transition.
+        :param prob: (np.ndarray or None) probability of every transition.
+        """
+        self.id2act = list(actions)
+        self.act2id = {act: aid for aid, act in enumerate(self.id2act)}
+        self.num_nodes = num_nodes
+        self.num_actions = len(self.id2act)
+
+        slots = np.asarray(u, dtype=np.int64) * self.num_actions + np.asarray(aid, dtype=np.int64)
+        order = np.argsort(slots, kind="stable")
+        self.indptr = np.zeros(num_nodes * self.num_actions + 1, dtype=np.int64)
+        np.cumsum(np.bincount(slots, minlength=num_nodes * self.num_actions), out=self.indptr[1:])
+        self.succ = np.asarray(v, dtype=np.int64)[order]
+        self.prob = None if prob is None else np.asarray(prob, dtype=np.float64)[order]
+
+    def __repr__(self):
+        return f"<TransitionIndex with |V|={self.num_nodes}, |A|={self.num_actions}, |E|={len(self.succ)}>"
+
+    @classmethod
+    def from_graph(cls, graph, actions=None):
+        """
+        Constructs the index from `action` (and `prob`, if defined) edge properties of the graph.
+
+        :param graph: (Graph) transition system graph.
+        :param actions: (iterable) actions. If None, actions are collected from the graph.
+        """
+        act_map = graph._e_props["action"]
+        edges = list(graph.edges())
+        edge_acts = [act_map[edge] for edge in edges]
+        if actions is None:
+            actions = list(dict.fromkeys(edge_acts))
+
+        act2id = {act: aid for aid, act in enumerate(actions)}
+        u = np.fromiter((edge[0] for edge in edges), dtype=np.int64, count=len(edges))
+        v = np.fromiter((edge[1] for edge in edges), dtype=np.int64, count=len(edges))
+        aid = np.fromiter((act2id[act] for act in edge_acts), dtype=np.int64, count=len(edges))
+
+        prob = None
+        if graph.has_edge_property("prob"):
+            prob_map = graph._e_props["prob"]
+            prob = np.fromiter((prob_map[edge] for edge in edges), dtype=np.float64, count=len(edges))
+
+        return cls(graph.number_of_nodes(), actions, u, v, aid, prob)
+
+    def update(self, nodes, u, v, aid, prob=None):
+        """
+        Replaces the transitions of `nodes` by the transitions (u, v, aid[, prob]), in place.
+
+        :param nodes: (np.ndarray) sorted array of distinct nodes. Every source node in `u` must be in `nodes`.
+
+        :note: If every node keeps its number of transitions, only the slots of `nodes` are rewritten.
+            Otherwise, `succ` (and `prob`) are re-concatenated around the slots of `nodes` and `indptr` is shifted,
+            i.e. O(|E| + |V| * |A|) memory copies (without per-transition Python work).
+        """
+        nodes = np.asarray(nodes, dtype=np.int64)
+        num_actions = self.num_actions
+        if len(nodes) == 0:
+            return
+
+        # New transitions ordered by (node, action). counts[i, a]: number of transitions of (nodes[i], a).
+        local = np.searchsorted(nodes, np.asarray(u, dtype=np.int64)) * num_actions + np.asarray(aid, dtype=np.int64)
+        order = np.argsort(local, kind="stable")
+        v = np.asarray(v, dtype=np.int64)[order]
+        prob = None if self.prob is None else np.asarray(prob, dtype=np.float64)[order]
+        counts = np.bincount(local, minlength=len(nodes) * num_actions).reshape(len(nodes), num_actions)
+
+        starts = self.indptr[nodes * num_actions]
+        ends = self.indptr[(nodes + 1) * num_actions]
+        totals = counts.sum(axis=1)
+        if np.array_equal(totals, ends - starts):
+            # Same number of transitions: overwrite slots of nodes.
+            pos = np.repeat(starts - np.cumsum(totals) + totals, totals) + np.arange(totals.sum())
+            self.succ[pos] = v
+            if prob is not None:
+                self.prob[pos] = prob
+        else:
+            # Re-concatenate kept segments (between slots of nodes) and new segments.
+            bounds = np.cumsum(totals)[:-1]
+            kept_starts = np.concatenate([[0], ends])
+            kept_ends = np.concatenate([starts, [len(self.succ)]])
+            self.succ = _splice(self.succ, kept_starts, kept_ends, np.split(v, bounds))
+            if prob is not None:
+                self.prob = _splice(self.prob, kept_starts, kept_ends, np.split(prob, bounds))
+
+            # Shift indptr after every node by the change of its number of transitions.
+            shift = np.zeros(len(self.indptr), dtype=np.int64)
+            shift[(nodes + 1) * num_actions] = totals - (ends - starts)
+            self.indptr += np.cumsum(shift)
+
+        # indptr within slots of nodes.
+        slot_ptr = (nodes * num_actions)[:, np.newaxis] + np.arange(1, num_actions + 1)
+        self.indptr[slot_ptr] = self.indptr[nodes * num_actions][:, np.newaxis] + np.cumsum(counts, axis=1)
+
+    def lookup(self, node, act):
+        """
+        :return: 2-tuple (successors, probabilities). `probabilities` is None if TS is not quantitative.
+            If action is unknown, the successors are empty.
+        """
+        aid = self.act2id.get(act)
+        if aid is None:
+            return self.succ[:0], None if self.prob is None else self.prob[:0]
+        slot = node * self.num_actions + aid
+        s, e = self.indptr[slot], self.indptr[slot + 1]
+        return self.succ[s:e], None if self.prob is None else self.prob[s:e]
+
+
+def _splice(arr, kept_starts, kept_ends, segments):
+    """ Returns `arr[kept_starts[0]:kept_ends[0]], segments[0], arr[kept_starts[1]:kept_ends[1]], ...` concatenated. """
+    pieces = [arr[kept_starts[0]:kept_ends[0]]]
+    for segment, s, e in zip(segments, kept_starts[1:].tolist(), kept_ends[1:].tolist()):
+        pieces.append(segment)
+        pieces.append(arr[s:e])
+    return np.concatenate(pieces)
+
+
+def to_next_states(ts, succ, prob):
+    """
+    Maps successor nodes (and probabilities) returned by `TransitionIndex.lookup` to `delta` output format.
+    If a deterministic TS has no successor (action not enabled), returns None.
+    """
+    if ts.deterministic:
+        if len(succ) == 0:
+            return None
+        return ts.node2state(int(succ[0]))
+    if prob is None:
+        return [ts.node2state(v) for v in succ.tolist()]
+    return [(ts.node2state(v), p) for v, p in zip(succ.tolist(), prob.tolist())]